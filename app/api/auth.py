@@ -1,31 +1,44 @@
-from fastapi import HTTPException, Request
-from clerk_backend_api import Clerk
-from clerk_backend_api.security.types import AuthenticateRequestOptions
+from http.cookies import SimpleCookie
+
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
 
-from app.constants.index import ALLOWED_ORIGINS, CLERK_SECRET_KEY
 from app.models.clerk import ClerkUser
+from app.services.session_auth import SESSION_VERIFIER
 from app.utils import timer
 
-def get_request_state(request: Request):
-    sdk = Clerk(bearer_auth=CLERK_SECRET_KEY)
-    auth_opts = AuthenticateRequestOptions(
-        authorized_parties=ALLOWED_ORIGINS
-    )
-    request_state = sdk.authenticate_request(request, auth_opts)
-    return request_state
+def get_session_token(request: HTTPConnection) -> str | None:
+    # Same lookup as Clerk's SDK: bearer header first, then the __session cookie
+    bearer_token = request.headers.get("authorization")
+    if bearer_token is not None:
+        return bearer_token.replace("Bearer ", "")
+    cookie_header = request.headers.get("cookie")
+    if cookie_header is not None:
+        for key, value in SimpleCookie(cookie_header).items():
+            if key.startswith("__session"):
+                return value.value
+    return None
+
+def authenticated_user(request: HTTPConnection) -> ClerkUser | None:
+    """Verify the request's session once; later calls read it from request.state."""
+    if hasattr(request.state, "user"):
+        return request.state.user
+    token = get_session_token(request)
+    claims = SESSION_VERIFIER.verify(token) if token else None
+    request.state.user = ClerkUser(**claims) if claims else None
+    return request.state.user
 
-def is_signed_in(request: Request) -> bool:
-    request_state = get_request_state(request)
-    return request_state.is_signed_in
+def is_signed_in(request: HTTPConnection) -> bool:
+    return authenticated_user(request) is not None
 
-def authenticate_request(request: Request):
+def authenticate_request(request: HTTPConnection):
     if not is_signed_in(request):
         raise HTTPException(status_code=401, detail="Unauthorized")
     return request
 
 @timer
-def get_user(request: Request):
-    request_state = get_request_state(request)
-    if not request_state.is_signed_in or not request_state.payload:
+def get_user(request: HTTPConnection):
+    user = authenticated_user(request)
+    if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    return ClerkUser(**request_state.payload)
+    return user
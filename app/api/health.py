@@ -5,7 +5,9 @@ These endpoints are used for monitoring and health checks.
 """
 
 from fastapi import APIRouter
-from app.models.health import HealthResponse
+from app.brokers.instruments import INSTRUMENT_STORE
+from app.brokers.scheduler import KITE_SCHEDULER
+from app.models.health import HealthResponse, UpstreamHealthResponse
 
 router = APIRouter()
 
@@ -16,6 +18,20 @@ def health_check():
     Health check endpoint for monitoring service status.
     
     Returns:
-        HealthResponse: Current health status of the service
+        HealthResponse: Current health status of the service, and whether
+        the instrument dump has finished loading
     """
-    return HealthResponse(status="healthy")
+    return HealthResponse(status="healthy", instruments_ready=INSTRUMENT_STORE.is_ready())
+
+
+@router.get("/health/upstream", response_model=UpstreamHealthResponse)
+def upstream_health():
+    """
+    Kite call scheduler metrics for this worker.
+    
+    Returns:
+        UpstreamHealthResponse: Per endpoint, calls waiting for a rate-limit
+        slot, calls granted, rejected for missing their deadline and
+        throttled by Kite, and recent wait times
+    """
+    return UpstreamHealthResponse(endpoints=KITE_SCHEDULER.metrics())
@@ -0,0 +1,83 @@
+"""
+Live ticker endpoints.
+
+WebSocket feed of straddle prices, pushed as ticks arrive.
+"""
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.auth import get_user
+from app.db import SessionLocal
+from app.repository.user_token_repository import UserTokenRepository
+from app.services.live_feed import LIVE_FEEDS, Subscriber
+from app.services.ticker_service import TickerService
+
+router = APIRouter()
+
+
+def lookupToken(user_id: str) -> str | None:
+    # A session of its own, closed before the socket opens; a Depends(get_db)
+    # session would hold a pooled connection for as long as the client stays
+    with SessionLocal() as db:
+        return UserTokenRepository(db).get_token(user_id)
+
+
+async def pump(websocket: WebSocket, subscriber: Subscriber):
+    while True:
+        await websocket.send_json(await subscriber.queue.get())
+
+
+@router.websocket("/live")
+async def live(websocket: WebSocket):
+    """
+    Stream straddle prices.
+    
+    Clients send `{"subscribe": [ids]}` or `{"unsubscribe": [ids]}` with
+    straddle ids as returned by /ticker/straddles, and receive one
+    `{id, tstring, timestamp, price, call, put}` message per price change.
+    """
+    try:
+        # Browsers can't set headers on a WebSocket; Clerk's __session cookie is used instead
+        user = await run_in_threadpool(get_user, websocket)  # type: ignore[arg-type]
+    except HTTPException:
+        await websocket.close(code=1008, reason="Unauthorized")
+        return
+    token = await run_in_threadpool(lookupToken, user.sub)
+    if not token:
+        await websocket.close(code=1008, reason="User token not found in database")
+        return
+    await websocket.accept()
+    
+    service = TickerService(token)
+    feed = LIVE_FEEDS.acquire(token)
+    subscriber = Subscriber(asyncio.get_running_loop())
+    sender = asyncio.create_task(pump(websocket, subscriber))
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+                subscribe, unsubscribe = list(message.get("subscribe", [])), list(message.get("unsubscribe", []))
+                if not all(isinstance(straddle_id, str) for straddle_id in subscribe + unsubscribe):
+                    raise TypeError("straddle ids must be strings")
+            except (ValueError, AttributeError, TypeError, KeyError) as e:
+                # Bad JSON or not an object; tell the client and keep the socket
+                await websocket.send_json({"error": f"Invalid message: {e}"})
+                continue
+            for straddle_id in subscribe:
+                try:
+                    legs = await run_in_threadpool(service.straddleLegs, straddle_id)
+                except ValueError as e:
+                    await websocket.send_json({"id": straddle_id, "error": str(e)})
+                    continue
+                feed.subscribe(subscriber, straddle_id, legs)
+            for straddle_id in unsubscribe:
+                feed.unsubscribe(subscriber, straddle_id)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        feed.unsubscribeAll(subscriber)
+        LIVE_FEEDS.release(token)
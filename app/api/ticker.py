@@ -4,22 +4,42 @@ Ticker-related endpoints.
 Business logic endpoints for ticker functionality.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
+import base64
+from datetime import datetime, timezone
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.orm import Session
 
 from app.api.auth import authenticate_request, get_user
-from app.db import get_db
+from app.brokers.instruments import InstrumentsPayload
+from app.brokers.scheduler import RateLimitExceeded
+from app.constants import SNAPSHOT_BULK_MAX_BYTES, SNAPSHOT_BULK_MAX_ROWS
+from app.db import engine, get_db
 from app.db.models import PriceSnapshot
+from app.db.snapshot_writer import SNAPSHOT_WRITER, WriterBusy
 from app.models.clerk import ClerkUser
+from app.models.ticker import CombinedQuote, HistoryColumns, HistoryRow, SnapshotIn, Straddle, StraddleChain
+from app.repository.price_bar_repository import BAR_INTERVALS, PriceBarRepository
 from app.repository.price_snapshot_repository import PriceSnapshotRepository
 from app.repository.user_token_repository import UserTokenRepository
-from app.services.ticker_service import TickerService
-from app.utils import timer
+from app.services.ticker_service import AsyncTickerService, TickerService
+from app.utils import NDJSON_MEDIA_TYPE, FastJSONResponse, ndjsonLines, timer
 
 router = APIRouter(dependencies=[Depends(authenticate_request)])
 
+SNAPSHOT_LIST = TypeAdapter(list[SnapshotIn])
+# Largest snapshot page, and rows per chunk of a streamed export
+SNAPSHOT_PAGE_MAX = 1000
+SNAPSHOT_EXPORT_BATCH = 5000
+# Most strikes either side of ATM in one straddle chain
+STRADDLE_CHAIN_MAX_WIDTH = 50
+
 @timer
-def get_service(user: ClerkUser = Depends(get_user), db: Session = Depends(get_db)) -> TickerService:
+def get_user_token(user: ClerkUser = Depends(get_user), db: Session = Depends(get_db)) -> str:
     user_id = user.sub
     if not user_id:
         raise HTTPException(status_code=400, detail="User auth is needed to access TickerService")
@@ -27,68 +47,142 @@ def get_service(user: ClerkUser = Depends(get_user), db: Session = Depends(get_d
     token = repo.get_token(user_id)
     if not token:
         raise HTTPException(status_code=400, detail="User token not found in database")
+    return token
+
+def get_service(token: str = Depends(get_user_token)) -> TickerService:
     return TickerService(token)
 
+def get_async_service(token: str = Depends(get_user_token)) -> AsyncTickerService:
+    return AsyncTickerService(token)
+
+def payloadResponse(req: Request, payload: InstrumentsPayload) -> Response:
+    """Serve pre-serialized bytes, answering a matching If-None-Match with 304."""
+    headers = {"ETag": payload.etag, "Vary": "Accept, Accept-Encoding"}
+    if_none_match = req.headers.get("if-none-match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if payload.etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in req.headers.get("accept-encoding", "").lower():
+        headers["Content-Encoding"] = "gzip"
+        return Response(payload.gzipped, media_type="application/json", headers=headers)
+    return Response(payload.body, media_type="application/json", headers=headers)
+
+def wantsNdjson(req: Request) -> bool:
+    """`format=ndjson`, or with no format given, an Accept header asking for NDJSON."""
+    format = req.query_params.get("format")
+    if format:
+        return format == "ndjson"
+    return NDJSON_MEDIA_TYPE in req.headers.get("accept", "")
+
+def tooManyRequests(e: RateLimitExceeded) -> HTTPException:
+    """Kite's rate limit for this token is booked past the deadline; tell the client when to come back."""
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
 @router.get("/instruments")
-def instruments(service: TickerService = Depends(get_service)):
+def instruments(req: Request, service: TickerService = Depends(get_service)):
     try:
-        return service.instruments()
+        if wantsNdjson(req):
+            # One instrument per line, serialized as it's sent instead of from the cached array
+            return StreamingResponse(ndjsonLines(service.instrumentRows()), media_type=NDJSON_MEDIA_TYPE, headers={"Vary": "Accept"})
+        payload = service.instrumentsPayload()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return payloadResponse(req, payload)
 
 @router.get("/reload_instruments")
-def reloadinstruments(service: TickerService = Depends(get_service)):
+def reloadinstruments(req: Request, service: TickerService = Depends(get_service)):
     try:
-        return service.instruments(True)
+        payload = service.instrumentsPayload(True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return payloadResponse(req, payload)
 
 @router.get("/user")
-def user(service: TickerService = Depends(get_service)):
+async def user(service: AsyncTickerService = Depends(get_async_service)):
     try:
-        return service.user()
+        return await service.user()
+    except RateLimitExceeded as e:
+        raise tooManyRequests(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/quote")
-def quote(underlying: str, service: TickerService = Depends(get_service)):
+@router.get("/quote", response_model=dict[str, CombinedQuote])
+async def quote(underlying: str, raw: bool = True, service: AsyncTickerService = Depends(get_async_service)):
     try:
-        return service.quote(underlying)
+        return FastJSONResponse(await service.quote(underlying, raw))
+    except RateLimitExceeded as e:
+        raise tooManyRequests(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/straddles")
+@router.get("/straddles", response_model=list[Straddle])
 def straddles(underlying: str, service: TickerService = Depends(get_service)):
     try:
-        return service.straddles(underlying)
+        return FastJSONResponse(service.straddles(underlying))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/straddleChain", response_model=StraddleChain)
+async def straddleChain(underlying: str, width: int = 10, raw: bool = False, greeks: bool = False, service: AsyncTickerService = Depends(get_async_service)):
+    """
+    Live straddle prices for the ATM strike and `width` strikes either side.
+    
+    ATM is the strike nearest the underlying's spot; spot and every leg are
+    quoted in one Kite call.
+    
+    Args:
+        underlying: 'NIFTY' or 'SENSEX'
+        width: Strikes either side of ATM (default: 10, at most 50)
+        raw: Include Kite's full quote for each leg
+        greeks: Include each leg's Black-Scholes implied volatility and Greeks
+    """
+    width = max(0, min(width, STRADDLE_CHAIN_MAX_WIDTH))
+    try:
+        return FastJSONResponse(await service.straddleChain(underlying, width, raw, greeks))
+    except RateLimitExceeded as e:
+        raise tooManyRequests(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/straddleQuotes")
-def straddleQuotes(ids: str, service: TickerService = Depends(get_service)):
+@router.get("/straddleQuotes", response_model=dict[str, CombinedQuote])
+async def straddleQuotes(ids: str, raw: bool = True, service: AsyncTickerService = Depends(get_async_service)):
     idList = ids.split(",") if ids else []
     try:
-        return service.straddle_quotes(idList)
+        return FastJSONResponse(await service.straddle_quotes(idList, raw))
+    except RateLimitExceeded as e:
+        raise tooManyRequests(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/history")
-def history(req: Request, service: TickerService = Depends(get_service)):
+@router.get("/history", response_model=dict[str, list[HistoryRow] | HistoryColumns])
+async def history(req: Request, raw: bool = True, service: AsyncTickerService = Depends(get_async_service)):
     underlying = req.query_params.get("underlying")
     from_date = req.query_params.get("from")
     to_date = req.query_params.get("to")
+    columnar = req.query_params.get("format") == "columns"
+    interval = req.query_params.get("interval")
     try:
-        return service.history(underlying, from_date, to_date)
+        if wantsNdjson(req):
+            return StreamingResponse(await service.historyLines(underlying, from_date, to_date, interval, raw), media_type=NDJSON_MEDIA_TYPE)
+        return FastJSONResponse(await service.history(underlying, from_date, to_date, columnar, interval, raw))
+    except RateLimitExceeded as e:
+        raise tooManyRequests(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/straddleHistory")
-def historyStraddle(req: Request, service: TickerService = Depends(get_service)):
+@router.get("/straddleHistory", response_model=dict[str, list[HistoryRow] | HistoryColumns])
+async def historyStraddle(req: Request, raw: bool = True, service: AsyncTickerService = Depends(get_async_service)):
     straddleId = req.query_params.get("straddle")
     from_date = req.query_params.get("from")
     to_date = req.query_params.get("to")
+    columnar = req.query_params.get("format") == "columns"
+    interval = req.query_params.get("interval")
     try:
-        return service.straddleHistory(straddleId, from_date, to_date)
+        if wantsNdjson(req):
+            return StreamingResponse(await service.straddleHistoryLines(straddleId, from_date, to_date, interval, raw), media_type=NDJSON_MEDIA_TYPE)
+        return FastJSONResponse(await service.straddleHistory(straddleId, from_date, to_date, columnar, interval, raw))
+    except RateLimitExceeded as e:
+        raise tooManyRequests(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -127,58 +221,205 @@ def create_snapshot(symbol: str, price: float, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class TooManySnapshots(Exception):
+    pass
+
+
+def parseSnapshots(body: bytes, content_type: str) -> list[tuple[str, float, datetime]]:
+    """A JSON array, or NDJSON (one object per line), as (symbol, price, created_at) rows."""
+    if "ndjson" in content_type or "jsonl" in content_type:
+        lines = [line for line in body.splitlines() if line.strip()]
+        # Counted before anything is validated
+        if len(lines) > SNAPSHOT_BULK_MAX_ROWS:
+            raise TooManySnapshots()
+        snapshots = [SnapshotIn.model_validate_json(line) for line in lines]
+    else:
+        snapshots = SNAPSHOT_LIST.validate_json(body)
+        if len(snapshots) > SNAPSHOT_BULK_MAX_ROWS:
+            raise TooManySnapshots()
+    received = datetime.now(timezone.utc)
+    def created(at: datetime | None) -> datetime:
+        if at is None:
+            return received
+        # Naive timestamps are UTC, like the column default
+        return at if at.tzinfo else at.replace(tzinfo=timezone.utc)
+    return [(s.symbol, s.price, created(s.created_at)) for s in snapshots]
+
+
+@router.post("/snapshots/bulk")
+async def create_snapshots(req: Request, wait: bool = False):
+    """
+    Record many price snapshots in one request.
+    
+    The body is a JSON array of `{"symbol", "price", "created_at"?}` objects,
+    or NDJSON with one such object per line (`Content-Type:
+    application/x-ndjson`). Rows go to a background writer that groups them
+    with other requests' into one COPY and commit.
+    
+    Args:
+        wait: Respond once the rows are committed rather than once queued
+    
+    Returns:
+        Number of rows accepted (202) or written (201, with `wait`)
+    """
+    too_large = HTTPException(status_code=413, detail=f"At most {SNAPSHOT_BULK_MAX_ROWS} snapshots or {SNAPSHOT_BULK_MAX_BYTES} bytes per request")
+    if int(req.headers.get("content-length") or 0) > SNAPSHOT_BULK_MAX_BYTES:
+        raise too_large
+    # Read in chunks, so a body without a Content-Length is cut off at the limit too
+    body = bytearray()
+    async for chunk in req.stream():
+        body += chunk
+        if len(body) > SNAPSHOT_BULK_MAX_BYTES:
+            raise too_large
+    try:
+        # Validating up to the row limit is CPU work; keep it off the event loop
+        rows = await asyncio.to_thread(parseSnapshots, bytes(body), req.headers.get("content-type", ""))
+    except TooManySnapshots:
+        raise too_large
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        future = SNAPSHOT_WRITER.submit(rows)
+        if not wait:
+            return JSONResponse({"accepted": len(rows)}, status_code=202)
+        written = await asyncio.wrap_future(future)
+    except WriterBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return JSONResponse({"written": written}, status_code=201)
+
+
+def encodeCursor(created_at: datetime, id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode()
+
+
+def decodeCursor(cursor: str | None) -> tuple[datetime, int] | None:
+    if not cursor:
+        return None
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def snapshotPage(response: Response, db: Session, symbol: str | None, limit: int, cursor: str | None, since: datetime | None, until: datetime | None):
+    """One keyset page, newest first; the cursor for the next one goes in X-Next-Cursor."""
+    after = decodeCursor(cursor)
+    limit = max(1, min(limit, SNAPSHOT_PAGE_MAX))
+    try:
+        rows = PriceSnapshotRepository(db).page(symbol, since=since, until=until, after=after, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encodeCursor(rows[-1].created_at, rows[-1].id)
+    return [
+        {
+            "id": id,
+            "symbol": symbol,
+            "price": price,
+            "created_at": created_at.isoformat() if created_at else None,
+        }
+        for id, symbol, price, created_at in rows
+    ]
+
+
+@router.get("/snapshots/export")
+def export_snapshots(symbol: str | None = None, since: datetime | None = None, until: datetime | None = None):
+    """
+    Stream price snapshots as NDJSON, oldest first.
+    
+    Rows are read from a server-side cursor and written out in batches, so
+    exports of any size use flat memory. Each line has the shape
+    `POST /snapshots/bulk` accepts.
+    
+    Args:
+        symbol: Only this symbol (default: all)
+        since: Only snapshots at or after this time
+        until: Only snapshots before this time
+    
+    Returns:
+        application/x-ndjson stream
+    """
+    def rows():
+        # Its own session: the stream outlives the request's dependencies
+        with Session(engine) as session:
+            for _, symbol_, price, created_at in PriceSnapshotRepository(session).stream(symbol, since=since, until=until, batch=SNAPSHOT_EXPORT_BATCH):
+                yield {"symbol": symbol_, "price": price, "created_at": created_at}
+    return StreamingResponse(ndjsonLines(rows(), SNAPSHOT_EXPORT_BATCH), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.get("/snapshots/{symbol}")
-def list_snapshots(symbol: str, limit: int = 10, db: Session = Depends(get_db)):
+def list_snapshots(response: Response, symbol: str, limit: int = 10, cursor: str | None = None,
+                   since: datetime | None = None, until: datetime | None = None, db: Session = Depends(get_db)):
     """
     List recent price snapshots for a given symbol.
     
     Args:
         symbol: Ticker symbol to filter by
-        limit: Max number of records to return (default: 10)
+        limit: Max number of records to return (default: 10, at most 1000)
+        cursor: X-Next-Cursor from the previous page, to continue after it
+        since: Only snapshots at or after this time
+        until: Only snapshots before this time
         db: Database session (injected via dependency)
     
     Returns:
-        List of recent price snapshots ordered by creation time (newest first)
+        List of recent price snapshots ordered by creation time (newest
+        first); X-Next-Cursor is set when there may be more
     """
+    return snapshotPage(response, db, symbol, limit, cursor, since, until)
+
+
+@router.get("/snapshots/{symbol}/bars")
+def list_bars(symbol: str, interval: str = "minute", since: datetime | None = None, limit: int = 375, db: Session = Depends(get_db)):
+    """
+    OHLC bars rolled up from a symbol's recorded snapshots.
+    
+    Args:
+        symbol: Underlying (e.g. 'NIFTY') or straddle id (e.g. 'NIFTY:2025-01-30:24000')
+        interval: 'minute' or '5minute'
+        since: Only bars starting at or after this time
+        limit: Max number of bars to return (default: 375, a trading day of minutes)
+        db: Database session (injected via dependency)
+    
+    Returns:
+        Bars ordered by start time (newest first)
+    """
+    if interval not in BAR_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(BAR_INTERVALS)}")
     try:
-        repo = PriceSnapshotRepository(db)
-        snapshots = repo.by_symbol(symbol, limit=limit)
+        bars = PriceBarRepository(db).recent(symbol, interval, since=since, limit=limit)
         return [
             {
-                "id": snap.id,
-                "symbol": snap.symbol,
-                "price": snap.price,
-                "created_at": snap.created_at.isoformat() if snap.created_at else None,
+                "start": bar.start.isoformat(),
+                "open": bar.open,
+                "high": bar.high,
+                "low": bar.low,
+                "close": bar.close,
+                "samples": bar.samples,
             }
-            for snap in snapshots
+            for bar in bars
         ]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/snapshots")
-def all_snapshots(limit: int = 20, db: Session = Depends(get_db)):
+def all_snapshots(response: Response, limit: int = 20, cursor: str | None = None,
+                  since: datetime | None = None, until: datetime | None = None, db: Session = Depends(get_db)):
     """
     List all price snapshots across all symbols.
     
     Args:
-        limit: Max number of records to return (default: 20)
+        limit: Max number of records to return (default: 20, at most 1000)
+        cursor: X-Next-Cursor from the previous page, to continue after it
+        since: Only snapshots at or after this time
+        until: Only snapshots before this time
         db: Database session (injected via dependency)
     
     Returns:
-        List of all recent price snapshots
+        List of all recent price snapshots, newest first; X-Next-Cursor is
+        set when there may be more
     """
-    try:
-        repo = PriceSnapshotRepository(db)
-        snapshots = repo.list(limit=limit)
-        return [
-            {
-                "id": snap.id,
-                "symbol": snap.symbol,
-                "price": snap.price,
-                "created_at": snap.created_at.isoformat() if snap.created_at else None,
-            }
-            for snap in snapshots
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return snapshotPage(response, db, None, limit, cursor, since, until)
@@ -1,36 +1,166 @@
 
-from typing import Any
+from dataclasses import asdict, dataclass
+import datetime
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import sys
+import threading
+from typing import Any, Iterator
 
 from kiteconnect import KiteConnect
-from app.constants import ZERODHA_API_KEY
+from app.constants import INSTRUMENTS_SNAPSHOT_PATH, TZONE_INDIA, ZERODHA_API_KEY
 from app.models.ticker import OptionType, Underlying
 from app.utils.decorators import timer
+from app.utils.encoding import jsonDefault
 
 TRADING_SYMBOL = {
     "NIFTY 50": Underlying.NIFTY,
     "SENSEX": Underlying.SENSEX,
 }
 
+# Bump when the on-disk snapshot layout changes so old files are ignored
+SNAPSHOT_VERSION = 2
+
+# Fields that repeat across thousands of rows; equal values share one object
+SHARED_FIELDS = ("name", "last_price", "expiry", "strike", "tick_size", "lot_size", "instrument_type", "segment", "exchange")
+
+
+@dataclass(slots=True)
+class Instrument:
+    """Memory-lean row of the Kite instrument dump."""
+    instrument_token: int
+    exchange_token: str
+    tradingsymbol: str
+    name: str
+    last_price: float
+    expiry: datetime.date | str
+    strike: float
+    tick_size: float
+    lot_size: int
+    instrument_type: str
+    segment: str
+    exchange: str
+
+    @classmethod
+    def fromDict(cls, ins: dict[str, Any], pool: dict[tuple[str, Any], Any]) -> "Instrument":
+        values = {field: ins.get(field) for field in cls.__dataclass_fields__}
+        for field in SHARED_FIELDS:
+            value = values[field]
+            shared = pool.get((field, value))
+            if shared is None:
+                shared = pool[(field, value)] = sys.intern(value) if isinstance(value, str) else value
+            values[field] = shared
+        return cls(**values)
+
+    def __reduce__(self):
+        # Positional rebuild unpickles much faster than the default per-slot setstate
+        return (Instrument, tuple(getattr(self, field) for field in self.__dataclass_fields__))
+
+    def toDict(self) -> dict[str, Any]:
+        """The full dict, as kiteconnect returns it."""
+        return asdict(self)
+
+
+def tradingDate() -> datetime.date:
+    # Kite regenerates the instrument dump once per trading day, IST
+    return datetime.datetime.now(TZONE_INDIA).date()
+
+
+@dataclass(slots=True, frozen=True)
+class InstrumentsPayload:
+    """Serialized instrument list, built once per load and served as-is."""
+    etag: str
+    body: bytes
+    gzipped: bytes
+
 
 class InstrumentStore:
     """Class to cache and retrieve instrument data."""
-    _instruments: dict[Underlying, dict[OptionType, dict[str, list[dict[str, Any]]]]]
-    _stocks: dict[Underlying, dict[str, Any]]
+    _instruments: dict[Underlying, dict[OptionType, dict[str, list[Instrument]]]]
+    _stocks: dict[Underlying, Instrument]
+    # (underlying, option_type, expiry, rounded strike) -> instrument
+    _options: dict[tuple[Underlying, OptionType, str, int], Instrument]
+    # sorted expiry strings per underlying, across all option types
+    _expiries: dict[Underlying, list[str]]
     
     def __init__(self, api_key: str = ZERODHA_API_KEY):
         self.api_key = api_key
-        self.load()
+        self._instruments, self._stocks, self._options, self._expiries = {}, {}, {}, {}
+        # Nothing is downloaded here; the first reader (or the startup task) loads the dump
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._payload: InstrumentsPayload | None = None
+    
+    def is_ready(self) -> bool:
+        return self._loaded.is_set()
+    
+    def ensure_loaded(self):
+        """Load the dump once; callers arriving mid-load wait for it instead of starting their own."""
+        if self._loaded.is_set():
+            return
+        with self._lock:
+            if not self._loaded.is_set():
+                self._load()
     
     def instruments(self):
-        if not self._instruments:
-            self.load()
+        self.ensure_loaded()
         return self._instruments
     
     def stocks(self):
-        if not self._stocks:
-            self.load()
+        self.ensure_loaded()
         return self._stocks
     
+    def option(self, underlying: Underlying, option_type: OptionType, expiry: str, strike: float) -> Instrument | None:
+        self.ensure_loaded()
+        return self._options.get((underlying, option_type, str(expiry), int(round(strike))))
+    
+    def expiries(self, underlying: Underlying) -> list[str]:
+        self.ensure_loaded()
+        return self._expiries.get(underlying, [])
+    
+    def rows(self) -> list[dict[str, Any]]:
+        """Every cached instrument as a full kiteconnect dict, options first."""
+        return list(self.iterRows())
+    
+    def iterRows(self) -> Iterator[dict[str, Any]]:
+        """`rows`, one dict at a time; a reload mid-iteration doesn't mix the two dumps."""
+        self.ensure_loaded()
+        # _load swaps in new dicts rather than mutating these
+        instruments, stocks = self._instruments, self._stocks
+        options = (
+            ins
+            for opt_types in instruments.values()
+            for expiries in opt_types.values()
+            for ins_list in expiries.values()
+            for ins in ins_list
+        )
+        return (ins.toDict() for ins in itertools.chain(options, stocks.values()))
+    
+    def payload(self) -> InstrumentsPayload:
+        payload = self._payload
+        if payload is None:
+            self.ensure_loaded()
+            # Built under the load lock so it can never pair with a newer load
+            with self._lock:
+                if self._payload is None:
+                    self._payload = self._buildPayload()
+                payload = self._payload
+        return payload
+    
+    @timer
+    def _buildPayload(self) -> InstrumentsPayload:
+        # Same separators and flags as FastAPI's JSONResponse
+        body = json.dumps(
+            self.rows(), default=jsonDefault, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        # Content hash rather than a counter, so every worker hands out the same tag for the same dump
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        return InstrumentsPayload(etag=etag, body=body, gzipped=gzip.compress(body, compresslevel=6))
+    
     @classmethod
     def singleton(cls):
         if not hasattr(cls, '_instance'):
@@ -39,9 +169,59 @@ class InstrumentStore:
     
     @timer
     def load(self):
-        kite = KiteConnect(api_key=self.api_key)
-        instruments = kite.instruments()
-        self._instruments, self._stocks = self._preprocessInstruments(instruments)
+        """Force a fresh download, serialized with any load already in flight."""
+        with self._lock:
+            self._load(force=True)
+    
+    def _load(self, force: bool = False):
+        # Same-day restarts read the local snapshot; Kite is hit only when it is stale or forced
+        preprocessed = None if force else self._readSnapshot()
+        if preprocessed is None:
+            kite = KiteConnect(api_key=self.api_key)
+            preprocessed = self._preprocessInstruments(kite.instruments())
+            self._writeSnapshot(preprocessed)
+        self._instruments, self._stocks, self._options, self._expiries = preprocessed
+        self._payload = None
+        self._loaded.set()
+    
+    @timer
+    def _readSnapshot(self):
+        if not INSTRUMENTS_SNAPSHOT_PATH:
+            return None
+        try:
+            with open(INSTRUMENTS_SNAPSHOT_PATH, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[INSTRUMENTS] Ignoring unreadable snapshot: {e}")
+            return None
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("trading_date") != tradingDate():
+            return None
+        return snapshot["preprocessed"]
+    
+    @timer
+    def _writeSnapshot(self, preprocessed):
+        if not INSTRUMENTS_SNAPSHOT_PATH:
+            return
+        # Pickle keeps shared references, so each instrument row is stored once
+        # even though it appears in both the nested map and the option index
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "trading_date": tradingDate(),
+            "preprocessed": preprocessed,
+        }
+        try:
+            directory = os.path.dirname(INSTRUMENTS_SNAPSHOT_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Write then rename so other workers never read a half-written file
+            tmp_path = f"{INSTRUMENTS_SNAPSHOT_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, INSTRUMENTS_SNAPSHOT_PATH)
+        except Exception as e:
+            print(f"[INSTRUMENTS] Could not write snapshot: {e}")
     
     @timer
     def _preprocessInstruments(self, allInstruments):
@@ -58,11 +238,14 @@ class InstrumentStore:
             return ins.get("tradingsymbol") in TRADING_SYMBOL
         
         instruments = {}
-        option_instruments = [ins for ins in allInstruments if filterOptions(ins)]
+        options = {}
+        expiries = {}
+        pool = {}
+        option_instruments = [Instrument.fromDict(ins, pool) for ins in allInstruments if filterOptions(ins)]
         for ins in option_instruments:
-            underlying = Underlying(ins.get("name"))
-            optionType = OptionType(ins.get("instrument_type"))
-            expiry = str(ins.get("expiry"))
+            underlying = Underlying(ins.name)
+            optionType = OptionType(ins.instrument_type)
+            expiry = str(ins.expiry)
             if underlying not in instruments:
                 instruments[underlying] = {}
             if optionType not in instruments[underlying]:
@@ -70,13 +253,18 @@ class InstrumentStore:
             if expiry not in instruments[underlying][optionType]:
                 instruments[underlying][optionType][expiry] = []
             instruments[underlying][optionType][expiry].append(ins)
+            # keep the first instrument per strike, same as a linear scan would
+            options.setdefault((underlying, optionType, expiry, int(round(ins.strike))), ins)
+            expiries.setdefault(underlying, set()).add(expiry)
+        
+        sortedExpiries = {u: sorted(e) for u, e in expiries.items()}
         
         stocks = {}
-        stock_instruments = [ins for ins in allInstruments if filterStocks(ins)]
+        stock_instruments = [Instrument.fromDict(ins, pool) for ins in allInstruments if filterStocks(ins)]
         for ins in stock_instruments:
-            stocks[TRADING_SYMBOL[ins.get("tradingsymbol")]] = ins
+            stocks[TRADING_SYMBOL[ins.tradingsymbol]] = ins
         
-        return instruments, stocks
+        return instruments, stocks, options, sortedExpiries
 
-# Export a singleton instance
+# Export a singleton instance (cheap: the dump is loaded lazily or by the startup task)
 INSTRUMENT_STORE = InstrumentStore.singleton()
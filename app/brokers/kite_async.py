@@ -0,0 +1,82 @@
+"""
+Async Kite Connect client.
+
+The handful of Kite REST calls the ticker makes, on a pooled aiohttp
+session. Routes, headers, response parsing and error mapping are
+kiteconnect's own, so callers get the same data and exceptions as from
+`KiteConnect`.
+"""
+
+import datetime
+from typing import Any
+from urllib.parse import urljoin
+
+import aiohttp
+from kiteconnect import KiteConnect
+from kiteconnect import exceptions as ex
+
+from app.constants import KITE_ASYNC_MAX_CONNECTIONS
+
+
+class AsyncKite:
+    def __init__(self, kite: KiteConnect):
+        # Only its settings, routes and parsers are used; requests go through aiohttp
+        self.sync = kite
+        self._session: aiohttp.ClientSession | None = None
+
+    async def profile(self) -> dict[str, Any]:
+        return await self._get("user.profile")
+
+    async def quote(self, *instruments: str) -> dict[str, Any]:
+        data = await self._get("market.quote", params=[("i", key) for key in instruments])
+        return {key: self.sync._format_response(data[key]) for key in data}
+
+    async def historical_data(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: str) -> list[dict[str, Any]]:
+        date_string_format = "%Y-%m-%d %H:%M:%S"
+        data = await self._get(
+            "market.historical",
+            url_args={"instrument_token": instrument_token, "interval": interval},
+            params={
+                "from": from_date.strftime(date_string_format),
+                "to": to_date.strftime(date_string_format),
+                "interval": interval,
+                "continuous": 0,
+                "oi": 0,
+            },
+        )
+        return self.sync._format_historical(data)
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    def session(self) -> aiohttp.ClientSession:
+        # Created on first use so it belongs to the running event loop
+        if self._session is None:
+            kite = self.sync
+            self._session = aiohttp.ClientSession(
+                headers={
+                    "X-Kite-Version": kite.kite_header_version,
+                    "User-Agent": kite._user_agent(),
+                    "Authorization": f"token {kite.api_key}:{kite.access_token}",
+                },
+                connector=aiohttp.TCPConnector(limit=KITE_ASYNC_MAX_CONNECTIONS, ssl=not kite.disable_ssl),
+                timeout=aiohttp.ClientTimeout(total=kite.timeout),
+            )
+        return self._session
+
+    async def _get(self, route: str, url_args: dict[str, Any] | None = None, params: Any = None) -> Any:
+        uri = self.sync._routes[route].format(**url_args) if url_args else self.sync._routes[route]
+        async with self.session().get(urljoin(self.sync.root, uri), params=params) as r:
+            content = await r.read()
+        # Same handling as KiteConnect._request
+        if "json" not in r.content_type:
+            raise ex.DataException(f"Unknown Content-Type ({r.content_type}) with response: ({content!r})")
+        try:
+            data = await r.json(content_type=None)
+        except ValueError:
+            raise ex.DataException(f"Couldn't parse the JSON response received from the server: {content!r}")
+        if data.get("status") == "error" or data.get("error_type"):
+            exp = getattr(ex, data.get("error_type") or "", ex.GeneralException)
+            raise exp(data["message"], code=r.status)
+        return data["data"]
@@ -0,0 +1,100 @@
+"""
+Broker pool.
+
+One `Broker` per access token, reused across requests so its KiteConnect
+session keeps its HTTP connections to Kite alive instead of opening a new
+TCP+TLS connection for every request. Least recently used entries are
+evicted past `BROKER_POOL_SIZE`, and an entry is dropped as soon as its
+token is replaced or revoked.
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+from typing import Callable
+
+from app.brokers.zerodha import AsyncBroker, Broker
+from app.constants import BROKER_POOL_SIZE
+
+
+class BrokerPool:
+    """Bounded, thread-safe LRU of brokers keyed by access token."""
+    def __init__(self, size: int = BROKER_POOL_SIZE, factory: Callable[[str], Broker] | None = None):
+        self.size = size
+        self.factory = factory or (lambda access_token: Broker(access_token=access_token))
+        self._lock = threading.Lock()
+        self._brokers: OrderedDict[str, Broker] = OrderedDict()
+
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+
+    def get(self, access_token: str) -> Broker:
+        with self._lock:
+            broker = self._brokers.get(access_token)
+            if broker is not None:
+                self._brokers.move_to_end(access_token)
+                return broker
+        # Built outside the lock; if two requests race, the first one stored wins
+        broker = self.factory(access_token)
+        with self._lock:
+            broker = self._brokers.setdefault(access_token, broker)
+            self._brokers.move_to_end(access_token)
+            while len(self._brokers) > self.size:
+                _, evicted = self._brokers.popitem(last=False)
+                evicted.close()
+        return broker
+
+    def invalidate(self, access_token: str | None) -> None:
+        if not access_token:
+            return
+        with self._lock:
+            broker = self._brokers.pop(access_token, None)
+        if broker is not None:
+            broker.close()
+
+    def invalidateHash(self, token_hash: str | None) -> None:
+        """`invalidate` for a token known only by its `tokenHash`."""
+        if not token_hash:
+            return
+        with self._lock:
+            brokers = [self._brokers.pop(t) for t in [t for t in self._brokers if tokenHash(t) == token_hash]]
+        for broker in brokers:
+            broker.close()
+
+    def drain(self) -> list[Broker]:
+        """Empty the pool, handing back the brokers for the caller to close."""
+        with self._lock:
+            brokers = list(self._brokers.values())
+            self._brokers.clear()
+        return brokers
+
+    def __len__(self) -> int:
+        return len(self._brokers)
+
+
+# Export a singleton instance
+BROKER_POOL = BrokerPool.singleton()
+# Brokers for async routes; their HTTP clients live on the event loop
+ASYNC_BROKER_POOL = BrokerPool(factory=lambda access_token: AsyncBroker(access_token=access_token))
+
+
+def tokenHash(access_token: str | None) -> str | None:
+    """Identifies an access token in messages other processes can read, without revealing it."""
+    if not access_token:
+        return None
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def invalidateBrokers(access_token: str | None) -> None:
+    """Drop every pooled broker for a token that was replaced or revoked."""
+    BROKER_POOL.invalidate(access_token)
+    ASYNC_BROKER_POOL.invalidate(access_token)
+
+
+def invalidateBrokersByHash(token_hash: str | None) -> None:
+    """`invalidateBrokers` for a token known only by its `tokenHash`."""
+    BROKER_POOL.invalidateHash(token_hash)
+    ASYNC_BROKER_POOL.invalidateHash(token_hash)
@@ -0,0 +1,239 @@
+"""
+Shared quote aggregator.
+
+Quote requests arriving within a short window are merged into one
+deduplicated `kite.quote` call, requests for instruments already being
+fetched wait for that call instead of making another, and results are kept
+for a sub-second TTL, so many clients polling the same straddles cost one
+upstream call. A batch only waits for others to join while other quote
+requests are under way; a lone request goes upstream at once.
+
+A batch is fetched with the access token of whichever caller opened it,
+for every caller's keys. That is intended: every user is on the same Kite
+app and quotes are the same market data for all of them. A caller whose
+batch failed because of another user's token retries in a batch of its own.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any
+
+from kiteconnect import KiteConnect
+
+from app.brokers.kite_async import AsyncKite
+from app.brokers.scheduler import KITE_SCHEDULER, Endpoint, Priority
+from app.constants import QUOTE_BATCH_WINDOW_MS, QUOTE_CACHE_TTL_MS
+from app.utils.decorators import timer
+
+# Kite accepts at most this many instruments per quote call
+QUOTE_CHUNK_SIZE = 500
+
+
+class _Batch:
+    def __init__(self):
+        self.keys: set[str] = set()
+        self.quotes: dict[str, Any] = {}
+        self.error: Exception | None = None
+        self.done = threading.Event()
+
+
+class _AsyncBatch:
+    def __init__(self):
+        self.keys: set[str] = set()
+        self.quotes: dict[str, Any] = {}
+        self.error: Exception | None = None
+        self.done = asyncio.Event()
+
+
+class QuoteAggregator:
+    """Micro-batches and caches quotes across concurrent requests."""
+    def __init__(self, ttl_ms: int = QUOTE_CACHE_TTL_MS, window_ms: int = QUOTE_BATCH_WINDOW_MS):
+        self.ttl = ttl_ms / 1000
+        self.window = window_ms / 1000
+        self._lock = threading.Lock()
+        self._cache: dict[str, tuple[float, Any]] = {}
+        self._batch: _Batch | None = None
+        # Keys whose upstream call is under way, and the batch fetching them
+        self._inflight: dict[str, _Batch] = {}
+        # Callers waiting on an upstream call; with none but the leader, it needn't wait for company
+        self._callers = 0
+        # Only touched from the event loop thread, so no lock needed
+        self._async_batch: _AsyncBatch | None = None
+        self._async_inflight: dict[str, _AsyncBatch] = {}
+        self._async_callers = 0
+    
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+    
+    def quote(self, kite: KiteConnect, keys: tuple[str, ...] | list[str], retry: bool = True) -> dict[str, Any]:
+        with self._lock:
+            cached, missing = self._split(keys)
+            if not missing:
+                return cached
+            # Keys already being fetched wait for that call; the rest join the open batch,
+            # or open one and lead it
+            batches = {self._inflight[key] for key in missing if key in self._inflight}
+            new = [key for key in missing if key not in self._inflight]
+            batch, leader = None, False
+            if new:
+                batch = self._batch
+                leader = batch is None
+                if batch is None:
+                    batch = self._batch = _Batch()
+                batch.keys.update(new)
+                batches.add(batch)
+            self._callers += 1
+        try:
+            return self._await(kite, keys, cached, batches, batch, leader, retry)
+        finally:
+            with self._lock:
+                self._callers -= 1
+    
+    def _await(self, kite: KiteConnect, keys: tuple[str, ...] | list[str], cached: dict[str, Any], batches: set[_Batch], batch: _Batch | None, leader: bool, retry: bool) -> dict[str, Any]:
+        if leader:
+            if self._callers > 1:
+                time.sleep(self.window)
+            with self._lock:
+                # Close the batch; later callers start the next one, or wait on this one
+                self._batch = None
+                self._inflight.update(dict.fromkeys(batch.keys, batch))
+            try:
+                batch.quotes = self._fetch(kite, sorted(batch.keys))
+            except Exception as e:
+                batch.error = e
+            finally:
+                with self._lock:
+                    for key in batch.keys:
+                        if self._inflight.get(key) is batch:
+                            del self._inflight[key]
+                batch.done.set()
+        for waited in batches:
+            waited.done.wait()
+        
+        error = next((waited.error for waited in batches if waited.error), None)
+        if error:
+            if leader and batch.error:
+                raise batch.error
+            if not retry:
+                raise error
+            # Another client's call failed (e.g. its token expired); don't inherit that,
+            # retry once in a fresh batch where our own client may lead
+            return self.quote(kite, keys, retry=False)
+        return self._merge(keys, cached, {k: v for waited in batches for k, v in waited.quotes.items()})
+    
+    @timer
+    def _fetch(self, kite: KiteConnect, keys: list[str]) -> dict[str, Any]:
+        quotes: dict[str, Any] = {}
+        for i in range(0, len(keys), QUOTE_CHUNK_SIZE):
+            quotes.update(KITE_SCHEDULER.call(kite.access_token, Endpoint.QUOTE, Priority.LIVE, kite.quote, keys[i:i + QUOTE_CHUNK_SIZE]))
+        self._store(quotes)
+        return quotes
+    
+    async def quoteAsync(self, kite: AsyncKite, keys: tuple[str, ...] | list[str], retry: bool = True) -> dict[str, Any]:
+        """`quote` for the event loop: same cache, batches are per loop and awaited instead of slept on."""
+        cached, missing = self._lookup(keys)
+        if not missing:
+            return cached
+        batches = {self._async_inflight[key] for key in missing if key in self._async_inflight}
+        new = [key for key in missing if key not in self._async_inflight]
+        batch, leader = None, False
+        if new:
+            batch = self._async_batch
+            leader = batch is None
+            if batch is None:
+                batch = self._async_batch = _AsyncBatch()
+            batch.keys.update(new)
+            batches.add(batch)
+        self._async_callers += 1
+        try:
+            return await self._awaitAsync(kite, keys, cached, batches, batch, leader, retry)
+        finally:
+            self._async_callers -= 1
+    
+    async def _awaitAsync(self, kite: AsyncKite, keys: tuple[str, ...] | list[str], cached: dict[str, Any], batches: set[_AsyncBatch], batch: _AsyncBatch | None, leader: bool, retry: bool) -> dict[str, Any]:
+        if leader:
+            try:
+                # One turn of the loop lets requests that arrived together join first
+                await asyncio.sleep(0)
+                if self._async_callers > 1:
+                    await asyncio.sleep(self.window)
+                self._async_batch = None
+                self._async_inflight.update(dict.fromkeys(batch.keys, batch))
+                batch.quotes = await self._fetchAsync(kite, sorted(batch.keys))
+            except Exception as e:
+                batch.error = e
+            except BaseException:
+                # The leader's client went away; followers retry in a batch of their own
+                batch.error = RuntimeError("Quote batch leader was cancelled")
+                raise
+            finally:
+                # Never leave a batch open or in flight that nobody will fetch
+                if self._async_batch is batch:
+                    self._async_batch = None
+                for key in batch.keys:
+                    if self._async_inflight.get(key) is batch:
+                        del self._async_inflight[key]
+                batch.done.set()
+        for waited in batches:
+            await waited.done.wait()
+        
+        error = next((waited.error for waited in batches if waited.error), None)
+        if error:
+            if leader and batch.error:
+                raise batch.error
+            if not retry:
+                raise error
+            return await self.quoteAsync(kite, keys, retry=False)
+        return self._merge(keys, cached, {k: v for waited in batches for k, v in waited.quotes.items()})
+    
+    @timer
+    async def _fetchAsync(self, kite: AsyncKite, keys: list[str]) -> dict[str, Any]:
+        chunks = [keys[i:i + QUOTE_CHUNK_SIZE] for i in range(0, len(keys), QUOTE_CHUNK_SIZE)]
+        quotes: dict[str, Any] = {}
+        token = kite.sync.access_token
+        for chunk_quotes in await asyncio.gather(*(KITE_SCHEDULER.callAsync(token, Endpoint.QUOTE, Priority.LIVE, kite.quote, *chunk) for chunk in chunks)):
+            quotes.update(chunk_quotes)
+        self._store(quotes)
+        return quotes
+    
+    def _lookup(self, keys: tuple[str, ...] | list[str]) -> tuple[dict[str, Any], list[str]]:
+        with self._lock:
+            return self._split(keys)
+    
+    def _split(self, keys: tuple[str, ...] | list[str]) -> tuple[dict[str, Any], list[str]]:
+        """Fresh cached quotes, and the keys still to fetch. Call with the lock held."""
+        now = time.monotonic()
+        cached: dict[str, Any] = {}
+        missing: list[str] = []
+        for key in dict.fromkeys(keys):
+            entry = self._cache.get(key)
+            if entry and now - entry[0] < self.ttl:
+                cached[key] = entry[1]
+            else:
+                missing.append(key)
+        return cached, missing
+    
+    def _merge(self, keys: tuple[str, ...] | list[str], cached: dict[str, Any], fetched: dict[str, Any]) -> dict[str, Any]:
+        result = {}
+        for key in keys:
+            if key in cached:
+                result[key] = cached[key]
+            elif key in fetched:
+                result[key] = fetched[key]
+        return result
+    
+    def _store(self, quotes: dict[str, Any]) -> None:
+        fetched_at = time.monotonic()
+        with self._lock:
+            # Drop expired entries while we're here so the cache stays bounded by live instruments
+            self._cache = {k: v for k, v in self._cache.items() if fetched_at - v[0] < self.ttl}
+            for key, quote in quotes.items():
+                self._cache[key] = (fetched_at, quote)
+
+
+# Export a singleton instance
+QUOTE_AGGREGATOR = QuoteAggregator.singleton()
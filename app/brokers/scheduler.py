@@ -0,0 +1,287 @@
+"""
+Upstream scheduler for Kite API calls.
+
+Kite rate-limits each endpoint per API key/access token (quotes ~1 req/s,
+historical data ~3 req/s, most others ~10 req/s) and answers excess calls
+with 429. Every Kite call goes through here instead: each (access token,
+endpoint) pair has a token bucket, callers queue for it by priority, and a
+caller that can't be served before its deadline is turned away at once
+with a retry-after, rather than piling onto Kite and failing there.
+"""
+
+import asyncio
+from collections import deque
+from enum import Enum, IntEnum
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from app.constants import UPSTREAM_DEADLINE_SECONDS
+
+T = TypeVar("T")
+
+# Waits kept per endpoint for the percentiles in metrics()
+WAIT_SAMPLES = 1000
+# Idle buckets are dropped once this many exist, so expired tokens don't pile up
+MAX_IDLE_BUCKETS = 1000
+
+
+class Endpoint(Enum):
+    QUOTE = "quote"
+    HISTORICAL = "historical"
+    DEFAULT = "default"
+
+
+# Sustained calls per second for each endpoint; bursts up to the same number
+RATE_LIMITS = {
+    Endpoint.QUOTE: 1.0,
+    Endpoint.HISTORICAL: 3.0,
+    Endpoint.DEFAULT: 10.0,
+}
+
+
+class Priority(IntEnum):
+    """Lower goes first."""
+    LIVE = 0  # quotes the UI is polling
+    INTERACTIVE = 1  # a user is waiting on the response
+    BACKFILL = 2  # filling the candle store
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, endpoint: Endpoint, retry_after: float):
+        super().__init__(f"Kite {endpoint.value} rate limit reached, retry after {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def isRateLimited(e: Exception) -> bool:
+    # kiteconnect raises NetworkException(code=429) for "Too many requests"
+    return getattr(e, "code", None) == 429
+
+
+class _Waiter:
+    def __init__(self, priority: Priority, seq: int, wake: Callable[[], None], enqueued: float):
+        self.key = (priority, seq)
+        self.wake = wake
+        self.enqueued = enqueued
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.key < other.key
+
+
+class TokenBucket:
+    """One endpoint for one access token: `rate` tokens a second, holding at most `rate`."""
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waiters: list[_Waiter] = []
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def estimate(self, waiter: _Waiter | None = None) -> float:
+        """Seconds until `waiter` (or a new arrival) would get a token, if nobody else cuts in."""
+        ahead = sum(1 for w in self.waiters if waiter is None or w < waiter)
+        return max(0.0, (ahead + 1 - self.tokens) / self.rate)
+
+    def idle(self) -> bool:
+        return not self.waiters and self.tokens >= self.capacity
+
+
+class _Metrics:
+    def __init__(self):
+        self.granted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.waits: deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def snapshot(self, queued: int) -> dict[str, Any]:
+        waits = sorted(self.waits)
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 1) if waits else 0.0
+        return {
+            "queued": queued,
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+
+class KiteScheduler:
+    """Token buckets per (access token, endpoint), shared by the sync and async brokers."""
+    def __init__(self, rates: dict[Endpoint, float] = RATE_LIMITS, deadline: float = UPSTREAM_DEADLINE_SECONDS):
+        self.rates = rates
+        self.deadline = deadline
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple[str, Endpoint], TokenBucket] = {}
+        self._metrics = {endpoint: _Metrics() for endpoint in Endpoint}
+        self._seq = itertools.count()
+
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+
+    def call(self, access_token: str, endpoint: Endpoint, priority: Priority, fn: Callable[..., T], *args, deadline: float | None = None) -> T:
+        """Run `fn(*args)` once a slot is free, retrying Kite 429s until the deadline."""
+        expires = time.monotonic() + (deadline or self.deadline)
+        while True:
+            self.acquire(access_token, endpoint, priority, expires)
+            try:
+                return fn(*args)
+            except Exception as e:
+                if not isRateLimited(e):
+                    raise
+                self._throttled(access_token, endpoint)
+
+    async def callAsync(self, access_token: str, endpoint: Endpoint, priority: Priority, fn: Callable[..., Awaitable[T]], *args, deadline: float | None = None) -> T:
+        expires = time.monotonic() + (deadline or self.deadline)
+        while True:
+            await self.acquireAsync(access_token, endpoint, priority, expires)
+            try:
+                return await fn(*args)
+            except Exception as e:
+                if not isRateLimited(e):
+                    raise
+                self._throttled(access_token, endpoint)
+
+    def acquire(self, access_token: str, endpoint: Endpoint, priority: Priority, expires: float) -> None:
+        event = threading.Event()
+        queued = self._enqueue(access_token, endpoint, priority, expires, event.set)
+        if queued is None:
+            return
+        bucket, waiter = queued
+        try:
+            while True:
+                delay = self._poll(bucket, endpoint, waiter, expires)
+                if delay is None:
+                    return
+                event.wait(delay)
+                event.clear()
+        except BaseException:
+            self._leave(bucket, waiter)
+            raise
+
+    async def acquireAsync(self, access_token: str, endpoint: Endpoint, priority: Priority, expires: float) -> None:
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        queued = self._enqueue(access_token, endpoint, priority, expires, lambda: loop.call_soon_threadsafe(event.set))
+        if queued is None:
+            return
+        bucket, waiter = queued
+        try:
+            while True:
+                delay = self._poll(bucket, endpoint, waiter, expires)
+                if delay is None:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            # Cancelled (a client disconnect, an outer wait_for) or rejected: a waiter
+            # left in the queue would block everyone behind it for good
+            self._leave(bucket, waiter)
+            raise
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            queued = {endpoint: 0 for endpoint in Endpoint}
+            for (_, endpoint), bucket in self._buckets.items():
+                queued[endpoint] += len(bucket.waiters)
+            return {endpoint.value: self._metrics[endpoint].snapshot(queued[endpoint]) for endpoint in Endpoint}
+
+    def _bucket(self, access_token: str, endpoint: Endpoint) -> TokenBucket:
+        # Called with the lock held
+        bucket = self._buckets.get((access_token, endpoint))
+        if bucket is None:
+            if len(self._buckets) >= MAX_IDLE_BUCKETS:
+                now = time.monotonic()
+                for key, b in list(self._buckets.items()):
+                    b.refill(now)
+                    if b.idle():
+                        del self._buckets[key]
+            bucket = self._buckets[(access_token, endpoint)] = TokenBucket(self.rates[endpoint])
+        return bucket
+
+    def _enqueue(self, access_token: str, endpoint: Endpoint, priority: Priority, expires: float, wake: Callable[[], None]) -> tuple[TokenBucket, _Waiter] | None:
+        """Take a token straight away (None), or join the queue; reject if the deadline is out of reach."""
+        metrics = self._metrics[endpoint]
+        with self._lock:
+            bucket = self._bucket(access_token, endpoint)
+            now = time.monotonic()
+            bucket.refill(now)
+            if not bucket.waiters and bucket.tokens >= 1:
+                bucket.tokens -= 1
+                metrics.granted += 1
+                metrics.waits.append(0.0)
+                return None
+            waiter = _Waiter(priority, next(self._seq), wake, now)
+            estimate = bucket.estimate(waiter)
+            if now + estimate > expires:
+                metrics.rejected += 1
+                raise RateLimitExceeded(endpoint, estimate)
+            heapq.heappush(bucket.waiters, waiter)
+            return bucket, waiter
+
+    def _poll(self, bucket: TokenBucket, endpoint: Endpoint, waiter: _Waiter, expires: float) -> float | None:
+        """Take the token if it's our turn (None), else how long to sleep before checking again."""
+        metrics = self._metrics[endpoint]
+        with self._lock:
+            now = time.monotonic()
+            bucket.refill(now)
+            if bucket.waiters[0] is waiter and bucket.tokens >= 1:
+                bucket.tokens -= 1
+                heapq.heappop(bucket.waiters)
+                metrics.granted += 1
+                metrics.waits.append(now - waiter.enqueued)
+                if bucket.waiters:
+                    bucket.waiters[0].wake()
+                return None
+            if now >= expires:
+                # Overtaken by higher-priority callers; give up with an honest estimate
+                estimate = bucket.estimate(waiter)
+                self._remove(bucket, waiter)
+                metrics.rejected += 1
+                raise RateLimitExceeded(endpoint, estimate)
+            if bucket.waiters[0] is waiter:
+                return min(expires - now, (1 - bucket.tokens) / bucket.rate)
+            # Not at the head: the waiter ahead of us wakes us when it's served
+            return expires - now
+
+    def _leave(self, bucket: TokenBucket, waiter: _Waiter) -> None:
+        with self._lock:
+            self._remove(bucket, waiter)
+
+    def _remove(self, bucket: TokenBucket, waiter: _Waiter) -> None:
+        # Called with the lock held; a no-op once the waiter is served or already gone
+        if waiter not in bucket.waiters:
+            return
+        head = bucket.waiters[0] is waiter
+        bucket.waiters.remove(waiter)
+        heapq.heapify(bucket.waiters)
+        if head and bucket.waiters:
+            bucket.waiters[0].wake()
+
+    def _throttled(self, access_token: str, endpoint: Endpoint) -> None:
+        # Kite disagrees with our accounting (other clients on the same key, clock skew);
+        # empty the bucket so everyone queued backs off for a full interval
+        with self._lock:
+            bucket = self._bucket(access_token, endpoint)
+            bucket.refill(time.monotonic())
+            bucket.tokens = min(bucket.tokens, 0.0)
+            self._metrics[endpoint].throttled += 1
+
+
+# Export a singleton instance
+KITE_SCHEDULER = KiteScheduler.singleton()
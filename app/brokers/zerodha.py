@@ -1,14 +1,27 @@
 
 
+import asyncio
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 from enum import Enum
-from typing import Any
+import itertools
+from typing import Any, AsyncIterator, Callable, Iterator
 from kiteconnect import KiteConnect
+from kiteconnect import exceptions as kite_exceptions
+from requests.adapters import HTTPAdapter
+from sqlalchemy.exc import SQLAlchemyError
 
-from app.brokers.instruments import INSTRUMENT_STORE
-from app.constants import USER_ACCESS_TOKEN, ZERODHA_API_KEY
+from app.brokers.instruments import INSTRUMENT_STORE, Instrument, InstrumentsPayload
+from app.brokers.kite_async import AsyncKite
+from app.brokers.quotes import QUOTE_AGGREGATOR
+from app.brokers.scheduler import KITE_SCHEDULER, Endpoint, Priority, RateLimitExceeded
+from app.constants import BROKER_HTTP_POOL_SIZE, HISTORY_CHUNK_CONCURRENCY, TZONE_INDIA, USER_ACCESS_TOKEN, ZERODHA_API_KEY
+from app.db.models import Candle
 from app.models.ticker import OptionType, Underlying
-from app.utils import timer
+from app.repository.candle_repository import CANDLE_STORE
+from app.utils import SingleFlight, timer
 
 class Interval(Enum):
     MINUTE = 'minute'
@@ -20,74 +33,311 @@ class Interval(Enum):
     MINUTES30 = '30minute'
     MINUTES60 = '60minute'
 
-def instrumentKey(instrument: dict[str,Any] | None) -> str:
+# Longest range Kite serves in one historical call, per interval
+MAX_SPAN_DAYS = {
+    Interval.MINUTE: 60,
+    Interval.MINUTES3: 100,
+    Interval.MINUTES5: 100,
+    Interval.MINUTES10: 100,
+    Interval.MINUTES15: 200,
+    Interval.MINUTES30: 200,
+    Interval.MINUTES60: 400,
+    Interval.DAY: 2000,
+}
+
+# Runs the chunks of long sync history fetches; each fetch keeps only a few in flight
+CHUNK_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="history-chunk")
+
+def instrumentKey(instrument: Instrument | None) -> str:
     if not instrument:
         return ""
-    return f"{instrument['exchange']}:{instrument['tradingsymbol']}"
+    return f"{instrument.exchange}:{instrument.tradingsymbol}"
+
+def instrumentToken(instrument: Instrument) -> int:
+    return instrument.instrument_token
+
+def indiaTime(value: datetime.datetime) -> datetime.datetime:
+    # Kite reads naive datetimes as IST
+    if value.tzinfo is None:
+        return value.replace(tzinfo=TZONE_INDIA)
+    return value.astimezone(TZONE_INDIA)
+
+def historyRange(from_date: datetime.datetime, to_date: datetime.datetime) -> tuple[datetime.datetime, datetime.datetime]:
+    """
+    A history range in IST, its end cut to the minute: candles start on the
+    minute, so no candle is lost, and "up to now" requests made within the
+    same minute get the same range and can share a flight.
+    """
+    from_date = indiaTime(from_date)
+    return from_date, max(from_date, indiaTime(to_date).replace(second=0, microsecond=0))
+
+def historySpans(from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Split [from_date, to_date] into ranges Kite accepts in one call. Each
+    range ends a second before the next starts, so no candle is in two.
+    """
+    span = datetime.timedelta(days=MAX_SPAN_DAYS[interval])
+    second = datetime.timedelta(seconds=1)
+    spans = []
+    start = from_date
+    while start + span - second < to_date:
+        spans.append((start, start + span - second))
+        start += span
+    spans.append((start, to_date))
+    return spans
+
+
+def splitToday(from_date: datetime.datetime, to_date: datetime.datetime) -> tuple[tuple[datetime.datetime, datetime.datetime] | None, tuple[datetime.datetime, datetime.datetime] | None]:
+    """
+    [from_date, to_date] split into the part before today, whose candles are
+    final and go through the candle store, and today's, which is always
+    fetched live; None for a part the range doesn't cover.
+    """
+    today = datetime.datetime.now(TZONE_INDIA).replace(hour=0, minute=0, second=0, microsecond=0)
+    stored = (from_date, min(to_date, today - datetime.timedelta(seconds=1))) if from_date < today else None
+    live = (max(from_date, today), to_date) if to_date >= today else None
+    return stored, live
+
+
+def stitchHistory(parts: list[list[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """Concatenate consecutive chunks, dropping candles a chunk repeats from the one before."""
+    records: list[dict[str, Any]] = []
+    for part in parts:
+        if records and part and part[0]["date"] <= records[-1]["date"]:
+            last = records[-1]["date"]
+            part = [record for record in part if record["date"] > last]
+        records.extend(part)
+    return records
+
+
+def sharedError(e: Exception) -> bool:
+    """Whether a failed history call fails the same way for every user, or only for the caller's token."""
+    return not isinstance(e, (kite_exceptions.TokenException, kite_exceptions.PermissionException, RateLimitExceeded))
 
-def instrumentToken(instrument: dict[str,Any]) -> int:
-    return instrument['instrument_token']
+
+# Identical history calls in flight at once (many users opening the same chart) share one.
+# The key leaves out the access token on purpose: every user is on the same Kite app, so
+# historical data is equally available to all, and the leader's token fetches for everyone.
+# Errors that depend on the leader's token aren't shared (see sharedError).
+HISTORY_FLIGHTS = SingleFlight(share=sharedError)
+
+
+def candleRecord(candle: Candle) -> dict[str, Any]:
+    """A stored candle in the shape kite.historical_data returns."""
+    return {
+        "date": indiaTime(candle.timestamp),
+        "open": candle.open,
+        "high": candle.high,
+        "low": candle.low,
+        "close": candle.close,
+        "volume": candle.volume,
+    }
 
 
 class Broker:
-    def __init__(self, api_key: str = ZERODHA_API_KEY, access_token: str = USER_ACCESS_TOKEN):
-        self.kite = KiteConnect(api_key=api_key, access_token=access_token)
+    def __init__(self, api_key: str = ZERODHA_API_KEY, access_token: str = USER_ACCESS_TOKEN, root: str | None = None):
+        # Straddle legs share a broker across threads, so keep enough keep-alive connections for them
+        pool = {"pool_connections": 1, "pool_maxsize": BROKER_HTTP_POOL_SIZE}
+        self.kite = KiteConnect(api_key=api_key, access_token=access_token, root=root, pool=pool)
+        if root and root.startswith("http://"):
+            self.kite.reqsession.mount("http://", HTTPAdapter(**pool))
     
-    def findOption(self, expiry: str, strike: float, option_type: OptionType, underlying: Underlying) -> dict[str, Any] | None:
-        instruments = INSTRUMENT_STORE.instruments()
-        instrumentsList = instruments.get(underlying, {}).get(option_type, {}).get(str(expiry), [])
-        opts = []
-        for ins in instrumentsList:
-            if int(round(ins.get("strike", 0))) == int(round(strike)):
-                opts.append(ins)
-        if not opts:
-            return None
-        return opts[0]
+    def close(self) -> None:
+        self.kite.reqsession.close()
+    
+    def findOption(self, expiry: str, strike: float, option_type: OptionType, underlying: Underlying) -> Instrument | None:
+        return INSTRUMENT_STORE.option(underlying, option_type, expiry, strike)
 
-    def findOptions(self, expiry: str, option_type: OptionType, underlying: Underlying) -> list[Any]:
+    def findOptions(self, expiry: str, option_type: OptionType, underlying: Underlying) -> list[Instrument]:
         instruments = INSTRUMENT_STORE.instruments()
         return instruments.get(underlying, {}).get(option_type, {}).get(str(expiry), [])
     
     def findEarliestExpiry(self, underlying: Underlying) -> str | None:
-        instruments = INSTRUMENT_STORE.instruments()
-        now = str(datetime.datetime.now())
-        expiries: set[str] = set()
-        for option_type in instruments.get(underlying, {}):
-            for expiry_str in instruments[underlying][option_type]:
-                if expiry_str >= now:
-                    expiries.add(expiry_str)
-        if not expiries:
+        expiries = INSTRUMENT_STORE.expiries(underlying)
+        # first expiry string >= now, same comparison as before but on a sorted list
+        i = bisect_left(expiries, str(datetime.datetime.now()))
+        if i == len(expiries):
             return None
-        return min(expiries)
+        return expiries[i]
     
-    def findStock(self, underlying: Underlying) -> dict[str, Any]:
+    def findStock(self, underlying: Underlying) -> Instrument:
         return INSTRUMENT_STORE.stocks()[underlying]
     
     def instruments(self, force_reload: bool = False) -> list[dict[str, Any]]:
         if force_reload:
             INSTRUMENT_STORE.load()
-        instruments = INSTRUMENT_STORE.instruments()
-        stocks = INSTRUMENT_STORE.stocks()
-        # convert nested _instruments to flat array
-        insts = [
-            ins
-            for opt_types in instruments.values()
-            for expiries in opt_types.values()
-            for ins_list in expiries.values()
-            for ins in ins_list
-        ]
-        insts.extend(stocks.values())
-        return insts
+        return INSTRUMENT_STORE.rows()
+    
+    def instrumentsPayload(self, force_reload: bool = False) -> InstrumentsPayload:
+        if force_reload:
+            INSTRUMENT_STORE.load()
+        return INSTRUMENT_STORE.payload()
+    
+    def instrumentRows(self) -> Iterator[dict[str, Any]]:
+        return INSTRUMENT_STORE.iterRows()
     
     @timer
     def profile(self):
-        return self.kite.profile()
+        return KITE_SCHEDULER.call(self.kite.access_token, Endpoint.DEFAULT, Priority.INTERACTIVE, self.kite.profile)
         
     @timer
     def quote(self, *instruments: str):
         # TODO: make this separate for options and stocks
-        return self.kite.quote(instruments)
+        return QUOTE_AGGREGATOR.quote(self.kite, instruments)
     
     @timer
     def history(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval = Interval.MINUTE):
-        return self.kite.historical_data(instrument_token, from_date, to_date, interval.value)
+        from_date, to_date = historyRange(from_date, to_date)
+        return HISTORY_FLIGHTS.do((instrument_token, from_date, to_date, interval), self._history, instrument_token, from_date, to_date, interval)
+    
+    def _history(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval) -> list[dict[str, Any]]:
+        stored, live = splitToday(from_date, to_date)
+        records = []
+        if stored:
+            records.extend(self._storedHistory(instrument_token, *stored, interval))
+        if live:
+            records.extend(self._fetchHistory(instrument_token, *live, interval))
+        return records
+    
+    def _fetchHistory(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval, priority: Priority = Priority.INTERACTIVE) -> list[dict[str, Any]]:
+        spans = historySpans(from_date, to_date, interval)
+        if len(spans) == 1:
+            return self._fetchSpan(instrument_token, from_date, to_date, interval, priority)
+        return stitchHistory(list(self._inOrder(self._fetchSpan, instrument_token, spans, interval, priority)))
+    
+    def _fetchSpan(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval, priority: Priority = Priority.INTERACTIVE) -> list[dict[str, Any]]:
+        return KITE_SCHEDULER.call(self.kite.access_token, Endpoint.HISTORICAL, priority, self.kite.historical_data, instrument_token, from_date, to_date, interval.value)
+    
+    def _inOrder(self, fetch: Callable[..., list[dict[str, Any]]], instrument_token: int, spans, interval: Interval, *args) -> Iterator[list[dict[str, Any]]]:
+        # A few spans in flight at a time, so later ones don't queue past the rate-limit deadline
+        pending = iter(spans)
+        futures = deque(CHUNK_EXECUTOR.submit(fetch, instrument_token, start, end, interval, *args) for start, end in itertools.islice(pending, HISTORY_CHUNK_CONCURRENCY))
+        try:
+            while futures:
+                records = futures.popleft().result()
+                for start, end in itertools.islice(pending, 1):
+                    futures.append(CHUNK_EXECUTOR.submit(fetch, instrument_token, start, end, interval, *args))
+                yield records
+        finally:
+            # A span failed or the caller stopped early; spans not yet started needn't spend rate budget
+            for future in futures:
+                future.cancel()
+    
+    def _storedHistory(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval) -> list[dict[str, Any]]:
+        if not CANDLE_STORE.available():
+            return self._fetchHistory(instrument_token, from_date, to_date, interval)
+        try:
+            # Only the sub-ranges never fetched before go to Kite
+            gaps = self._storedGaps(instrument_token, from_date, to_date, interval)
+            fetched = [self._fetchHistory(instrument_token, start, end, interval, Priority.BACKFILL) for start, end in gaps]
+            return self._storeAndRead(instrument_token, from_date, to_date, interval, gaps, fetched)
+        except SQLAlchemyError as e:
+            # Without the store, behave as before and ask Kite for the whole span
+            print(f"[CANDLES] Store unavailable, fetching directly: {e}")
+            return self._fetchHistory(instrument_token, from_date, to_date, interval)
+    
+    def _storedGaps(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval) -> list[tuple[datetime.datetime, datetime.datetime]]:
+        gaps = CANDLE_STORE.gaps(instrument_token, interval.value, from_date, to_date)
+        # Stored bounds come back in the DB timezone; Kite needs IST wall time
+        return [(indiaTime(start), indiaTime(end)) for start, end in gaps]
+    
+    def _storeAndRead(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval, gaps, fetched) -> list[dict[str, Any]]:
+        return [candleRecord(c) for c in CANDLE_STORE.fill(instrument_token, interval.value, from_date, to_date, gaps, fetched)]
+
+
+class AsyncBroker(Broker):
+    """
+    Broker for the event loop: same lookups, but profile, quote and history
+    are coroutines on a pooled async HTTP client, so a slow Kite response
+    holds no thread. Candle store reads and writes still run in threads.
+    """
+    def __init__(self, api_key: str = ZERODHA_API_KEY, access_token: str = USER_ACCESS_TOKEN, root: str | None = None):
+        super().__init__(api_key, access_token, root)
+        self.akite = AsyncKite(self.kite)
+        self._loop: asyncio.AbstractEventLoop | None = None
+    
+    def close(self) -> None:
+        super().close()
+        # The async client belongs to the loop that used it; close it there
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(lambda: loop.create_task(self.akite.aclose()))
+    
+    async def aclose(self) -> None:
+        super().close()
+        await self.akite.aclose()
+    
+    @timer
+    async def profile(self):
+        self._bind()
+        return await KITE_SCHEDULER.callAsync(self.kite.access_token, Endpoint.DEFAULT, Priority.INTERACTIVE, self.akite.profile)
+    
+    @timer
+    async def quote(self, *instruments: str):
+        self._bind()
+        return await QUOTE_AGGREGATOR.quoteAsync(self.akite, instruments)
+    
+    @timer
+    async def history(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval = Interval.MINUTE):
+        self._bind()
+        from_date, to_date = historyRange(from_date, to_date)
+        return await HISTORY_FLIGHTS.doAsync((instrument_token, from_date, to_date, interval), self._history, instrument_token, from_date, to_date, interval)
+    
+    async def _history(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval) -> list[dict[str, Any]]:
+        stored, live = splitToday(from_date, to_date)
+        parts = []
+        if stored:
+            parts.append(self._storedHistory(instrument_token, *stored, interval))
+        if live:
+            parts.append(self._fetchHistory(instrument_token, *live, interval))
+        return [record for part in await asyncio.gather(*parts) for record in part]
+    
+    async def historyParts(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval = Interval.MINUTE) -> AsyncIterator[list[dict[str, Any]]]:
+        self._bind()
+        from_date, to_date = historyRange(from_date, to_date)
+        last = None
+        async for records in self._inOrder(self.history, instrument_token, historySpans(from_date, to_date, interval), interval):
+            if last is not None:
+                records = [record for record in records if record["date"] > last]
+            if records:
+                last = records[-1]["date"]
+            yield records
+    
+    async def _fetchHistory(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval, priority: Priority = Priority.INTERACTIVE) -> list[dict[str, Any]]:
+        spans = historySpans(from_date, to_date, interval)
+        if len(spans) == 1:
+            return await self._fetchSpan(instrument_token, from_date, to_date, interval, priority)
+        return stitchHistory([part async for part in self._inOrder(self._fetchSpan, instrument_token, spans, interval, priority)])
+    
+    async def _fetchSpan(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval, priority: Priority = Priority.INTERACTIVE) -> list[dict[str, Any]]:
+        return await KITE_SCHEDULER.callAsync(self.kite.access_token, Endpoint.HISTORICAL, priority, self.akite.historical_data, instrument_token, from_date, to_date, interval.value)
+    
+    async def _inOrder(self, fetch: Callable[..., Any], instrument_token: int, spans, interval: Interval, *args) -> AsyncIterator[list[dict[str, Any]]]:
+        pending = iter(spans)
+        tasks = deque(asyncio.ensure_future(fetch(instrument_token, start, end, interval, *args)) for start, end in itertools.islice(pending, HISTORY_CHUNK_CONCURRENCY))
+        try:
+            while tasks:
+                records = await tasks.popleft()
+                for start, end in itertools.islice(pending, 1):
+                    tasks.append(asyncio.ensure_future(fetch(instrument_token, start, end, interval, *args)))
+                yield records
+        finally:
+            # Cancelled spans leave their scheduler queue; wait for that so none is left queued
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _storedHistory(self, instrument_token: int, from_date: datetime.datetime, to_date: datetime.datetime, interval: Interval) -> list[dict[str, Any]]:
+        if not CANDLE_STORE.available():
+            return await self._fetchHistory(instrument_token, from_date, to_date, interval)
+        try:
+            gaps = await asyncio.to_thread(self._storedGaps, instrument_token, from_date, to_date, interval)
+            fetched = await asyncio.gather(*(self._fetchHistory(instrument_token, start, end, interval, Priority.BACKFILL) for start, end in gaps))
+            return await asyncio.to_thread(self._storeAndRead, instrument_token, from_date, to_date, interval, gaps, fetched)
+        except SQLAlchemyError as e:
+            print(f"[CANDLES] Store unavailable, fetching directly: {e}")
+            return await self._fetchHistory(instrument_token, from_date, to_date, interval)
+    
+    def _bind(self) -> None:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
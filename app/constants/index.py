@@ -13,6 +13,67 @@ USER_ACCESS_TOKEN = os.getenv("USER_ACCESS_TOKEN", "---MISSING---")
 FRONTEND_URLS = os.getenv("FRONTEND_URLS", "*")
 ALLOWED_ORIGINS = [url.strip() for url in FRONTEND_URLS.split(",")] if FRONTEND_URLS != "*" else ["*"]
 CLERK_SECRET_KEY = os.getenv('CLERK_SECRET_KEY')
+# Session tokens are verified locally against this JWKS, refetched this often
+CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL", "https://api.clerk.com/v1/jwks")
+CLERK_JWKS_REFRESH_SECONDS = int(os.getenv("CLERK_JWKS_REFRESH_SECONDS", "3600"))
+
+# Local snapshot of the filtered instrument dump, reused across same-day restarts.
+# Set to an empty string to always download from Kite.
+INSTRUMENTS_SNAPSHOT_PATH = os.getenv("INSTRUMENTS_SNAPSHOT_PATH", ".cache/instruments.pickle")
+
+# Quote requests within this window share one upstream call, and results are
+# reused for the TTL. Set the TTL to 0 to disable caching.
+QUOTE_BATCH_WINDOW_MS = int(os.getenv("QUOTE_BATCH_WINDOW_MS", "20"))
+QUOTE_CACHE_TTL_MS = int(os.getenv("QUOTE_CACHE_TTL_MS", "500"))
+
+# Brokers (and their keep-alive connections to Kite) kept for this many access
+# tokens, and the connections each one keeps open
+BROKER_POOL_SIZE = int(os.getenv("BROKER_POOL_SIZE", "256"))
+BROKER_HTTP_POOL_SIZE = int(os.getenv("BROKER_HTTP_POOL_SIZE", "16"))
+# Concurrent connections to Kite per access token on the async path; further calls queue
+KITE_ASYNC_MAX_CONNECTIONS = int(os.getenv("KITE_ASYNC_MAX_CONNECTIONS", "100"))
+
+# Longest a Kite call waits for its per-token rate-limit slot before the request
+# is turned away with 429 and a Retry-After
+UPSTREAM_DEADLINE_SECONDS = float(os.getenv("UPSTREAM_DEADLINE_SECONDS", "5"))
+
+# Kite caps each historical call's range (60 days of minute candles, ...); longer
+# ranges are split and this many chunks per request are fetched at once
+HISTORY_CHUNK_CONCURRENCY = int(os.getenv("HISTORY_CHUNK_CONCURRENCY", "3"))
+
+# After a candle store error, history skips the store and goes straight to Kite for
+# this long, instead of every call waiting out a database connect timeout
+CANDLE_STORE_BACKOFF_SECONDS = float(os.getenv("CANDLE_STORE_BACKOFF_SECONDS", "30"))
+
+# Access tokens cached per worker; update_token refreshes the entry and notifies
+# the other workers, the TTL only bounds how long a missed notification can last
+USER_TOKEN_CACHE_SIZE = int(os.getenv("USER_TOKEN_CACHE_SIZE", "10000"))
+USER_TOKEN_CACHE_TTL_SECONDS = int(os.getenv("USER_TOKEN_CACHE_TTL_SECONDS", "300"))
+
+# Bulk snapshot writes: queued batches are committed together once this many rows
+# are waiting or the oldest has waited this long; past the queue limit, 503
+SNAPSHOT_WRITER_BATCH_ROWS = int(os.getenv("SNAPSHOT_WRITER_BATCH_ROWS", "20000"))
+SNAPSHOT_WRITER_FLUSH_MS = int(os.getenv("SNAPSHOT_WRITER_FLUSH_MS", "50"))
+SNAPSHOT_WRITER_QUEUE_BATCHES = int(os.getenv("SNAPSHOT_WRITER_QUEUE_BATCHES", "1000"))
+# Most snapshots one bulk request may carry, and the largest body it may send;
+# bigger bodies are turned away before they're read
+SNAPSHOT_BULK_MAX_ROWS = int(os.getenv("SNAPSHOT_BULK_MAX_ROWS", "100000"))
+SNAPSHOT_BULK_MAX_BYTES = int(os.getenv("SNAPSHOT_BULK_MAX_BYTES", str(SNAPSHOT_BULK_MAX_ROWS * 128)))
+
+# Background straddle recorder: during market hours, samples the ATM straddle and
+# STRADDLE_RECORDER_WIDTH strikes either side of each underlying every
+# STRADDLE_RECORDER_INTERVAL_SECONDS into price_snapshots and 1/5-minute price_bars.
+# Off by default; with several workers only one records at a time.
+STRADDLE_RECORDER_ENABLED = os.getenv("STRADDLE_RECORDER_ENABLED", "false").lower() in ("1", "true", "yes")
+STRADDLE_RECORDER_UNDERLYINGS = [u.strip() for u in os.getenv("STRADDLE_RECORDER_UNDERLYINGS", "NIFTY,SENSEX").split(",") if u.strip()]
+STRADDLE_RECORDER_WIDTH = int(os.getenv("STRADDLE_RECORDER_WIDTH", "5"))
+STRADDLE_RECORDER_INTERVAL_SECONDS = float(os.getenv("STRADDLE_RECORDER_INTERVAL_SECONDS", "5"))
+
+# Annual risk-free rate, continuously compounded, for option implied volatility and Greeks
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", "0.065"))
+
+# Upstream for the live straddle feed: "kite" (KiteTicker) or "fake" (random walk, no network)
+LIVE_TICK_SOURCE = os.getenv("LIVE_TICK_SOURCE", "kite")
 
 # Database
 POSTGRES_CONNECTION = os.getenv("POSTGRES_CONNECTION", "")
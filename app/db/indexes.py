@@ -0,0 +1,43 @@
+"""
+Indexes added to tables that already exist.
+
+`create_all` skips existing tables, and with them any index added to a
+model since. On Postgres those are built with CREATE INDEX CONCURRENTLY, so
+writes to a large table carry on while the index builds, by whichever worker
+takes the advisory lock first; the others leave it to that worker.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from app.db.base import Base
+from app.db.engine import engine
+
+# pg_try_advisory_lock key held by the worker building indexes
+INDEX_LOCK_ID = 0x494E444558  # "INDEX"
+
+
+def createIndexes() -> None:
+    if engine.dialect.name != "postgresql":
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+        return
+    # CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": INDEX_LOCK_ID}).scalar():
+            return
+        try:
+            # A concurrent build that died leaves an invalid index IF NOT EXISTS would skip
+            invalid = set(conn.execute(text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+            )).scalars())
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    if index.name in invalid:
+                        print(f"[DB] Rebuilding invalid index {index.name}")
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+                    conn.execute(text(ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)))
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": INDEX_LOCK_ID})
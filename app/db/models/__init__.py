@@ -1,7 +1,12 @@
+from .candle import Candle, CandleRange
+from .price_bar import PriceBar
 from .price_snapshot import PriceSnapshot
 from .user_token import UserToken
 
 __all__ = [
+    "Candle",
+    "CandleRange",
+    "PriceBar",
     "PriceSnapshot",
     "UserToken",
 ]
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Float, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class Candle(Base):
+    __tablename__ = "candles"
+
+    instrument_token: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    interval: Mapped[str] = mapped_column(String(16), primary_key=True)
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    open: Mapped[float] = mapped_column(Float)
+    high: Mapped[float] = mapped_column(Float)
+    low: Mapped[float] = mapped_column(Float)
+    close: Mapped[float] = mapped_column(Float)
+    volume: Mapped[int] = mapped_column(BigInteger)
+
+
+class CandleRange(Base):
+    """A closed [from_time, to_time] span already fetched from Kite, candles or not."""
+    __tablename__ = "candle_ranges"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    instrument_token: Mapped[int] = mapped_column(BigInteger, index=True)
+    interval: Mapped[str] = mapped_column(String(16))
+    from_time: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    to_time: Mapped[datetime] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,111 @@
+"""
+Postgres LISTEN/NOTIFY between workers.
+
+Each uvicorn worker keeps per-process caches. When one worker changes the
+data behind a cache it sends a NOTIFY in the same transaction, and every
+worker's listener thread receives it once the transaction commits.
+"""
+
+import json
+import os
+import threading
+import uuid
+from typing import Any, Callable
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .engine import engine
+
+# Identifies this process, so a worker can skip its own notifications
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+RECONNECT_SECONDS = 5
+# How long a wait for notifications blocks before checking for shutdown
+POLL_SECONDS = 1.0
+
+Handler = Callable[[dict[str, Any]], None]
+
+
+def supported() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def notify(session: Session, channel: str, payload: dict[str, Any]) -> None:
+    """Queue a notification; Postgres delivers it when the session commits."""
+    if not supported():
+        return
+    message = json.dumps({**payload, "origin": WORKER_ID})
+    session.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": channel, "message": message})
+
+
+class NotificationListener:
+    """Background thread dispatching NOTIFY payloads from other workers to handlers."""
+    def __init__(self):
+        self._handlers: dict[str, list[Handler]] = {}
+        self._resync: list[Callable[[], None]] = []
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+
+    def on(self, channel: str, handler: Handler, resync: Callable[[], None] | None = None) -> None:
+        """
+        Call `handler` for each notification on `channel`. `resync` runs
+        whenever the connection is (re)established, since anything sent
+        while we weren't listening is lost.
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+        if resync:
+            self._resync.append(resync)
+
+    def start(self) -> None:
+        if self._thread is not None or not self._handlers or not supported():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    for channel in self._handlers:
+                        connection.execute(f'LISTEN "{channel}"')
+                    for resync in self._resync:
+                        resync()
+                    while not self._stopped.is_set():
+                        for notification in connection.notifies(timeout=POLL_SECONDS):
+                            self._dispatch(notification.channel, notification.payload)
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                print(f"[NOTIFY] Listener disconnected, retrying in {RECONNECT_SECONDS}s: {e}")
+                self._stopped.wait(RECONNECT_SECONDS)
+
+    def _dispatch(self, channel: str, raw: str) -> None:
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            print(f"[NOTIFY] Ignoring malformed payload on {channel}: {raw!r}")
+            return
+        if payload.get("origin") == WORKER_ID:
+            return
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"[NOTIFY] Handler for {channel} failed: {e}")
+
+
+# Export a singleton instance
+NOTIFICATION_LISTENER = NotificationListener.singleton()
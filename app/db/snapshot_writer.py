@@ -0,0 +1,146 @@
+"""
+Background writer for price snapshots.
+
+Callers hand rows to a queue and get a future back; one thread drains the
+queue and writes whatever has accumulated in a single COPY and commit, so
+thousands of snapshots a second cost a handful of transactions instead of
+one each. If a group fails, its submissions are retried one by one, so a
+bad row only fails the caller that sent it. Rows can also be folded into price_bars in the same commit, so
+the bars never disagree with the snapshots they were built from.
+"""
+
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.constants import SNAPSHOT_WRITER_BATCH_ROWS, SNAPSHOT_WRITER_FLUSH_MS, SNAPSHOT_WRITER_QUEUE_BATCHES
+from app.repository.price_bar_repository import PriceBarRepository
+from app.repository.price_snapshot_repository import PriceSnapshotRepository, SnapshotRow
+
+from .engine import engine
+
+
+class WriterBusy(Exception):
+    """The queue is full; the database isn't keeping up."""
+
+
+class SnapshotWriter:
+    """Single thread batching queued snapshot rows into grouped commits."""
+    def __init__(self, batch_rows: int = SNAPSHOT_WRITER_BATCH_ROWS, flush_ms: int = SNAPSHOT_WRITER_FLUSH_MS, max_batches: int = SNAPSHOT_WRITER_QUEUE_BATCHES):
+        self.batch_rows = batch_rows
+        self.flush = flush_ms / 1000
+        self._queue: queue.Queue[tuple[list[SnapshotRow], Future, bool] | None] = queue.Queue(max_batches)
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+
+    def submit(self, rows: list[SnapshotRow], bars: bool = False) -> Future:
+        """
+        Queue rows for the next commit, and with `bars` their 1- and 5-minute
+        price bars; the future resolves to the row count once they're committed.
+        """
+        future: Future = Future()
+        if not rows:
+            future.set_result(0)
+            return future
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait((rows, future, bars))
+        except queue.Full:
+            raise WriterBusy(f"Snapshot writer has {self._queue.qsize()} batches queued")
+        return future
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write everything already queued, then stop."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending = [item]
+            count = len(item[0])
+            # Keep collecting until the batch is full or has waited long enough
+            deadline = time.monotonic() + self.flush
+            stopping = False
+            while count < self.batch_rows:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                pending.append(item)
+                count += len(item[0])
+            try:
+                self._write(pending)
+            except Exception as e:
+                # One bad batch mustn't end the only writer thread
+                print(f"[SNAPSHOTS] Writer error: {e}")
+            if stopping:
+                return
+
+    def _write(self, pending: list[tuple[list[SnapshotRow], Future, bool]]) -> None:
+        # A caller that stopped waiting (client gone, shutdown) cancels its future; those
+        # rows were never acknowledged, so drop them rather than resolve a cancelled future
+        pending = [item for item in pending if item[1].set_running_or_notify_cancel()]
+        if not pending:
+            return
+        try:
+            self._commit(pending)
+        except Exception as e:
+            # A bad row rolls back the whole group; retry each submission alone so only its
+            # caller sees the error. Not worth it when the database itself is unreachable.
+            if len(pending) == 1 or isinstance(e, OperationalError):
+                self._fail(pending, e)
+                return
+            for item in pending:
+                try:
+                    self._commit([item])
+                except Exception as error:
+                    self._fail([item], error)
+                else:
+                    item[1].set_result(len(item[0]))
+            return
+        for rows, future, _ in pending:
+            future.set_result(len(rows))
+
+    def _commit(self, pending: list[tuple[list[SnapshotRow], Future, bool]]) -> None:
+        with Session(engine) as session:
+            PriceSnapshotRepository(session).add_rows(row for rows, _, _ in pending for row in rows)
+            bar_repo = PriceBarRepository(session)
+            for rows, _, bars in pending:
+                # One submission at a time: a bar may only be upserted once per statement
+                if bars:
+                    bar_repo.add_samples(rows)
+            session.commit()
+
+    def _fail(self, pending: list[tuple[list[SnapshotRow], Future, bool]], e: Exception) -> None:
+        print(f"[SNAPSHOTS] Dropped {sum(len(rows) for rows, _, _ in pending)} rows: {e}")
+        for _, future, _ in pending:
+            future.set_exception(e)
+
+
+# Export a singleton instance
+SNAPSHOT_WRITER = SnapshotWriter.singleton()
@@ -5,18 +5,43 @@ This module creates and configures the FastAPI application instance.
 All routes from different routers are included here.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 import time
 from fastapi import FastAPI, Request, logger
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import health, ticker, zerodha
+from app.api import health, live, ticker, zerodha
+from app.brokers.instruments import INSTRUMENT_STORE
+from app.brokers.pool import ASYNC_BROKER_POOL
 from app.constants.index import ALLOWED_ORIGINS
 from app.db import Base, engine, SessionLocal
+from app.db.indexes import createIndexes
+from app.db.notifications import NOTIFICATION_LISTENER
+from app.db.snapshot_writer import SNAPSHOT_WRITER
+from app.services.straddle_recorder import STRADDLE_RECORDER
 from sqlalchemy import text
 
+async def create_indexes():
+    # Concurrent builds on a large table can take a while; don't hold up startup for them
+    try:
+        await asyncio.to_thread(createIndexes)
+    except Exception as e:
+        print(f"[DB] Index creation failed: {e}")
+
+
+async def load_instruments():
+    # Runs in a worker thread so the server can bind and answer /health meanwhile
+    try:
+        await asyncio.to_thread(INSTRUMENT_STORE.ensure_loaded)
+    except Exception as e:
+        # Requests will retry the load on first use
+        print(f"[INSTRUMENTS] Startup load failed: {e}")
+
+
 # Create FastAPI application instance
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    instruments_task = asyncio.create_task(load_instruments())
     # Startup: create tables and test connection
     try:
         Base.metadata.create_all(bind=engine)
@@ -27,7 +52,24 @@ async def lifespan(app: FastAPI):
         # Defer raising; app can still run without DB for non-DB routes
         # but log the error so it's visible in server output.
         print(f"[DB] Startup check failed: {e}")
+    indexes_task = asyncio.create_task(create_indexes())
+    # Cache invalidations from other workers
+    NOTIFICATION_LISTENER.start()
+    SNAPSHOT_WRITER.start()
+    # Straddle prices into our own tables, if enabled
+    STRADDLE_RECORDER.start()
     yield
+    # Shutdown: let a sample under way finish before the writer and engine go
+    await asyncio.to_thread(STRADDLE_RECORDER.stop)
+    NOTIFICATION_LISTENER.stop()
+    # Shutdown: commit snapshots still queued
+    await asyncio.to_thread(SNAPSHOT_WRITER.stop)
+    # Shutdown: close async Kite sessions while their loop is still running
+    for broker in ASYNC_BROKER_POOL.drain():
+        await broker.aclose()  # type: ignore[attr-defined]
+    # Shutdown: stop waiting on an unfinished instrument load
+    instruments_task.cancel()
+    indexes_task.cancel()
     # Shutdown: remove session scope
     try:
         SessionLocal.remove()
@@ -49,6 +91,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    # Cross-origin clients can only read these response headers if listed
+    expose_headers=["X-Next-Cursor", "Retry-After", "ETag"],
 )
 
 WARNING_THRESHOLD = 2.0  # 2 second
@@ -74,6 +118,7 @@ async def add_process_time_header(request: Request, call_next):
 # Include routers from different modules
 app.include_router(health.router, tags=["health"])
 app.include_router(ticker.router, prefix='/ticker', tags=["ticker"])
+app.include_router(live.router, prefix='/ticker', tags=["ticker"])
 app.include_router(zerodha.router, prefix='/zerodha', tags=["zerodha"])
 
 
@@ -8,3 +8,20 @@ from pydantic import BaseModel
 class HealthResponse(BaseModel):
     """Response model for health check endpoint."""
     status: str
+    instruments_ready: bool = False
+
+
+class UpstreamEndpointStats(BaseModel):
+    """Scheduler counters for one Kite endpoint, summed over access tokens."""
+    queued: int
+    granted: int
+    rejected: int
+    throttled: int
+    wait_ms_p50: float
+    wait_ms_p95: float
+    wait_ms_max: float
+
+
+class UpstreamHealthResponse(BaseModel):
+    """Response model for the upstream scheduler metrics endpoint."""
+    endpoints: dict[str, UpstreamEndpointStats]
@@ -2,9 +2,10 @@
 Ticker data models.
 """
 
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
-from pydantic import BaseModel
+from typing import Any
+from pydantic import BaseModel, Field
 
 
 class TickerResponse(BaseModel):
@@ -26,4 +27,97 @@ class Underlying(Enum):
 class OptionType(Enum):
     CALL = "CE"
     PUT = "PE"
-   
\ No newline at end of file
+   
+class SnapshotIn(BaseModel):
+    """One price snapshot in a bulk upload; `created_at` defaults to when it's received."""
+    symbol: str = Field(min_length=1, max_length=64)
+    price: float
+    created_at: datetime | None = None
+
+
+class Candle(BaseModel):
+    """One instrument's OHLCV candle, as Kite's historical API returns it."""
+    date: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+class HistoryRow(BaseModel):
+    """One history candle; for a straddle, OHLCV summed across the legs."""
+    tstring: str
+    timestamp: int = Field(description="Epoch milliseconds")
+    price: float
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    records: list[Candle] | None = Field(None, description="Each leg's own candle; left out with raw=false")
+
+class HistoryColumns(BaseModel):
+    """History as parallel arrays, one entry per candle (format=columns)."""
+    timestamp: list[int]
+    price: list[float]
+    open: list[float]
+    high: list[float]
+    low: list[float]
+    close: list[float]
+    volume: list[float]
+
+class CombinedQuote(BaseModel):
+    """Last price of an instrument, or summed across a straddle's legs."""
+    id: str
+    tstring: str
+    timestamp: int = Field(description="Epoch milliseconds")
+    price: float
+    quotes: list[dict[str, Any]] | None = Field(None, description="Kite's full quote per leg; left out with raw=false")
+
+class Straddle(BaseModel):
+    """A strike with both a call and a put in the earliest expiry."""
+    id: str
+    underlying: str
+    strike: float
+    expiry: date | str
+    call: dict[str, Any]
+    put: dict[str, Any]
+
+class LegGreeks(BaseModel):
+    """Black-Scholes implied volatility and Greeks of one option; null where no volatility fits its price."""
+    iv: float | None = Field(description="Annualized, 0.15 = 15%")
+    delta: float | None
+    gamma: float | None
+    vega: float | None = Field(description="Per volatility point")
+    theta: float | None = Field(description="Per calendar day")
+
+class StraddleGreeks(BaseModel):
+    """Each leg's IV and Greeks, and the straddle's as their sums."""
+    call: LegGreeks
+    put: LegGreeks
+    delta: float | None
+    gamma: float | None
+    vega: float | None
+    theta: float | None
+
+class ChainStraddle(BaseModel):
+    """One priced straddle in a chain."""
+    id: str
+    strike: float
+    call_price: float
+    put_price: float
+    tstring: str
+    timestamp: int = Field(description="Epoch milliseconds")
+    price: float = Field(description="call_price + put_price")
+    quotes: list[dict[str, Any]] | None = Field(None, description="Kite's full quote per leg; only with raw=true")
+    greeks: StraddleGreeks | None = Field(None, description="Only with greeks=true")
+
+class StraddleChain(BaseModel):
+    """Earliest-expiry straddles either side of the ATM strike, priced from one quote of spot and legs."""
+    underlying: str
+    expiry: date | str | None
+    spot: float
+    atm: float | None = Field(description="Strike nearest spot")
+    tstring: str
+    timestamp: int = Field(description="Epoch milliseconds, of the spot quote")
+    straddles: list[ChainStraddle]
@@ -6,9 +6,14 @@ providing a clean abstraction over database models and sessions.
 """
 
 from .base import RepositoryBase
+from .candle_repository import CandleRepository, CandleStore
+from .price_bar_repository import PriceBarRepository
 from .price_snapshot_repository import PriceSnapshotRepository
 
 __all__ = [
     "RepositoryBase",
+    "CandleRepository",
+    "CandleStore",
+    "PriceBarRepository",
     "PriceSnapshotRepository",
 ]
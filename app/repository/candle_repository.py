@@ -0,0 +1,150 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import time
+from typing import Any, Iterator
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.constants import CANDLE_STORE_BACKOFF_SECONDS
+from app.db import SessionLocal
+from app.db.models import Candle, CandleRange
+from .base import RepositoryBase
+
+# Chunked fetches end a second before the next one starts; ranges that close count as touching
+ADJACENT = timedelta(seconds=1)
+
+
+class CandleRepository(RepositoryBase[Candle]):
+    def __init__(self, session: Session):
+        super().__init__(session, Candle)
+
+    def between(self, instrument_token: int, interval: str, from_time: datetime, to_time: datetime) -> list[Candle]:
+        stmt = (
+            select(Candle)
+            .where(
+                Candle.instrument_token == instrument_token,
+                Candle.interval == interval,
+                Candle.timestamp >= from_time,
+                Candle.timestamp <= to_time,
+            )
+            .order_by(Candle.timestamp)
+        )
+        return list(self.session.execute(stmt).scalars().all())
+
+    def _ranges(self, instrument_token: int, interval: str, from_time: datetime, to_time: datetime) -> list[CandleRange]:
+        stmt = (
+            select(CandleRange)
+            .where(
+                CandleRange.instrument_token == instrument_token,
+                CandleRange.interval == interval,
+                CandleRange.from_time <= to_time,
+                CandleRange.to_time >= from_time,
+            )
+            .order_by(CandleRange.from_time)
+        )
+        return list(self.session.execute(stmt).scalars().all())
+
+    def gaps(self, instrument_token: int, interval: str, from_time: datetime, to_time: datetime) -> list[tuple[datetime, datetime]]:
+        """Sub-ranges of [from_time, to_time] that have never been fetched."""
+        gaps = []
+        cursor = from_time
+        for r in self._ranges(instrument_token, interval, from_time, to_time):
+            if r.from_time > cursor:
+                gaps.append((cursor, r.from_time))
+            cursor = max(cursor, r.to_time)
+            if cursor >= to_time:
+                break
+        if cursor < to_time:
+            gaps.append((cursor, to_time))
+        return gaps
+
+    def add_candles(self, instrument_token: int, interval: str, records: list[dict[str, Any]]) -> None:
+        if not records:
+            return
+        rows = [
+            {
+                "instrument_token": instrument_token,
+                "interval": interval,
+                "timestamp": record["date"],
+                "open": record["open"],
+                "high": record["high"],
+                "low": record["low"],
+                "close": record["close"],
+                "volume": record["volume"],
+            }
+            for record in records
+        ]
+        # Boundary candles of adjacent fetches overlap; keep whichever landed first
+        stmt = insert(Candle).on_conflict_do_nothing(index_elements=["instrument_token", "interval", "timestamp"])
+        self.session.execute(stmt, rows)
+
+    def lock_ranges(self, instrument_token: int, interval: str) -> None:
+        """Hold a lock on one series' fetched ranges until commit, so concurrent fills merge them one at a time."""
+        if self.session.get_bind().dialect.name != "postgresql":
+            return
+        self.session.execute(
+            text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))"),
+            {"key": f"candle_ranges:{instrument_token}:{interval}"},
+        )
+
+    def add_range(self, instrument_token: int, interval: str, from_time: datetime, to_time: datetime) -> None:
+        """Record [from_time, to_time] as fetched, merged with any overlapping or adjacent ranges."""
+        overlapping = self._ranges(instrument_token, interval, from_time - ADJACENT, to_time + ADJACENT)
+        for r in overlapping:
+            from_time = min(from_time, r.from_time)
+            to_time = max(to_time, r.to_time)
+            self.session.delete(r)
+        self.session.add(CandleRange(instrument_token=instrument_token, interval=interval, from_time=from_time, to_time=to_time))
+
+
+class CandleStore:
+    """
+    The candle store as the brokers use it, each call in a short session of
+    its own. After a database error it reports itself unavailable for
+    `backoff` seconds, so history goes straight to Kite meanwhile.
+    """
+    def __init__(self, backoff: float = CANDLE_STORE_BACKOFF_SECONDS):
+        self.backoff = backoff
+        self._down_until = 0.0
+
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def gaps(self, instrument_token: int, interval: str, from_time: datetime, to_time: datetime) -> list[tuple[datetime, datetime]]:
+        with self._session() as session:
+            return CandleRepository(session).gaps(instrument_token, interval, from_time, to_time)
+
+    def fill(self, instrument_token: int, interval: str, from_time: datetime, to_time: datetime, gaps: list[tuple[datetime, datetime]], fetched: list[list[dict[str, Any]]]) -> list[Candle]:
+        """Store the candles fetched for each gap and mark the gaps fetched, then read [from_time, to_time] back."""
+        with self._session() as session:
+            repo = CandleRepository(session)
+            if gaps:
+                repo.lock_ranges(instrument_token, interval)
+            for (start, end), records in zip(gaps, fetched):
+                repo.add_candles(instrument_token, interval, records)
+                repo.add_range(instrument_token, interval, start, end)
+            session.commit()
+            return repo.between(instrument_token, interval, from_time, to_time)
+
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        # Not the scoped SessionLocal(): that may be the calling thread's request session
+        try:
+            with SessionLocal.session_factory() as session:
+                yield session
+        except SQLAlchemyError:
+            self._down_until = time.monotonic() + self.backoff
+            raise
+
+
+# Export a singleton instance
+CANDLE_STORE = CandleStore.singleton()
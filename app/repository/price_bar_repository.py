@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db.models import PriceBar
+from .base import RepositoryBase
+from .price_snapshot_repository import SnapshotRow
+
+# Bar interval name -> length, named like Kite's candle intervals
+BAR_INTERVALS = {"minute": timedelta(minutes=1), "5minute": timedelta(minutes=5)}
+
+
+def barStart(at: datetime, length: timedelta) -> datetime:
+    # UTC and IST differ by 5:30, so 1- and 5-minute buckets line up in both
+    epoch = datetime(1970, 1, 1, tzinfo=at.tzinfo)
+    return at - (at - epoch) % length
+
+
+class PriceBarRepository(RepositoryBase[PriceBar]):
+    def __init__(self, session: Session):
+        super().__init__(session, PriceBar)
+
+    def add_samples(self, rows: Iterable[SnapshotRow]) -> None:
+        """Fold snapshot rows into the bar of every interval they fall in, creating bars as needed."""
+        values = [
+            {"symbol": symbol, "interval": name, "start": barStart(created_at, length),
+             "open": price, "high": price, "low": price, "close": price, "samples": 1}
+            for symbol, price, created_at in rows
+            for name, length in BAR_INTERVALS.items()
+        ]
+        if not values:
+            return
+        stmt = insert(PriceBar)
+        # Rows arrive in time order, so the newest sample is the close
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol", "interval", "start"],
+            set_={
+                "high": func.greatest(PriceBar.high, stmt.excluded.high),
+                "low": func.least(PriceBar.low, stmt.excluded.low),
+                "close": stmt.excluded.close,
+                "samples": PriceBar.samples + 1,
+            },
+        )
+        self.session.execute(stmt, values)
+
+    def recent(self, symbol: str, interval: str, since: datetime | None = None, limit: int | None = None) -> list[PriceBar]:
+        """Newest bars first."""
+        stmt = select(PriceBar).where(PriceBar.symbol == symbol, PriceBar.interval == interval)
+        if since:
+            stmt = stmt.where(PriceBar.start >= since)
+        stmt = stmt.order_by(PriceBar.start.desc())
+        if limit:
+            stmt = stmt.limit(limit)
+        return list(self.session.execute(stmt).scalars().all())
@@ -1,9 +1,17 @@
-from sqlalchemy import select
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from sqlalchemy import Row, Select, insert, select, tuple_
 from sqlalchemy.orm import Session
 
 from app.db.models import PriceSnapshot
 from .base import RepositoryBase
 
+# (symbol, price, created_at)
+SnapshotRow = tuple[str, float, datetime]
+# (created_at, id) of the last row of a page; the next page starts after it
+Cursor = tuple[datetime, int]
+
 
 class PriceSnapshotRepository(RepositoryBase[PriceSnapshot]):
     def __init__(self, session: Session):
@@ -14,3 +22,53 @@ class PriceSnapshotRepository(RepositoryBase[PriceSnapshot]):
         if limit:
             stmt = stmt.limit(limit)
         return list(self.session.execute(stmt).scalars().all())
+
+    def page(self, symbol: str | None = None, since: datetime | None = None, until: datetime | None = None,
+             after: Cursor | None = None, limit: int = 20) -> list[Row]:
+        """
+        Newest first, as (id, symbol, price, created_at) rows. Pass the last
+        row's (created_at, id) as `after` for the next page; unlike OFFSET,
+        deep pages cost the same as the first.
+        """
+        stmt = self._filtered(symbol, since, until)
+        if after:
+            stmt = stmt.where(tuple_(PriceSnapshot.created_at, PriceSnapshot.id) < tuple_(*after))
+        stmt = stmt.order_by(PriceSnapshot.created_at.desc(), PriceSnapshot.id.desc()).limit(limit)
+        return list(self.session.execute(stmt).all())
+
+    def stream(self, symbol: str | None = None, since: datetime | None = None, until: datetime | None = None,
+               batch: int = 5000) -> Iterator[Row]:
+        """Oldest first, fetched `batch` rows at a time from a server-side cursor."""
+        stmt = self._filtered(symbol, since, until).order_by(PriceSnapshot.created_at, PriceSnapshot.id)
+        yield from self.session.execute(stmt.execution_options(yield_per=batch))
+
+    def add_rows(self, rows: Iterable[SnapshotRow]) -> int:
+        """
+        Insert many snapshots in the session's transaction without building ORM
+        objects: COPY on Postgres, a single executemany elsewhere.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            params = [{"symbol": symbol, "price": price, "created_at": created_at} for symbol, price, created_at in rows]
+            if params:
+                self.session.execute(insert(PriceSnapshot), params)
+            return len(params)
+        # The psycopg connection under the session's, so COPY joins its transaction
+        connection = self.session.connection().connection.driver_connection
+        count = 0
+        with connection.cursor() as cursor:
+            with cursor.copy("COPY price_snapshots (symbol, price, created_at) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+        return count
+
+    def _filtered(self, symbol: str | None, since: datetime | None, until: datetime | None) -> Select:
+        # Plain columns: rows come back as tuples, no ORM instances to build
+        stmt = select(PriceSnapshot.id, PriceSnapshot.symbol, PriceSnapshot.price, PriceSnapshot.created_at)
+        if symbol:
+            stmt = stmt.where(PriceSnapshot.symbol == symbol)
+        if since:
+            stmt = stmt.where(PriceSnapshot.created_at >= since)
+        if until:
+            stmt = stmt.where(PriceSnapshot.created_at < until)
+        return stmt
@@ -1,10 +1,26 @@
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.brokers.pool import invalidateBrokers, invalidateBrokersByHash, tokenHash
+from app.constants import USER_TOKEN_CACHE_SIZE, USER_TOKEN_CACHE_TTL_SECONDS
 from app.db.models import UserToken
-from app.utils import cached
+from app.db.notifications import NOTIFICATION_LISTENER, notify
+from app.utils import TTLCache
 from .base import RepositoryBase
 
+# user_id -> token (or None), shared by every request in this worker. Writes go
+# through update_token, which drops the entry here and notifies the other workers.
+USER_TOKEN_CACHE = TTLCache(USER_TOKEN_CACHE_SIZE, USER_TOKEN_CACHE_TTL_SECONDS)
+TOKEN_CHANNEL = "user_tokens"
+
+
+def _on_token_changed(payload: dict) -> None:
+    USER_TOKEN_CACHE.delete(payload["user_id"])
+    invalidateBrokersByHash(payload.get("old_token_hash"))
+
+
+NOTIFICATION_LISTENER.on(TOKEN_CHANNEL, _on_token_changed, resync=USER_TOKEN_CACHE.clear)
+
 
 class UserTokenRepository(RepositoryBase[UserToken]):
     def __init__(self, session: Session):
@@ -15,10 +31,16 @@ class UserTokenRepository(RepositoryBase[UserToken]):
         result = self.session.execute(stmt).scalars().first()
         return result
 
-    # @cached('user_tokens')    # NOTE: Caching at this layer lead to stale data issues, update_token method should invalidate cache if used
     def get_token(self, user_id: str) -> str | None:
+        token = USER_TOKEN_CACHE.get(user_id)
+        if token is not TTLCache.MISSING:
+            return token
+        # A read that raced an update_token must not cache the token it replaced
+        generation = USER_TOKEN_CACHE.generation()
         result = self._by_user_id(user_id)
-        return result.token if result else None
+        token = result.token if result else None
+        USER_TOKEN_CACHE.set(user_id, token, generation)
+        return token
 
     def _update(self, user_token: UserToken) -> UserToken:
         self.session.add(user_token)
@@ -28,9 +50,20 @@ class UserTokenRepository(RepositoryBase[UserToken]):
     
     def update_token(self, user_id: str, new_token: str) -> UserToken:
         obj = self._by_user_id(user_id)
+        old_token = obj.token if obj else None
         if obj:
             obj.token = new_token
-            return self._update(obj)
         else:
-            new_user_token = UserToken(user_id=user_id, token=new_token)
-            return self._update(new_user_token)
+            obj = UserToken(user_id=user_id, token=new_token)
+        # Sent on commit, so other workers never re-read the old row. Anyone may
+        # LISTEN, so the old token goes out hashed
+        notify(self.session, TOKEN_CHANNEL, {"user_id": user_id, "old_token_hash": tokenHash(old_token)})
+        try:
+            result = self._update(obj)
+        finally:
+            # The next read repopulates it from the committed row
+            USER_TOKEN_CACHE.delete(user_id)
+        # The old token is dead to Kite; drop its pooled broker with it
+        if old_token != new_token:
+            invalidateBrokers(old_token)
+        return result
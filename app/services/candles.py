@@ -0,0 +1,104 @@
+"""
+Columnar candle processing.
+
+History candles are turned into NumPy arrays, one per field, so joining
+legs, summing OHLCV and converting timestamps run as array operations
+instead of per-candle Python code.
+"""
+
+from typing import Any
+
+import numpy as np
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+IST_OFFSET_MS = 330 * 60_000
+MINUTES_PER_DAY = 24 * 60
+# Kite aligns intraday candles to the 09:15 open; a session is 375 minutes long
+SESSION_START_MINUTE = 9 * 60 + 15
+SESSION_MINUTES = 375
+
+Columns = dict[str, np.ndarray]
+
+
+def legColumns(records: list[dict[str, Any]]) -> Columns:
+    """One leg's candles as epoch-ms timestamps plus float OHLCV arrays."""
+    n = len(records)
+    seconds = np.fromiter((record["date"].timestamp() for record in records), np.float64, n)
+    columns = {"timestamp": (seconds * 1000).astype(np.int64)}
+    for field in FIELDS:
+        columns[field] = np.fromiter((record[field] for record in records), np.float64, n)
+    return columns
+
+
+def combineLegs(legs: list[list[dict[str, Any]]], keep_legs: bool = False) -> tuple[Columns, list[np.ndarray], list[Columns]]:
+    """
+    Sum OHLCV across legs at the timestamps every leg has, in time order.
+
+    Returns the combined columns, for each leg the index of the source record
+    behind every combined row, and with `keep_legs` each leg's own columns at
+    those rows (otherwise an empty list, sparing a copy of every leg).
+    """
+    columns = [legColumns(records) for records in legs]
+    timestamps = columns[0]["timestamp"]
+    order = np.argsort(timestamps, kind="stable")
+    common = timestamps[order]
+    indices = [order]
+    for leg in columns[1:]:
+        leg_order = np.argsort(leg["timestamp"], kind="stable")
+        common, in_common, in_leg = np.intersect1d(common, leg["timestamp"][leg_order], return_indices=True)
+        indices = [index[in_common] for index in indices] + [leg_order[in_leg]]
+    combined = {"timestamp": common}
+    for field in FIELDS:
+        # Summed in place, so each field costs one output array plus one gathered leg at a time
+        total = columns[0][field][indices[0]]
+        for leg, index in zip(columns[1:], indices[1:]):
+            total += leg[field][index]
+        combined[field] = total
+    combined["price"] = combined["close"]
+    aligned = []
+    if keep_legs:
+        aligned = [{"timestamp": common, **{field: leg[field][index] for field in FIELDS}} for leg, index in zip(columns, indices)]
+    return combined, indices, aligned
+
+
+def bucketStarts(timestamp: np.ndarray, minutes: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Row offsets where each bucket begins, and each bucket's start time in epoch ms.
+
+    `MINUTES_PER_DAY` buckets by IST date, labelled at midnight like Kite day
+    candles. Smaller sizes are aligned to the session open and never span days.
+    """
+    day, minute_of_day = np.divmod((timestamp + IST_OFFSET_MS) // 60_000, MINUTES_PER_DAY)
+    if minutes >= MINUTES_PER_DAY:
+        bucket_minute = np.zeros_like(minute_of_day)
+    else:
+        bucket_minute = SESSION_START_MINUTE + (minute_of_day - SESSION_START_MINUTE) // minutes * minutes
+    keys = day * MINUTES_PER_DAY + bucket_minute
+    if not len(keys):
+        return keys, keys
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    return starts, keys[starts] * 60_000 - IST_OFFSET_MS
+
+
+def resample(columns: Columns, starts: np.ndarray, bucket_timestamps: np.ndarray) -> Columns:
+    """Aggregate time-ordered rows into buckets: first open, max high, min low, last close, summed volume."""
+    if not len(starts):
+        return {field: values[:0] for field, values in columns.items()}
+    ends = np.append(starts[1:], len(columns["timestamp"])) - 1
+    resampled = {
+        "timestamp": bucket_timestamps,
+        "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][ends],
+        "volume": np.add.reduceat(columns["volume"], starts),
+    }
+    if "price" in columns:
+        resampled["price"] = resampled["close"]
+    return resampled
+
+
+def columnarResponse(combined: Columns) -> dict[str, list]:
+    """`{timestamp: [...], open: [...], ...}` with no per-row dicts."""
+    return {field: values.tolist() for field, values in combined.items()}
@@ -0,0 +1,206 @@
+"""
+Black-Scholes implied volatility and Greeks.
+
+Every function broadcasts over its array inputs, so one call prices a
+whole chain (a spot against many strikes) or its history (spot and time
+to expiry shaped (timestamps, 1) against prices shaped (timestamps,
+strikes)) instead of solving one strike at a time.
+"""
+
+from datetime import date, datetime, time
+from typing import Any
+
+import numpy as np
+
+from app.constants import RISK_FREE_RATE, TZONE_INDIA
+
+YEAR_SECONDS = 365 * 24 * 60 * 60
+# Index options settle at the close of their expiry day
+EXPIRY_TIME = time(15, 30)
+GREEKS = ("delta", "gamma", "vega", "theta")
+# Implied volatility search bracket and tolerance, annualized
+MIN_VOL = 1e-4
+MAX_VOL = 5.0
+IV_TOLERANCE = 1e-7
+IV_MAX_ITERATIONS = 100
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def normCdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF, to within 1e-15 (Hart 5666 as given by West, 2005); NumPy has no erf."""
+    return _cdfPdf(x)[0]
+
+
+def normPdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-np.square(x) / 2) / SQRT_2PI
+
+
+def _cdfPdf(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Both from one exp(), which is most of the cost
+    x = np.asarray(x, dtype=np.float64)
+    exponential = np.exp(-np.square(x) / 2)
+    return _cdf(x, exponential), exponential / SQRT_2PI
+
+
+def _cdf(x: np.ndarray, exponential: np.ndarray) -> np.ndarray:
+    # The CDF at x given exp(-x^2 / 2), so callers can derive that from an exp() they already have.
+    # Worked on at least 1-d, so the tails can be patched in place for scalars too
+    x, exponential = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(exponential, dtype=np.float64))
+    shape = x.shape
+    x, exponential = np.atleast_1d(x), np.atleast_1d(exponential)
+    z = np.abs(x)
+    numerator = ((((((0.0352624965998911 * z + 0.700383064443688) * z + 6.37396220353165) * z
+                    + 33.912866078383) * z + 112.079291497871) * z + 221.213596169931) * z + 220.206867912376)
+    denominator = (((((((0.0883883476483184 * z + 1.75566716318264) * z + 16.064177579207) * z
+                      + 86.7807322029461) * z + 296.564248779674) * z + 637.333633378831) * z
+                    + 793.826512519948) * z + 440.413735824752)
+    with np.errstate(invalid="ignore"):
+        tail = exponential * numerator / denominator
+    far = z >= 7.07106781186547
+    if far.any():
+        # A continued fraction out in the tails, where the rational fit loses accuracy
+        zf = z[far]
+        tail[far] = exponential[far] / (zf + 1 / (zf + 2 / (zf + 3 / (zf + 4 / (zf + 0.65))))) / SQRT_2PI
+    return np.where(x > 0, 1 - tail, tail).reshape(shape)
+
+
+def yearsToExpiry(timestamp: np.ndarray | int, expiry: date | str) -> np.ndarray:
+    """Years from epoch-ms timestamps to the expiry day's close; 0 once it has passed."""
+    if isinstance(expiry, str):
+        expiry = date.fromisoformat(expiry)
+    expiry_ms = datetime.combine(expiry, EXPIRY_TIME, TZONE_INDIA).timestamp() * 1000
+    return np.maximum(expiry_ms - np.asarray(timestamp, dtype=np.float64), 0) / 1000 / YEAR_SECONDS
+
+
+def bsPrice(spot, strike, years, vol, rate: float = RISK_FREE_RATE, is_call=True) -> np.ndarray:
+    """Black-Scholes price of European calls (`is_call`) or puts, with no dividends."""
+    spot, strike, years, vol = (np.asarray(v, dtype=np.float64) for v in (spot, strike, years, vol))
+    root = vol * np.sqrt(years)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(spot / strike) + (rate + vol * vol / 2) * years) / root
+    discounted = strike * np.exp(-rate * years)
+    call = spot * normCdf(d1) - discounted * normCdf(d1 - root)
+    # Put-call parity rather than a second pair of CDFs
+    return np.where(is_call, call, call - spot + discounted)
+
+
+def bsGreeks(spot, strike, years, vol, rate: float = RISK_FREE_RATE, is_call=True) -> dict[str, np.ndarray]:
+    """
+    Delta, gamma, vega per volatility point (0.01) and theta per calendar
+    day, for calls (`is_call`) or puts; NaN wherever `vol` is.
+    """
+    spot, strike, years, vol = (np.asarray(v, dtype=np.float64) for v in (spot, strike, years, vol))
+    sqrt_years = np.sqrt(years)
+    root = vol * sqrt_years
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(spot / strike) + (rate + vol * vol / 2) * years) / root
+        pdf = normPdf(d1)
+        gamma = pdf / (spot * root)
+        decay = -spot * pdf * vol / (2 * sqrt_years)
+    n1, n2 = normCdf(d1), normCdf(d1 - root)
+    carry = rate * strike * np.exp(-rate * years)
+    return {
+        "delta": np.where(is_call, n1, n1 - 1),
+        "gamma": gamma,
+        "vega": spot * pdf * sqrt_years / 100,
+        "theta": np.where(is_call, decay - carry * n2, decay + carry * (1 - n2)) / 365,
+    }
+
+
+def impliedVol(price, spot, strike, years, rate: float = RISK_FREE_RATE, is_call=True) -> np.ndarray:
+    """
+    Volatility at which `bsPrice` matches `price`, solved for every element at once.
+
+    Each point is solved through its out-of-the-money option (put-call
+    parity turns an in-the-money price into one), with Newton steps on the
+    log of its price, which stay well-behaved even for far wings worth a
+    fraction of a rupee. Steps are kept inside a bracket that each
+    iteration narrows, falling back to bisection whenever one would leave
+    it (Brent-style safeguarding). NaN where no volatility fits: a price
+    outside the no-arbitrage bounds, or no time left to expiry.
+    """
+    price, spot, strike, years, is_call = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (price, spot, strike, years)), np.asarray(is_call, dtype=bool)
+    )
+    discounted = strike * np.exp(-rate * years)
+    # sign is +1 where the call is out of the money, -1 where the put is
+    sign = np.where(discounted >= spot, 1.0, -1.0)
+    otm = np.where(is_call == (sign > 0), price, price + sign * (spot - discounted))
+    valid = (years > 0) & (otm > 0) & (otm < np.where(sign > 0, spot, discounted))
+    vol = np.full(price.shape, np.nan)
+    # Only the points still being solved are carried through each iteration
+    index = np.flatnonzero(valid)
+    p, s, x, t, sign = (a.ravel()[index] for a in (otm, spot, discounted, years, sign))
+    log_p, ratio, sqrt_years = np.log(p), s / x, np.sqrt(t)
+    moneyness = np.log(ratio)
+    lo, hi = np.full(len(index), MIN_VOL), np.full(len(index), MAX_VOL)
+    # Corrado-Miller's closed-form estimate from the call price as a start
+    half = np.where(sign > 0, p, p + s - x) - (s - x) / 2
+    guess = SQRT_2PI / (s + x) * (half + np.sqrt(np.maximum(half * half - np.square(s - x) / np.pi, 0))) / sqrt_years
+    sigma = np.clip(np.nan_to_num(guess, nan=0.2), 0.01, 2.0)
+    for _ in range(IV_MAX_ITERATIONS):
+        if not len(index):
+            break
+        root = sigma * sqrt_years
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            d1 = moneyness / root + root / 2
+            n1, pdf = _cdfPdf(sign * d1)
+            # exp(-d2^2 / 2) is exp(-d1^2 / 2) * s / x, which saves the second exp()
+            n2 = _cdf(sign * (d1 - root), pdf * SQRT_2PI * ratio)
+            model = sign * (s * n1 - x * n2)
+            slope = s * pdf * sqrt_years / model
+            newton = (np.log(model) - log_p) / slope
+            # Halley's correction from the curvature of log price; cubic convergence near the root
+            halley = newton / (1 - newton / 2 * (d1 * (d1 - root) / sigma - slope))
+            step = np.where(np.isfinite(halley) & (np.abs(halley) < 2 * np.abs(newton)), halley, newton)
+        # Done once the next Newton step is below tolerance, or the bracket has closed
+        converged = np.abs(step) < IV_TOLERANCE
+        done = converged | (hi - lo < IV_TOLERANCE)
+        if done.any():
+            vol.ravel()[index[done]] = np.where(converged, sigma - step, sigma)[done]
+            keep = ~done
+            index, p, log_p, s, x, ratio, sign, moneyness, sqrt_years, sigma, model, step, lo, hi = (
+                a[keep] for a in (index, p, log_p, s, x, ratio, sign, moneyness, sqrt_years, sigma, model, step, lo, hi)
+            )
+        # Price rises with volatility, so the sign of the miss says which end moves
+        hi = np.where(model > p, sigma, hi)
+        lo = np.where(model < p, sigma, lo)
+        sigma = sigma - step
+        sigma = np.where((sigma > lo) & (sigma < hi), sigma, (lo + hi) / 2)
+    # Whatever didn't meet the tolerance ends at its best estimate
+    vol.ravel()[index] = sigma
+    return vol
+
+
+def straddleGreeks(spot, strike, years, call_price, put_price, rate: float = RISK_FREE_RATE) -> dict[str, np.ndarray]:
+    """
+    Each leg's implied volatility and Greeks (`call_iv`, `call_delta`, ...,
+    `put_theta`) and the straddle's summed `delta`, `gamma`, `vega`, `theta`.
+    """
+    out = {}
+    for leg, price, is_call in (("call", call_price, True), ("put", put_price, False)):
+        iv = impliedVol(price, spot, strike, years, rate, is_call)
+        out[f"{leg}_iv"] = iv
+        for name, values in bsGreeks(spot, strike, years, iv, rate, is_call).items():
+            out[f"{leg}_{name}"] = values
+    for name in GREEKS:
+        out[name] = out[f"call_{name}"] + out[f"put_{name}"]
+    return out
+
+
+def chainGreeks(chain: dict[str, Any], rate: float = RISK_FREE_RATE) -> list[dict[str, Any]]:
+    """Per straddle of a `straddleChain` result, shaped like StraddleGreeks, as of its spot quote."""
+    straddles = chain["straddles"]
+    if not straddles:
+        return []
+    strike, call_price, put_price = (np.array([s[field] for s in straddles], dtype=np.float64) for field in ("strike", "call_price", "put_price"))
+    years = yearsToExpiry(chain["timestamp"], chain["expiry"])
+    greeks = {name: values.tolist() for name, values in straddleGreeks(chain["spot"], strike, years, call_price, put_price, rate).items()}
+    return [
+        {
+            "call": {"iv": greeks["call_iv"][i], **{name: greeks[f"call_{name}"][i] for name in GREEKS}},
+            "put": {"iv": greeks["put_iv"][i], **{name: greeks[f"put_{name}"][i] for name in GREEKS}},
+            **{name: greeks[name][i] for name in GREEKS},
+        }
+        for i in range(len(straddles))
+    ]
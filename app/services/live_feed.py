@@ -0,0 +1,274 @@
+"""
+Live straddle prices over WebSocket.
+
+One upstream tick connection per access token is shared by every client
+using that token. It subscribes to the union of straddle legs those
+clients follow, combines call and put ticks into straddle prices as they
+arrive, and fans the updates out to each subscriber's queue.
+"""
+
+import asyncio
+from datetime import datetime
+import random
+import threading
+from typing import Any, Callable, Protocol
+
+from kiteconnect import KiteTicker
+
+from app.constants import LIVE_TICK_SOURCE, TZONE_INDIA, ZERODHA_API_KEY
+
+OnTicks = Callable[[list[dict[str, Any]]], None]
+
+# Updates a slow client hasn't read yet; beyond this new ones are dropped,
+# the next tick carries the latest price anyway
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class TickSource(Protocol):
+    def start(self, on_ticks: OnTicks) -> None: ...
+    def subscribe(self, tokens: list[int]) -> None: ...
+    def unsubscribe(self, tokens: list[int]) -> None: ...
+    def stop(self) -> None: ...
+
+
+class KiteTickSource:
+    """KiteTicker in LTP mode, driven from twisted's reactor thread."""
+    # reactor.running only flips once the reactor thread is up, so it can't
+    # tell a second source that the first is already starting it
+    _reactor_lock = threading.Lock()
+    _reactor_started = False
+
+    def __init__(self, access_token: str, api_key: str = ZERODHA_API_KEY):
+        self.ticker = KiteTicker(api_key, access_token)
+        self._lock = threading.Lock()
+        self._tokens: set[int] = set()
+
+    def start(self, on_ticks: OnTicks) -> None:
+        from twisted.internet import reactor
+
+        self.ticker.on_ticks = lambda ws, ticks: on_ticks(ticks)
+        self.ticker.on_connect = self._onConnect
+        # The reactor is process-wide: the first source starts it, later ones
+        # must connect from inside it (queued until it runs, if it's still starting)
+        with KiteTickSource._reactor_lock:
+            first = not KiteTickSource._reactor_started
+            KiteTickSource._reactor_started = True
+        if first:
+            self.ticker.connect(threaded=True)
+        else:
+            reactor.callFromThread(self.ticker.connect, threaded=True)
+
+    def subscribe(self, tokens: list[int]) -> None:
+        with self._lock:
+            self._tokens.update(tokens)
+        if self.ticker.is_connected():
+            self._call(self._send, tokens)
+
+    def unsubscribe(self, tokens: list[int]) -> None:
+        with self._lock:
+            self._tokens.difference_update(tokens)
+        if self.ticker.is_connected():
+            self._call(self.ticker.unsubscribe, tokens)
+
+    def stop(self) -> None:
+        self._call(self.ticker.close)
+
+    def _onConnect(self, ws, response) -> None:
+        # Also runs on reconnects, so the full set is sent every time
+        with self._lock:
+            tokens = list(self._tokens)
+        self._send(tokens)
+
+    def _send(self, tokens: list[int]) -> None:
+        if tokens:
+            self.ticker.subscribe(tokens)
+            self.ticker.set_mode(self.ticker.MODE_LTP, tokens)
+
+    def _call(self, fn, *args) -> None:
+        # Websocket writes are only safe on the reactor thread
+        from twisted.internet import reactor
+
+        reactor.callFromThread(fn, *args)
+
+
+class FakeTickSource:
+    """Random-walk LTP ticks for subscribed tokens, for local runs and tests."""
+    def __init__(self, interval: float = 0.5, seed: int | None = None):
+        self.interval = interval
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prices: dict[int, float] = {}
+        self._stopped = threading.Event()
+
+    def start(self, on_ticks: OnTicks) -> None:
+        def run():
+            while not self._stopped.wait(self.interval):
+                with self._lock:
+                    for token in self._prices:
+                        self._prices[token] = max(0.05, self._prices[token] + self._random.uniform(-1, 1))
+                    ticks = [{"instrument_token": t, "last_price": round(p, 2)} for t, p in self._prices.items()]
+                if ticks:
+                    on_ticks(ticks)
+        threading.Thread(target=run, name="fake-ticks", daemon=True).start()
+
+    def subscribe(self, tokens: list[int]) -> None:
+        with self._lock:
+            for token in tokens:
+                self._prices.setdefault(token, self._random.uniform(50, 300))
+
+    def unsubscribe(self, tokens: list[int]) -> None:
+        with self._lock:
+            for token in tokens:
+                self._prices.pop(token, None)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def tickSource(access_token: str) -> TickSource:
+    if LIVE_TICK_SOURCE == "fake":
+        return FakeTickSource()
+    return KiteTickSource(access_token)
+
+
+class Subscriber:
+    """One WebSocket client; ticks are handed to its event loop thread-safely."""
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.ids: set[str] = set()
+
+    def push(self, update: dict[str, Any]) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, update)
+        except RuntimeError:
+            # The client's loop is gone; it is unsubscribed on its way out
+            pass
+
+    def _put(self, update: dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            pass
+
+
+class StraddleFeed:
+    """Straddle prices for every subscriber sharing one tick source."""
+    def __init__(self, source: TickSource):
+        self.source = source
+        self._lock = threading.Lock()
+        self._legs: dict[str, tuple[int, int]] = {}
+        self._straddles: dict[int, set[str]] = {}
+        self._subscribers: dict[str, set[Subscriber]] = {}
+        self._prices: dict[int, float] = {}
+        source.start(self._onTicks)
+
+    def subscribe(self, subscriber: Subscriber, straddle_id: str, legs: tuple[int, int]) -> None:
+        with self._lock:
+            new_tokens = [token for token in legs if token not in self._straddles]
+            self._legs[straddle_id] = legs
+            for token in legs:
+                self._straddles.setdefault(token, set()).add(straddle_id)
+            self._subscribers.setdefault(straddle_id, set()).add(subscriber)
+            subscriber.ids.add(straddle_id)
+            update = self._update(straddle_id)
+        if new_tokens:
+            self.source.subscribe(new_tokens)
+        # Late joiners get the last known price straight away
+        if update:
+            subscriber.push(update)
+
+    def unsubscribe(self, subscriber: Subscriber, straddle_id: str) -> None:
+        stale_tokens = []
+        with self._lock:
+            subscriber.ids.discard(straddle_id)
+            subscribers = self._subscribers.get(straddle_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if subscribers:
+                return
+            del self._subscribers[straddle_id]
+            for token in self._legs.pop(straddle_id):
+                straddles = self._straddles[token]
+                straddles.discard(straddle_id)
+                if not straddles:
+                    del self._straddles[token]
+                    self._prices.pop(token, None)
+                    stale_tokens.append(token)
+        if stale_tokens:
+            self.source.unsubscribe(stale_tokens)
+
+    def unsubscribeAll(self, subscriber: Subscriber) -> None:
+        for straddle_id in list(subscriber.ids):
+            self.unsubscribe(subscriber, straddle_id)
+
+    def stop(self) -> None:
+        self.source.stop()
+
+    def _onTicks(self, ticks: list[dict[str, Any]]) -> None:
+        deliveries = []
+        with self._lock:
+            changed: set[str] = set()
+            for tick in ticks:
+                token = tick["instrument_token"]
+                if token in self._straddles:
+                    self._prices[token] = tick["last_price"]
+                    changed.update(self._straddles[token])
+            for straddle_id in changed:
+                update = self._update(straddle_id)
+                if update:
+                    deliveries.append((list(self._subscribers.get(straddle_id, ())), update))
+        for subscribers, update in deliveries:
+            for subscriber in subscribers:
+                subscriber.push(update)
+
+    def _update(self, straddle_id: str) -> dict[str, Any] | None:
+        call_token, put_token = self._legs[straddle_id]
+        call_price, put_price = self._prices.get(call_token), self._prices.get(put_token)
+        if call_price is None or put_price is None:
+            return None
+        now = datetime.now(TZONE_INDIA)
+        return {
+            "id": straddle_id,
+            "tstring": now.isoformat(),
+            "timestamp": int(now.timestamp()*1000),
+            "price": call_price + put_price,
+            "call": call_price,
+            "put": put_price,
+        }
+
+
+class LiveFeedHub:
+    """Reference-counted StraddleFeed per access token."""
+    def __init__(self, source_factory: Callable[[str], TickSource] = tickSource):
+        self.source_factory = source_factory
+        self._lock = threading.Lock()
+        self._feeds: dict[str, tuple[StraddleFeed, int]] = {}
+
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+
+    def acquire(self, access_token: str) -> StraddleFeed:
+        with self._lock:
+            feed, refs = self._feeds.get(access_token) or (None, 0)
+            if feed is None:
+                feed = StraddleFeed(self.source_factory(access_token))
+            self._feeds[access_token] = (feed, refs + 1)
+            return feed
+
+    def release(self, access_token: str) -> None:
+        with self._lock:
+            feed, refs = self._feeds[access_token]
+            if refs > 1:
+                self._feeds[access_token] = (feed, refs - 1)
+                return
+            del self._feeds[access_token]
+        feed.stop()
+
+
+# Export a singleton instance
+LIVE_FEEDS = LiveFeedHub.singleton()
@@ -0,0 +1,134 @@
+"""
+Clerk session token verification.
+
+Session tokens are RS256 JWTs. They are verified locally against Clerk's
+JWKS, which is fetched once and refreshed periodically (or straight away
+when a token names a key we don't have yet, i.e. after a key rotation).
+Verified claims are kept until the token expires, so a client polling with
+the same token pays for one signature check.
+"""
+
+import threading
+import time
+from typing import Any, Callable
+
+import httpx
+import jwt
+from jwt.algorithms import RSAAlgorithm
+
+from app.constants import (
+    ALLOWED_ORIGINS,
+    CLERK_JWKS_URL,
+    CLERK_JWKS_REFRESH_SECONDS,
+    CLERK_SECRET_KEY,
+)
+
+# Same allowance Clerk's SDK gives for clock drift between us and Clerk
+CLOCK_SKEW_SECONDS = 5
+# Unknown key ids trigger a refetch at most this often, so garbage tokens can't hammer Clerk
+MIN_REFETCH_SECONDS = 30
+# Verified tokens kept; expired ones are pruned first when this is exceeded
+CLAIMS_CACHE_SIZE = 10_000
+
+
+def fetchClerkJwks() -> dict[str, Any]:
+    response = httpx.get(CLERK_JWKS_URL, headers={"Authorization": f"Bearer {CLERK_SECRET_KEY}"}, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+class SessionVerifier:
+    """Verifies session tokens locally against a cached JWKS."""
+    def __init__(
+        self,
+        fetch_jwks: Callable[[], dict[str, Any]] = fetchClerkJwks,
+        refresh_seconds: float = CLERK_JWKS_REFRESH_SECONDS,
+        authorized_parties: list[str] | None = ALLOWED_ORIGINS,
+    ):
+        self.fetch_jwks = fetch_jwks
+        self.refresh_seconds = refresh_seconds
+        self.authorized_parties = authorized_parties
+        self._lock = threading.Lock()
+        self._keys: dict[str, Any] = {}
+        self._fetched_at = float("-inf")
+        # Verify runs on threadpool threads; guards _claims, which JWKS refreshes don't touch
+        self._claims_lock = threading.Lock()
+        self._claims: dict[str, dict[str, Any]] = {}
+
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+
+    def verify(self, token: str) -> dict[str, Any] | None:
+        """The token's claims if it is valid, otherwise None."""
+        now = time.time()
+        with self._claims_lock:
+            claims = self._claims.get(token)
+            if claims is not None:
+                if claims["exp"] + CLOCK_SKEW_SECONDS > now:
+                    return claims
+                del self._claims[token]
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = self._key(kid)
+            if key is None:
+                return None
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                options={"verify_iss": False, "require": ["exp", "iat", "sub"]},
+                leeway=CLOCK_SKEW_SECONDS,
+            )
+        except jwt.InvalidTokenError:
+            return None
+        if self.authorized_parties is not None and claims.get("azp") not in self.authorized_parties:
+            return None
+
+        with self._claims_lock:
+            if len(self._claims) >= CLAIMS_CACHE_SIZE:
+                self._claims = {t: c for t, c in self._claims.items() if c["exp"] + CLOCK_SKEW_SECONDS > now}
+                if len(self._claims) >= CLAIMS_CACHE_SIZE:
+                    self._claims.clear()
+            self._claims[token] = claims
+        return claims
+
+    def _key(self, kid: str | None) -> Any:
+        age = time.monotonic() - self._fetched_at
+        key = self._keys.get(kid)  # type: ignore[arg-type]
+        if key is not None and age < self.refresh_seconds:
+            return key
+        if key is None and age < MIN_REFETCH_SECONDS:
+            return None
+        self._refresh(kid)
+        return self._keys.get(kid)  # type: ignore[arg-type]
+
+    def _refresh(self, kid: str | None) -> None:
+        # One thread refetches; the rest keep using the keys they have
+        if not self._lock.acquire(blocking=not self._keys):
+            return
+        # Threads queued behind a refetch use its keys instead of fetching again
+        age = time.monotonic() - self._fetched_at
+        if (kid in self._keys and age < self.refresh_seconds) or age < MIN_REFETCH_SECONDS:
+            self._lock.release()
+            return
+        try:
+            jwks = self.fetch_jwks()
+            keys = {}
+            for jwk in jwks.get("keys", []):
+                if jwk.get("kty") == "RSA" and "kid" in jwk:
+                    keys[jwk["kid"]] = RSAAlgorithm.from_jwk(jwk)
+            self._keys = keys
+        except Exception as e:
+            # Keep verifying with the keys we had until Clerk is reachable again
+            print(f"[AUTH] JWKS refresh failed: {e}")
+        finally:
+            self._fetched_at = time.monotonic()
+            self._lock.release()
+
+
+# Export a singleton instance
+SESSION_VERIFIER = SessionVerifier.singleton()
@@ -0,0 +1,139 @@
+"""
+Background straddle recorder.
+
+During market hours, samples each configured underlying's spot and its
+ATM straddle with `STRADDLE_RECORDER_WIDTH` strikes either side, all in one
+batched quote call per tick, and records them as price snapshots (symbol =
+straddle id, price = call + put) plus rolling 1- and 5-minute bars, so
+recent intraday straddle history can be read from our own tables instead
+of rebuilt from per-leg Kite history calls.
+
+Every worker starts a recorder but only the one holding a Postgres
+advisory lock samples; the others stand by and take over if it goes away.
+"""
+
+import datetime
+import threading
+import time
+
+import psycopg
+
+from app.brokers.instruments import INSTRUMENT_STORE
+from app.brokers.zerodha import instrumentKey
+from app.constants import (
+    STRADDLE_RECORDER_ENABLED,
+    STRADDLE_RECORDER_INTERVAL_SECONDS,
+    STRADDLE_RECORDER_UNDERLYINGS,
+    STRADDLE_RECORDER_WIDTH,
+    TZONE_INDIA,
+    USER_ACCESS_TOKEN,
+)
+from app.db import engine
+from app.db.snapshot_writer import SNAPSHOT_WRITER
+from app.models.ticker import Underlying
+from app.repository.price_snapshot_repository import SnapshotRow
+from app.services.ticker_service import TickerService
+
+# pg_try_advisory_lock key held by the recording worker
+RECORDER_LOCK_ID = 0x5354524444  # "STRDD"
+# How often a standby worker checks whether it can take over
+STANDBY_SECONDS = 30
+MARKET_OPEN = datetime.time(9, 15)
+MARKET_CLOSE = datetime.time(15, 30)
+
+
+def marketOpen(now: datetime.datetime) -> bool:
+    """Weekday trading hours in IST; exchange holidays just record a flat line."""
+    now = now.astimezone(TZONE_INDIA)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+
+class StraddleRecorder:
+    """Thread sampling ATM straddle prices into price_snapshots and price_bars."""
+    def __init__(self, access_token: str = USER_ACCESS_TOKEN, underlyings: list[str] = STRADDLE_RECORDER_UNDERLYINGS,
+                 width: int = STRADDLE_RECORDER_WIDTH, interval: float = STRADDLE_RECORDER_INTERVAL_SECONDS):
+        self.access_token = access_token
+        self.underlyings = [Underlying(u) for u in underlyings]
+        self.width = width
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def singleton(cls):
+        if not hasattr(cls, '_instance'):
+            cls._instance = cls()
+        return cls._instance
+
+    def start(self) -> None:
+        if self._thread is not None or not STRADDLE_RECORDER_ENABLED:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="straddle-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling, waiting for a sample under way to be handed to the writer."""
+        thread, self._thread = self._thread, None
+        self._stopped.set()
+        if thread is not None:
+            thread.join()
+
+    def sample(self, now: datetime.datetime | None = None) -> list[SnapshotRow]:
+        """Quote spots and straddles once and record them; returns the rows written."""
+        service = TickerService(self.access_token)
+        spot_keys = {u: instrumentKey(service.broker.findStock(u)) for u in self.underlyings}
+        # Strikes around the last spot seen, here or by a straddle chain request
+        legs = [(id, instrumentKey(call), instrumentKey(put)) for u in self.underlyings for id, call, put in service.lastSpotWindow(u, self.width)]
+        # Spots and every leg in one call; until a spot is known its straddles wait a tick
+        quotes = service.broker.quote(*spot_keys.values(), *(key for _, call_key, put_key in legs for key in (call_key, put_key)))
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        rows: list[SnapshotRow] = []
+        for u, key in spot_keys.items():
+            spot = service.seeSpot(u, key, quotes)
+            if spot is not None:
+                rows.append((u.value, spot, now))
+        for id, call_key, put_key in legs:
+            if call_key in quotes and put_key in quotes:
+                rows.append((id, quotes[call_key]["last_price"] + quotes[put_key]["last_price"], now))
+        # Snapshots and bars in one commit, so they're written or dropped together
+        SNAPSHOT_WRITER.submit(rows, bars=True)
+        return rows
+
+    def _run(self) -> None:
+        if engine.dialect.name != "postgresql":
+            self._record()
+            return
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while not self._stopped.is_set():
+            try:
+                # The lock lives as long as this connection, so a crashed leader frees it
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    while not self._stopped.is_set():
+                        if connection.execute("SELECT pg_try_advisory_lock(%s)", (RECORDER_LOCK_ID,)).fetchone()[0]:
+                            print("[RECORDER] Recording straddles in this worker")
+                            self._record(connection)
+                            break
+                        self._stopped.wait(STANDBY_SECONDS)
+            except Exception as e:
+                print(f"[RECORDER] Lock connection lost, retrying in {STANDBY_SECONDS}s: {e}")
+                self._stopped.wait(STANDBY_SECONDS)
+
+    def _record(self, connection: psycopg.Connection | None = None) -> None:
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            if connection is not None:
+                # Fails here if the lock connection dropped, handing over to _run's retry
+                connection.execute("SELECT 1")
+            if INSTRUMENT_STORE.is_ready() and marketOpen(datetime.datetime.now(datetime.timezone.utc)):
+                try:
+                    self.sample()
+                except Exception as e:
+                    print(f"[RECORDER] Sample failed: {e}")
+            # Fixed cadence: a slow tick shortens the wait instead of shifting every later one
+            next_tick = max(next_tick + self.interval, time.monotonic())
+            self._stopped.wait(next_tick - time.monotonic())
+
+
+# Export a singleton instance
+STRADDLE_RECORDER = StraddleRecorder.singleton()
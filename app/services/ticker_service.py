@@ -4,18 +4,30 @@ Ticker business logic service.
 This module contains the business logic for ticker operations.
 """
 
+import asyncio
+from bisect import bisect_left
 from datetime import datetime
-from typing import Any
-from app.brokers.zerodha import Broker, instrumentKey, instrumentToken
+from typing import Any, AsyncIterator, Iterator
+from app.brokers.pool import ASYNC_BROKER_POOL, BROKER_POOL
+from app.brokers.instruments import INSTRUMENT_STORE, Instrument
+from app.brokers.zerodha import AsyncBroker, Interval, instrumentKey, instrumentToken
 from app.constants import TZONE_INDIA
 from app.models.ticker import OptionType, Underlying
-from app.utils import timer
+from app.services.candles import FIELDS, MINUTES_PER_DAY, SESSION_MINUTES, bucketStarts, combineLegs, columnarResponse, resample
+from app.services.greeks import chainGreeks
+from app.utils import ndjsonLine, ndjsonLines, timer
+
+# Last spot quoted per underlying, by a chain or the recorder; centres the next
+# straddle window so its legs go in the same quote call as the spot
+LAST_SPOTS: dict[Underlying, float] = {}
+# Extra strikes quoted either side of a chain, in case spot has moved since it was last seen
+CHAIN_MARGIN = 2
 
 
 class TickerService:
     """Service class for ticker-related business logic."""
     def __init__(self, user_token: str) -> None:
-        self.broker = Broker(access_token=user_token)
+        self.broker = BROKER_POOL.get(user_token)
     
     @timer
     def user(self):
@@ -26,70 +38,154 @@ class TickerService:
         return self.broker.instruments(force_reload)
     
     @timer
-    def quote(self, underlying_str: str | None):
-        if not underlying_str:
-            raise ValueError("Underlying parameter is required")
-        u = Underlying(underlying_str)
-        stock = self.broker.findStock(u)
-        key = instrumentKey(stock)
-        quote_map = self.broker.quote(key)
-        quote = quote_map.get(key)
-        return { u.value: self._combineQuotes(u.value, [quote]) }
+    def instrumentsPayload(self, force_reload: bool = False):
+        return self.broker.instrumentsPayload(force_reload)
     
-    @timer
-    def history(self, underlying_str: str | None, from_str: str | None, to_str: str | None = None):
-        if not underlying_str:
-            raise ValueError("Underlying parameter is required")
+    def instrumentRows(self) -> Iterator[dict[str, Any]]:
+        return self.broker.instrumentRows()
+    
+    def _historyDates(self, from_str: str | None, to_str: str | None) -> tuple[datetime, datetime]:
         if not from_str:
             raise ValueError("From parameter is required, in datetime format YYYY-MM-DDTHH:mm:ss")
         from_date = datetime.fromisoformat(from_str)
         to_date = datetime.fromisoformat(to_str) if to_str else datetime.now()
-        u = Underlying(underlying_str)
-        token = instrumentToken(self.broker.findStock(u))
-        history = self.broker.history(token, from_date, to_date)
-        parsed_records = [self._parseHistoryRecord([record]) for record in history]
-        sorted_records = sorted(parsed_records, key=lambda x: x["timestamp"])
-        return { underlying_str: sorted_records }
+        return from_date, to_date
     
-    @timer
-    def straddleHistory(self, straddle_id: str | None, from_str: str | None, to_str: str | None = None):
+    def _historyArgs(self, underlying_str: str | None, from_str: str | None, to_str: str | None, interval_str: str | None) -> tuple[list[int], datetime, datetime, Interval, int | None]:
+        """The tokens to fetch, range, Kite interval and resampling bucket of an underlying's history request."""
+        if not underlying_str:
+            raise ValueError("Underlying parameter is required")
+        from_date, to_date = self._historyDates(from_str, to_str)
+        token = instrumentToken(self.broker.findStock(Underlying(underlying_str)))
+        interval, bucket = self._historyInterval(interval_str, combined=False)
+        return [token], from_date, to_date, interval, bucket
+    
+    def _straddleHistoryArgs(self, straddle_id: str | None, from_str: str | None, to_str: str | None, interval_str: str | None) -> tuple[list[int], datetime, datetime, Interval, int | None]:
+        """Like `_historyArgs`, for both legs of a straddle."""
         if not straddle_id:
             raise ValueError("straddle parameter is required")
-        if not from_str:
-            raise ValueError("From parameter is required, in datetime format YYYY-MM-DDTHH:mm:ss")
-        call_opt, put_opt = self._straddleInsts(straddle_id)
-        if not call_opt or not put_opt:
-            raise ValueError("Could not find instruments for the given straddle id")
-        call_token, put_token = instrumentToken(call_opt), instrumentToken(put_opt)
-        from_date = datetime.fromisoformat(from_str)
-        to_date = datetime.fromisoformat(to_str) if to_str else datetime.now()
-        call_history = self.broker.history(call_token, from_date, to_date)
-        put_history = self.broker.history(put_token, from_date, to_date)
-        # Combine call and put history by timestamp
-        call_map = {record["date"]: record for record in call_history}
-        put_map = {record["date"]: record for record in put_history}
-        common_timestamps = set(call_map.keys()).intersection(set(put_map.keys()))
-        combined_history = { ts: [call_map[ts], put_map[ts]] for ts in common_timestamps }
-        parsed_records = [self._parseHistoryRecord(records) for records in combined_history.values()]
-        sorted_records = sorted(parsed_records, key=lambda x: x["timestamp"])
-        return { straddle_id: sorted_records }
-    
-    def _parseHistoryRecord(self, records: list[dict[str, Any]]) -> dict[str, Any]:
-        # TODO: create a pydantic model for this
-        tzone_aware_time: datetime = records[0]["date"]
-        parsed = {
-            "tstring": tzone_aware_time.isoformat(),
-            "timestamp": int(tzone_aware_time.timestamp()*1000),
-            "price": sum(float(record["close"]) for record in records),
-            "open": sum(float(record["open"]) for record in records),
-            "high": sum(float(record["high"]) for record in records),
-            "low": sum(float(record["low"]) for record in records),
-            "close": sum(float(record["close"]) for record in records),
-            "volume": sum(float(record["volume"]) for record in records),
-            "records": records,
-        }
-        return parsed
-
+        from_date, to_date = self._historyDates(from_str, to_str)
+        call_token, put_token = self.straddleLegs(straddle_id)
+        interval, bucket = self._historyInterval(interval_str, combined=True)
+        return [call_token, put_token], from_date, to_date, interval, bucket
+    
+    def _historyInterval(self, interval_str: str | None, combined: bool) -> tuple[Interval, int | None]:
+        """
+        The Kite interval to fetch, and the bucket size in minutes to resample
+        to afterwards (None to return candles as fetched).
+        
+        Accepts Kite interval names ("minute", "15minute", "day", ...) and any
+        "<N>minute" up to one session.
+        """
+        if not interval_str:
+            return Interval.MINUTE, None
+        if interval_str in {i.value for i in Interval}:
+            interval = Interval(interval_str)
+            if not combined or interval == Interval.MINUTE:
+                return interval, None
+            # A straddle bar's high and low come from the summed minute candles,
+            # summing each leg's own bar would overstate them
+            if interval == Interval.DAY:
+                return Interval.MINUTE, MINUTES_PER_DAY
+            return Interval.MINUTE, int(interval.value.removesuffix("minute"))
+        minutes = interval_str.removesuffix("minute")
+        if not minutes.isdigit() or not 1 <= int(minutes) <= SESSION_MINUTES:
+            raise ValueError(f"Unsupported interval {interval_str}, use a Kite interval or <N>minute with N up to {SESSION_MINUTES}")
+        return Interval.MINUTE, int(minutes)
+    
+    def _historyResponse(self, legs: list[list[dict[str, Any]]], columnar: bool, bucket: int | None = None, raw: bool = True):
+        # Legs are joined on timestamp and summed as arrays; rows are only built if asked for
+        # Per-leg columns are only needed to resample each leg's own candles
+        combined, indices, aligned = combineLegs(legs, keep_legs=bool(bucket) and not columnar)
+        if bucket:
+            starts, bucket_timestamps = bucketStarts(combined["timestamp"], bucket)
+            combined = resample(combined, starts, bucket_timestamps)
+            if columnar:
+                return columnarResponse(combined)
+            aligned = [resample(leg, starts, bucket_timestamps) for leg in aligned]
+            return self._resampledRows(combined, aligned, raw)
+        if columnar:
+            return columnarResponse(combined)
+        return self._historyRows(legs, combined, indices, raw)
+    
+    def _rowColumns(self, combined) -> list[list]:
+        """Timestamp, price and OHLCV as lists; price is the close column, so its floats are shared, not converted twice."""
+        values = {field: combined[field].tolist() for field in FIELDS}
+        return [combined["timestamp"].tolist(), values["close"], *values.values()]
+    
+    def _historyRows(self, legs: list[list[dict[str, Any]]], combined, indices, raw: bool = True) -> list[dict[str, Any]]:
+        # Shaped like HistoryRow; built as plain dicts since they're encoded straight to JSON
+        lead = legs[0]
+        leg_indices = [index.tolist() for index in indices]
+        columns = self._rowColumns(combined)
+        if not raw:
+            return [
+                {
+                    "tstring": lead[i]["date"].isoformat(),
+                    "timestamp": timestamp,
+                    "price": price,
+                    "open": open_,
+                    "high": high,
+                    "low": low,
+                    "close": close,
+                    "volume": volume,
+                }
+                for i, timestamp, price, open_, high, low, close, volume in zip(leg_indices[0], *columns)
+            ]
+        return [
+            {
+                "tstring": lead[row[0]]["date"].isoformat(),
+                "timestamp": timestamp,
+                "price": price,
+                "open": open_,
+                "high": high,
+                "low": low,
+                "close": close,
+                "volume": volume,
+                "records": [leg[i] for leg, i in zip(legs, row)],
+            }
+            for row, timestamp, price, open_, high, low, close, volume in zip(zip(*leg_indices), *columns)
+        ]
+    
+    def _resampledRows(self, combined, aligned, raw: bool = True) -> list[dict[str, Any]]:
+        # Same shape as _historyRows; each leg's record is its own resampled candle
+        columns = self._rowColumns(combined)
+        if not raw:
+            return [
+                {
+                    "tstring": datetime.fromtimestamp(timestamp / 1000, TZONE_INDIA).isoformat(),
+                    "timestamp": timestamp,
+                    "price": price,
+                    "open": open_,
+                    "high": high,
+                    "low": low,
+                    "close": close,
+                    "volume": volume,
+                }
+                for timestamp, price, open_, high, low, close, volume in zip(*columns)
+            ]
+        leg_rows = [
+            [
+                { "date": datetime.fromtimestamp(timestamp / 1000, TZONE_INDIA), **dict(zip(FIELDS, values)) }
+                for timestamp, *values in zip(*(leg[field].tolist() for field in ("timestamp", *FIELDS)))
+            ]
+            for leg in aligned
+        ]
+        rows = []
+        for records, (timestamp, price, open_, high, low, close, volume) in zip(zip(*leg_rows), zip(*columns)):
+            rows.append({
+                "tstring": records[0]["date"].isoformat(),
+                "timestamp": timestamp,
+                "price": price,
+                "open": open_,
+                "high": high,
+                "low": low,
+                "close": close,
+                "volume": volume,
+                "records": list(records),
+            })
+        return rows
+    
     @timer
     def straddles(self, underlying_str: str | None):
         if not underlying_str:
@@ -100,8 +196,8 @@ class TickerService:
             raise ValueError("Could not find expiry for the given underlying")
         call_instruments = self.broker.findOptions(expiry, OptionType.CALL, u)
         put_instruments = self.broker.findOptions(expiry, OptionType.PUT, u)
-        call_map = {ins.get("strike"): ins for ins in call_instruments}
-        put_map = {ins.get("strike"): ins for ins in put_instruments}
+        call_map = {ins.strike: ins for ins in call_instruments}
+        put_map = {ins.strike: ins for ins in put_instruments}
         common_strikes = set(call_map.keys()).intersection(set(put_map.keys()))
         straddles = []
         for strike in common_strikes:
@@ -111,15 +207,92 @@ class TickerService:
                 "underlying": u.value,
                 "strike": strike,
                 "expiry": expiry,
-                "call": call_map[strike],
-                "put": put_map[strike],
+                "call": call_map[strike].toDict(),
+                "put": put_map[strike].toDict(),
             }
             straddles.append(straddle)
         straddles.sort(key=lambda x: x["strike"])
         return straddles
     
-    @timer
-    def straddle_quotes(self, idList: list[str]):
+    def straddleWindow(self, u: Underlying, spot: float, width: int) -> list[tuple[str, Instrument, Instrument]]:
+        """(id, call, put) of the earliest expiry's straddle nearest `spot` and `width` strikes either side, by strike."""
+        expiry = self.broker.findEarliestExpiry(u)
+        if not expiry:
+            raise ValueError("Could not find expiry for the given underlying")
+        call_map = {ins.strike: ins for ins in self.broker.findOptions(expiry, OptionType.CALL, u)}
+        put_map = {ins.strike: ins for ins in self.broker.findOptions(expiry, OptionType.PUT, u)}
+        strikes = sorted(call_map.keys() & put_map.keys())
+        if not strikes:
+            return []
+        i = bisect_left(strikes, spot)
+        # The nearer of the strikes either side of spot
+        if i == len(strikes) or (i > 0 and spot - strikes[i - 1] <= strikes[i] - spot):
+            i -= 1
+        window = strikes[max(0, i - width):i + width + 1]
+        return [(f'{u.value}:{expiry}:{round(strike)}', call_map[strike], put_map[strike]) for strike in window]
+    
+    def lastSpotWindow(self, u: Underlying, width: int) -> list[tuple[str, Instrument, Instrument]]:
+        """`straddleWindow` around the last spot seen for `u`; empty until one has been."""
+        spot = LAST_SPOTS.get(u)
+        return self.straddleWindow(u, spot, width) if spot is not None else []
+    
+    def seeSpot(self, u: Underlying, spot_key: str, quotes: dict[str, Any]) -> float | None:
+        """`u`'s spot from a quote call's result, remembered for the next `lastSpotWindow`; None if it wasn't quoted."""
+        if spot_key not in quotes:
+            return None
+        spot = LAST_SPOTS[u] = quotes[spot_key]["last_price"]
+        return spot
+    
+    def _chainGuess(self, underlying_str: str | None, width: int) -> tuple[Underlying, str, list[str]]:
+        """The underlying, its spot's quote key, and leg keys to quote with it: around the last spot seen, if any."""
+        if not underlying_str:
+            raise ValueError("Underlying parameter is required")
+        u = Underlying(underlying_str)
+        spot_key = instrumentKey(self.broker.findStock(u))
+        window = self.lastSpotWindow(u, width + CHAIN_MARGIN)
+        return u, spot_key, [key for _, call, put in window for key in (instrumentKey(call), instrumentKey(put))]
+    
+    def _chainWindow(self, u: Underlying, width: int, spot_key: str, quotes: dict[str, Any]) -> tuple[list[tuple[str, Instrument, Instrument]], list[str]]:
+        """The window around the quoted spot, and any of its legs that weren't quoted with it."""
+        spot = self.seeSpot(u, spot_key, quotes)
+        if spot is None:
+            raise ValueError(f"Could not quote {u.value}")
+        window = self.straddleWindow(u, spot, width)
+        missing = [key for _, call, put in window for key in (instrumentKey(call), instrumentKey(put)) if key not in quotes]
+        return window, missing
+    
+    def _straddleChain(self, u: Underlying, spot_key: str, window: list[tuple[str, Instrument, Instrument]], quotes: dict[str, Any], raw: bool, greeks: bool = False):
+        # Shaped like StraddleChain
+        spot = self._combineQuotes(u.value, [quotes[spot_key]], False)
+        straddles = []
+        for id, call, put in window:
+            call_quote, put_quote = quotes.get(instrumentKey(call)), quotes.get(instrumentKey(put))
+            if call_quote is None or put_quote is None:
+                continue
+            straddles.append({
+                "id": id,
+                "strike": call.strike,
+                "call_price": call_quote["last_price"],
+                "put_price": put_quote["last_price"],
+                **self._combineQuotes(id, [call_quote, put_quote], raw),
+            })
+        atm = min((abs(call.strike - spot["price"]), call.strike) for _, call, _ in window)[1] if window else None
+        chain = {
+            "underlying": u.value,
+            "expiry": window[0][1].expiry if window else None,
+            "spot": spot["price"],
+            "atm": atm,
+            "tstring": spot["tstring"],
+            "timestamp": spot["timestamp"],
+            "straddles": straddles,
+        }
+        if greeks:
+            for straddle, straddle_greeks in zip(straddles, chainGreeks(chain)):
+                straddle["greeks"] = straddle_greeks
+        return chain
+    
+    def _straddleKeys(self, idList: list[str]) -> dict[str, str]:
+        """Quote key of every leg -> its straddle id."""
         keys = {}
         for id in idList:
             call_opt, put_opt = self._straddleInsts(id)
@@ -128,17 +301,17 @@ class TickerService:
                 raise ValueError(f"Could not find instruments for straddle id {id}")
             keys[call_key] = id
             keys[put_key] = id
-        
-        quotes = self.broker.quote(*keys.keys())
-        
+        return keys
+    
+    def _straddleQuotes(self, keys: dict[str, str], quotes: dict[str, Any], raw: bool = True):
         quote_list_map: dict[str, list] = {}
         for key, quote in quotes.items():
             quote_list_map.setdefault(keys[key], []).append(quote)
         
-        return { id: self._combineQuotes(id, quotes) for id, quotes in quote_list_map.items() }
+        return { id: self._combineQuotes(id, quotes, raw) for id, quotes in quote_list_map.items() }
     
-    def _combineQuotes(self, id: str, quotes: list[Any]):
-        # TODO: create a pydantic model for this
+    def _combineQuotes(self, id: str, quotes: list[Any], raw: bool = True):
+        # Shaped like CombinedQuote
         naive_time: datetime = quotes[0]["timestamp"]
         tzone_aware_time = naive_time.replace(tzinfo=TZONE_INDIA)
         combined = {
@@ -146,10 +319,18 @@ class TickerService:
             "tstring": tzone_aware_time.isoformat(),
             "timestamp": int(tzone_aware_time.timestamp()*1000),
             "price": sum(q["last_price"] for q in quotes),
-            "quotes": quotes,
         }
+        if raw:
+            combined["quotes"] = quotes
         return combined
     
+    def straddleLegs(self, id: str) -> tuple[int, int]:
+        """Instrument tokens of the call and put legs of a straddle id."""
+        call_opt, put_opt = self._straddleInsts(id)
+        if not call_opt or not put_opt:
+            raise ValueError(f"Could not find instruments for straddle id {id}")
+        return instrumentToken(call_opt), instrumentToken(put_opt)
+    
     def _straddleInsts(self, id: str):
         [underlying, expiry, strike_str] = id.split(':')
         u = Underlying(underlying)
@@ -159,3 +340,118 @@ class TickerService:
         return call_opt, put_opt
     
 
+
+
+class AsyncTickerService(TickerService):
+    """TickerService for async routes: Kite calls are awaited on an AsyncBroker instead of holding a thread."""
+    broker: AsyncBroker
+    
+    def __init__(self, user_token: str) -> None:
+        self.broker = ASYNC_BROKER_POOL.get(user_token)  # type: ignore[assignment]
+    
+    @timer
+    async def user(self):
+        return await self.broker.profile()
+    
+    async def _instrumentsReady(self) -> None:
+        # Lookups load the instrument dump on first use; wait for that off the event loop,
+        # or every request (/health included) stalls behind the download
+        if not INSTRUMENT_STORE.is_ready():
+            await asyncio.to_thread(INSTRUMENT_STORE.ensure_loaded)
+    
+    @timer
+    async def quote(self, underlying_str: str | None, raw: bool = True):
+        if not underlying_str:
+            raise ValueError("Underlying parameter is required")
+        u = Underlying(underlying_str)
+        await self._instrumentsReady()
+        key = instrumentKey(self.broker.findStock(u))
+        quote_map = await self.broker.quote(key)
+        return { u.value: self._combineQuotes(u.value, [quote_map.get(key)], raw) }
+    
+    @timer
+    async def history(self, underlying_str: str | None, from_str: str | None, to_str: str | None = None, columnar: bool = False, interval_str: str | None = None, raw: bool = True):
+        await self._instrumentsReady()
+        tokens, from_date, to_date, interval, bucket = self._historyArgs(underlying_str, from_str, to_str, interval_str)
+        history = await self.broker.history(tokens[0], from_date, to_date, interval)
+        # Building the response is CPU work; keep it off the event loop
+        return { underlying_str: await asyncio.to_thread(self._historyResponse, [history], columnar, bucket, raw) }
+    
+    @timer
+    async def straddleHistory(self, straddle_id: str | None, from_str: str | None, to_str: str | None = None, columnar: bool = False, interval_str: str | None = None, raw: bool = True):
+        await self._instrumentsReady()
+        tokens, from_date, to_date, interval, bucket = self._straddleHistoryArgs(straddle_id, from_str, to_str, interval_str)
+        legs = await asyncio.gather(*(self.broker.history(token, from_date, to_date, interval) for token in tokens))
+        return { straddle_id: await asyncio.to_thread(self._historyResponse, list(legs), columnar, bucket, raw) }
+    
+    async def historyLines(self, underlying_str: str | None, from_str: str | None, to_str: str | None = None, interval_str: str | None = None, raw: bool = True) -> AsyncIterator[bytes]:
+        """
+        `history` rows as NDJSON, sent one Kite-sized chunk at a time.
+        
+        Bad arguments raise here, before anything is streamed.
+        """
+        await self._instrumentsReady()
+        return self._streamHistory(*self._historyArgs(underlying_str, from_str, to_str, interval_str), raw)
+    
+    async def straddleHistoryLines(self, straddle_id: str | None, from_str: str | None, to_str: str | None = None, interval_str: str | None = None, raw: bool = True) -> AsyncIterator[bytes]:
+        """`straddleHistory` rows as NDJSON, like `historyLines`."""
+        await self._instrumentsReady()
+        return self._streamHistory(*self._straddleHistoryArgs(straddle_id, from_str, to_str, interval_str), raw)
+    
+    async def _streamHistory(self, tokens: list[int], from_date: datetime, to_date: datetime, interval: Interval, bucket: int | None, raw: bool = True) -> AsyncIterator[bytes]:
+        # Every leg is split into the same spans, so their parts line up
+        parts = [self.broker.historyParts(token, from_date, to_date, interval) for token in tokens]
+        held: list[list[dict[str, Any]]] = [[] for _ in tokens]
+        try:
+            while True:
+                # Let every leg settle before raising, so none is still running when it's closed
+                legs = await asyncio.gather(*(anext(part, None) for part in parts), return_exceptions=True)
+                for leg in legs:
+                    if isinstance(leg, BaseException):
+                        raise leg
+                if any(leg is None for leg in legs):
+                    break
+                legs = [carried + leg for carried, leg in zip(held, legs)]
+                if bucket:
+                    # A resampled bar never spans days; hold the last day back until it's complete
+                    legs, held = _splitLastDay(legs)
+                if all(legs):
+                    yield await asyncio.to_thread(self._historyLines, legs, bucket, raw)
+            if all(held):
+                yield await asyncio.to_thread(self._historyLines, held, bucket, raw)
+        except Exception as e:
+            # Headers are long gone; the client learns of the failure from the last line
+            print(f"[HISTORY] Stream failed: {e}")
+            yield ndjsonLine({"error": str(e)})
+        finally:
+            for part in parts:
+                await part.aclose()
+    
+    def _historyLines(self, legs: list[list[dict[str, Any]]], bucket: int | None, raw: bool = True) -> bytes:
+        return b"".join(ndjsonLines(self._historyResponse(legs, False, bucket, raw)))
+    
+    @timer
+    async def straddleChain(self, underlying_str: str | None, width: int, raw: bool = False, greeks: bool = False):
+        await self._instrumentsReady()
+        u, spot_key, legs = self._chainGuess(underlying_str, width)
+        quotes = await self.broker.quote(spot_key, *legs)
+        window, missing = self._chainWindow(u, width, spot_key, quotes)
+        if missing:
+            quotes = {**quotes, **await self.broker.quote(*missing)}
+        return self._straddleChain(u, spot_key, window, quotes, raw, greeks)
+    
+    @timer
+    async def straddle_quotes(self, idList: list[str], raw: bool = True):
+        await self._instrumentsReady()
+        keys = self._straddleKeys(idList)
+        quotes = await self.broker.quote(*keys.keys())
+        return self._straddleQuotes(keys, quotes, raw)
+
+
+def _splitLastDay(legs: list[list[dict[str, Any]]]) -> tuple[list[list[dict[str, Any]]], list[list[dict[str, Any]]]]:
+    """Each leg's records before the IST day of the lead leg's last record, and those from it on."""
+    if not legs[0]:
+        return [[] for _ in legs], legs
+    last = legs[0][-1]["date"].astimezone(TZONE_INDIA)
+    cutoff = last.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [[r for r in leg if r["date"] < cutoff] for leg in legs], [[r for r in leg if r["date"] >= cutoff] for leg in legs]
@@ -1 +1,2 @@
 from .decorators import *
+from .encoding import *
@@ -1,5 +1,9 @@
 
+import asyncio
+from collections import OrderedDict
 import functools
+import inspect
+import threading
 import time
 from typing import Any, Callable, Self
 
@@ -9,7 +13,27 @@ from app.constants import TIMER_THRESHOLD
 
 THRESHOLD_WARNING = TIMER_THRESHOLD
 THRESHOLD_ERROR = 4  # 4 seconds
+def _log_elapsed(func, start: float) -> None:
+    elapsed = time.perf_counter() - start
+    msg = f"[TIMER] {func.__qualname__} took {elapsed:.6f}s"
+    if elapsed > THRESHOLD_ERROR:
+        logger.error(msg)
+    elif elapsed > THRESHOLD_WARNING:
+        logger.warning(msg)
+
 def timer(func):
+    if inspect.iscoroutinefunction(func):
+        # Time the awaited call, not just creating the coroutine
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _log_elapsed(func, start)
+
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         start = time.perf_counter()  # better for timing
@@ -17,12 +41,7 @@ def timer(func):
         try:
             return func(*args, **kwargs)
         finally:
-            elapsed = time.perf_counter() - start
-            msg = f"[TIMER] {func.__qualname__} took {elapsed:.6f}s"
-            if elapsed > THRESHOLD_ERROR:
-                logger.error(msg)
-            elif elapsed > THRESHOLD_WARNING:
-                logger.warning(msg)
+            _log_elapsed(func, start)
 
     return wrapper
 
@@ -46,6 +65,123 @@ class KeyValCache:
             cls._instance = cls()
         return cls._instance
 
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being set."""
+    MISSING = object()
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._generation = 0
+
+    def generation(self) -> int:
+        """
+        Bumped by every delete and clear. Read it before loading a value and
+        pass it to `set`, so a value loaded before an invalidation is dropped
+        instead of cached after it.
+        """
+        with self._lock:
+            return self._generation
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._cache[key]
+                return default
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, generation: int | None = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._cache[key] = (time.monotonic() + self.ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Exception | None = None
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution and its result or
+    error. Errors `share` rejects (e.g. the leader's own token expiring) are
+    not handed on; waiting callers make the call again, once, themselves.
+    """
+    def __init__(self, share: Callable[[Exception], bool] = lambda e: True):
+        self.share = share
+        self._lock = threading.Lock()
+        self._flights: dict[Any, _Flight] = {}
+        self._tasks: dict[Any, asyncio.Future] = {}
+
+    def do(self, key: Any, func: Callable[..., Any], *args, retry: bool = True) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if leader:
+            try:
+                flight.result = func(*args)
+            except Exception as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+            return flight.result
+        flight.done.wait()
+        if flight.error is not None:
+            if retry and not self.share(flight.error):
+                return self.do(key, func, *args, retry=False)
+            raise flight.error
+        return flight.result
+
+    async def doAsync(self, key: Any, func: Callable[..., Any], *args, retry: bool = True) -> Any:
+        # Keyed by loop too: a task can only be awaited on the loop running it
+        loop_key = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(loop_key)
+        leader = task is None
+        if leader:
+            task = self._tasks[loop_key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda t: self._landed(loop_key, t))
+        try:
+            # Shielded so one caller giving up doesn't cancel the call for the rest
+            return await asyncio.shield(task)
+        except Exception as e:
+            if leader or not retry or self.share(e):
+                raise
+            return await self.doAsync(key, func, *args, retry=False)
+
+    def _landed(self, loop_key: Any, task: asyncio.Future) -> None:
+        if self._tasks.get(loop_key) is task:
+            del self._tasks[loop_key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller gave up waiting
+
 CACHE_CONTAINERS: dict[str, KeyValCache] = {}
 def cache_container(name: str) -> KeyValCache:
     if name not in CACHE_CONTAINERS:
@@ -0,0 +1,14 @@
+"""
+Benchmarks package.
+
+Standalone scripts that measure hot paths with synthetic data, run from the
+project root with: python -m benchmarks.<name>
+"""
+
+import os
+
+# Settings are read when app.constants is first imported, so they go here.
+# Keep benchmarks from reading or overwriting a real same-day snapshot.
+os.environ.setdefault("INSTRUMENTS_SNAPSHOT_PATH", "")
+# create_engine is lazy; a parseable URL is enough for importing the broker
+os.environ.setdefault("POSTGRES_CONNECTION", "postgresql://localhost/ticker")
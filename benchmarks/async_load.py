@@ -0,0 +1,127 @@
+"""
+Load benchmark: /ticker/user on the old sync path (Starlette threadpool +
+requests) vs the async path (AsyncBroker + aiohttp), against a local mock
+Kite server in a separate process that answers after a fixed latency.
+
+The profile call is used because its response is tiny, so the numbers show
+how many Kite calls can be in flight rather than CPU spent parsing candles.
+
+While each load runs, /health is polled to show whether slow Kite calls
+starve unrelated endpoints.
+
+Run with: python -m benchmarks.async_load
+"""
+
+import asyncio
+import json
+import multiprocessing
+import statistics
+import time
+
+import httpx
+
+from benchmarks.chain import use_synthetic_instruments
+
+use_synthetic_instruments()
+
+from fastapi import Depends, Header  # noqa: E402
+
+from app.api.auth import authenticate_request  # noqa: E402
+from app.api.ticker import get_user_token  # noqa: E402
+from app.brokers.instruments import INSTRUMENT_STORE  # noqa: E402
+from app.brokers.pool import ASYNC_BROKER_POOL, BROKER_POOL  # noqa: E402
+from app.brokers.scheduler import KITE_SCHEDULER, Endpoint  # noqa: E402
+from app.brokers.zerodha import AsyncBroker, Broker  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.ticker_service import TickerService  # noqa: E402
+
+MOCK_PORT = 8765
+MOCK_ROOT = f"http://127.0.0.1:{MOCK_PORT}"
+LATENCY = 1.0  # seconds per Kite call
+REQUESTS = 2_000
+CONCURRENCY = 400
+USERS = 4  # each access token gets its own broker and connection pool
+
+
+def serve_mock_kite():
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    body = json.dumps({"status": "success", "data": {"user_id": "AB1234", "user_name": "Bench"}}).encode()
+
+    async def profile(request):
+        await asyncio.sleep(LATENCY)
+        return Response(body, media_type="application/json")
+
+    mock = Starlette(routes=[Route("/user/profile", profile)])
+    uvicorn.run(mock, host="127.0.0.1", port=MOCK_PORT, log_level="error", backlog=4096, timeout_keep_alive=60)
+
+
+def bench_user_token(x_bench_user: str = Header()) -> str:
+    return x_bench_user
+
+
+@app.get("/bench/sync_user")
+def sync_user(token: str = Depends(get_user_token)):
+    # The pre-async route: a sync def holding a threadpool thread for the whole Kite call
+    return TickerService(token).user()
+
+
+async def load(client: httpx.AsyncClient, path: str) -> tuple[float, list[float]]:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    health_latencies = []
+    done = asyncio.Event()
+
+    async def one(i: int):
+        async with semaphore:
+            r = await client.get(path, headers={"x-bench-user": f"user{i % USERS}"})
+            assert r.status_code == 200, r.text
+
+    async def poll_health():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/health")
+            health_latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.05)
+
+    poller = asyncio.create_task(poll_health())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await poller
+    return REQUESTS / elapsed, health_latencies
+
+
+async def main():
+    server = multiprocessing.Process(target=serve_mock_kite, daemon=True)
+    server.start()
+    INSTRUMENT_STORE.ensure_loaded()
+    BROKER_POOL.factory = lambda access_token: Broker(access_token=access_token, root=MOCK_ROOT)
+    ASYNC_BROKER_POOL.factory = lambda access_token: AsyncBroker(access_token=access_token, root=MOCK_ROOT)
+    # The mock has no rate limit; measure calls in flight, not Kite's 10 req/s per token
+    KITE_SCHEDULER.rates = dict.fromkeys(Endpoint, 1e9)
+    app.dependency_overrides[authenticate_request] = lambda: None
+    app.dependency_overrides[get_user_token] = bench_user_token
+    for _ in range(50):
+        try:
+            httpx.get(MOCK_ROOT)
+            break
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+    print(f"{REQUESTS} requests, {CONCURRENCY} in flight, {USERS} users, Kite latency {LATENCY * 1000:.0f} ms")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://ticker", timeout=120) as client:
+        for name, path in (("sync", "/bench/sync_user"), ("async", "/ticker/user")):
+            throughput, health = await load(client, path)
+            print(f"{name:>6}: {throughput:7.1f} req/s   /health p50 {statistics.median(health):7.1f} ms  max {max(health):7.1f} ms")
+    for broker in ASYNC_BROKER_POOL.drain():
+        await broker.aclose()  # type: ignore[attr-defined]
+    server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Auth benchmark: Clerk SDK authentication run twice per request (router
+dependency + get_user) vs one local pass per request with cached JWKS and
+claims, on tokens signed with a locally generated RS256 key.
+
+The legacy path is given the PEM key directly, so neither side touches the
+network; against Clerk the legacy path would also pay for JWKS fetches.
+
+Run with: python -m benchmarks.auth
+"""
+
+import time
+
+from clerk_backend_api import Clerk
+from clerk_backend_api.security import authenticate_request as clerk_authenticate_request
+from clerk_backend_api.security.types import AuthenticateRequestOptions
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+import jwt
+from jwt.algorithms import RSAAlgorithm
+from starlette.requests import Request
+
+from app.api.auth import get_user, authenticate_request
+from app.services.session_auth import SESSION_VERIFIER
+
+REQUESTS = 2_000
+# Building a Clerk client alone takes tens of ms, so the legacy path gets fewer runs
+LEGACY_REQUESTS = 50
+ORIGIN = "http://localhost:3000"
+KID = "ins_bench"
+
+
+def signed_token(private_key, sub: str) -> str:
+    now = int(time.time())
+    claims = {"sub": sub, "iat": now, "exp": now + 600, "iss": "https://clerk.bench", "azp": ORIGIN}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": KID})
+
+
+def request(token: str) -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    return Request({"type": "http", "method": "GET", "path": "/ticker/quote", "headers": headers, "query_string": b""})
+
+
+def legacy_request(token: str, pem: str) -> None:
+    # What every /ticker request did: build a Clerk client and authenticate, twice
+    for _ in range(2):
+        sdk = Clerk(bearer_auth="sk_bench")
+        state = sdk.authenticate_request(request(token), AuthenticateRequestOptions(jwt_key=pem, authorized_parties=[ORIGIN]))
+        assert state.is_signed_in
+
+
+def local_request(token: str) -> None:
+    req = request(token)
+    authenticate_request(req)
+    get_user(req)
+
+
+def timed(name: str, call, runs: int = REQUESTS) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        call()
+    elapsed = (time.perf_counter() - start) / runs * 1e6
+    print(f"{name:>26}: {elapsed:8.1f} us/request")
+    return elapsed
+
+
+def main():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key = private_key.public_key()
+    pem = public_key.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+    jwk = {**RSAAlgorithm.to_jwk(public_key, as_dict=True), "kid": KID, "use": "sig", "alg": "RS256"}
+
+    fetches = []
+    def fetch_jwks():
+        fetches.append(time.time())
+        return {"keys": [jwk]}
+
+    SESSION_VERIFIER.fetch_jwks = fetch_jwks
+    SESSION_VERIFIER.authorized_parties = [ORIGIN]
+
+    token = signed_token(private_key, "user_bench")
+    assert clerk_authenticate_request(request(token), AuthenticateRequestOptions(jwt_key=pem, authorized_parties=[ORIGIN])).is_signed_in
+
+    legacy = timed("clerk sdk, twice", lambda: legacy_request(token, pem), LEGACY_REQUESTS)
+    fresh_tokens = iter([signed_token(private_key, f"user_{i}") for i in range(REQUESTS)])
+    first = timed("local, new token each time", lambda: local_request(next(fresh_tokens)))
+    cached = timed("local, repeated token", lambda: local_request(token))
+    print(f"speedup: {legacy / first:.1f}x on first sight, {legacy / cached:.1f}x cached; JWKS fetched {len(fetches)}x")
+
+
+if __name__ == "__main__":
+    main()
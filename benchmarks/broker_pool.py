@@ -0,0 +1,84 @@
+"""
+Broker pool benchmark: a new Broker (and KiteConnect session) per request
+vs a pooled Broker per access token, calling a local stand-in for Kite.
+
+The stand-in is plain HTTP on localhost, so this only measures the TCP
+connect and session setup saved per request; against api.kite.trade the
+TLS handshake is saved as well.
+
+Run with: python -m benchmarks.broker_pool
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import statistics
+import threading
+import time
+
+from app.brokers.pool import BrokerPool
+from app.brokers.scheduler import KITE_SCHEDULER, Endpoint
+from app.brokers.zerodha import Broker
+
+REQUESTS = 500
+PROFILE = b'{"status": "success", "data": {"user_id": "AB1234", "user_name": "Bench"}}'
+
+
+class KiteStandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Kite
+    # Headers and body go out as separate writes; without this Nagle + delayed
+    # ACK stall every reused connection by ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PROFILE)))
+        self.end_headers()
+        self.wfile.write(PROFILE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def timed(call) -> list[float]:
+    samples = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{name:>10}: mean {statistics.mean(samples):.3f} ms  p50 {statistics.median(samples):.3f} ms  p99 {p99:.3f} ms")
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KiteStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = f"http://127.0.0.1:{server.server_port}"
+    # The stand-in has no rate limit; measure connection reuse, not Kite's 10 req/s
+    KITE_SCHEDULER.rates = dict.fromkeys(Endpoint, 1e9)
+
+    def per_request():
+        broker = Broker(access_token="bench", root=root)
+        broker.profile()
+        broker.close()
+
+    pool = BrokerPool(factory=lambda access_token: Broker(access_token=access_token, root=root))
+
+    def pooled():
+        pool.get("bench").profile()
+
+    # Warm both paths before measuring
+    per_request(), pooled()
+    fresh, reused = timed(per_request), timed(pooled)
+    report("per-request", fresh)
+    report("pooled", reused)
+    print(f"saved per request: {statistics.mean(fresh) - statistics.mean(reused):.3f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
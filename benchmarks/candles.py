@@ -0,0 +1,42 @@
+"""
+Synthetic minute candles shaped like `KiteConnect.historical_data()`.
+"""
+
+import datetime
+import random
+from typing import Any
+
+from app.constants import TZONE_INDIA
+
+MINUTES_PER_SESSION = 375  # 09:15 to 15:30
+
+
+def synthetic_candles(days: int = 60, seed: int = 0, drop_every: int = 0) -> list[dict[str, Any]]:
+    """Time-ordered minute candles for `days` weekday sessions ending yesterday."""
+    rng = random.Random(seed)
+    sessions = []
+    day = datetime.date.today()
+    while len(sessions) < days:
+        day -= datetime.timedelta(days=1)
+        if day.weekday() < 5:
+            sessions.append(day)
+    candles = []
+    price = 200.0
+    n = 0
+    for day in reversed(sessions):
+        start = datetime.datetime.combine(day, datetime.time(9, 15), tzinfo=TZONE_INDIA)
+        for minute in range(MINUTES_PER_SESSION):
+            n += 1
+            if drop_every and n % drop_every == 0:
+                continue
+            open_ = price
+            price = max(1.0, price + rng.uniform(-2, 2))
+            candles.append({
+                "date": start + datetime.timedelta(minutes=minute),
+                "open": open_,
+                "high": max(open_, price) + rng.uniform(0, 1),
+                "low": min(open_, price) - rng.uniform(0, 1),
+                "close": price,
+                "volume": rng.randint(0, 50_000),
+            })
+    return candles
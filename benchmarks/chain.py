@@ -0,0 +1,63 @@
+"""
+Synthetic instrument dump shaped like `KiteConnect.instruments()`.
+
+Rows are rendered to the instruments CSV and parsed with kiteconnect's own
+parser, so every row owns its strings just like a real download.
+"""
+
+import csv
+import datetime
+import io
+from typing import Any
+
+from kiteconnect import KiteConnect
+
+# (name, exchange, segment, spot, strike step, weekly expiries)
+CHAINS = [
+    ("NIFTY", "NFO", "NFO-OPT", 25000, 50, 18),
+    ("SENSEX", "BFO", "BFO-OPT", 82000, 100, 18),
+]
+STRIKES_PER_SIDE = 120
+FILLER_ROWS = 90_000
+COLUMNS = [
+    "instrument_token", "exchange_token", "tradingsymbol", "name", "last_price", "expiry",
+    "strike", "tick_size", "lot_size", "instrument_type", "segment", "exchange",
+]
+
+
+def synthetic_csv(filler_rows: int = FILLER_ROWS) -> str:
+    """Full NFO/BFO option chains for the supported underlyings plus filler rows."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    token = 1
+    today = datetime.date.today()
+    for name, exchange, segment, spot, step, weeks in CHAINS:
+        for week in range(weeks):
+            expiry = today + datetime.timedelta(days=7 * week + 1)
+            for i in range(-STRIKES_PER_SIDE, STRIKES_PER_SIDE + 1):
+                strike = spot + i * step
+                for option_type in ("CE", "PE"):
+                    writer.writerow([
+                        token, token, f"{name}{expiry:%y%m%d}{strike}{option_type}", name, 0,
+                        expiry.isoformat(), strike, 0.05, 75, option_type, segment, exchange,
+                    ])
+                    token += 1
+    for tradingsymbol, exchange in (("NIFTY 50", "NSE"), ("SENSEX", "BSE")):
+        writer.writerow([token, token, tradingsymbol, tradingsymbol, 0, "", 0, 0, 0, "EQ", "INDICES", exchange])
+        token += 1
+    for i in range(filler_rows):
+        writer.writerow([token, token, f"STOCK{i}", f"STOCK{i % 2000}", 0, "", 0, 0.05, 1, "EQ", "NSE", "NSE"])
+        token += 1
+    return out.getvalue()
+
+
+def synthetic_instruments(filler_rows: int = FILLER_ROWS) -> list[dict[str, Any]]:
+    return KiteConnect._parse_instruments(None, synthetic_csv(filler_rows))  # type: ignore[arg-type]
+
+
+def use_synthetic_instruments() -> list[dict[str, Any]]:
+    """Serve the synthetic dump from `KiteConnect.instruments` so no network is needed."""
+    rows = synthetic_instruments()
+    KiteConnect.instruments = lambda self, exchange=None: rows  # type: ignore[method-assign]
+    return rows
@@ -0,0 +1,81 @@
+"""
+Implied volatility and Greeks benchmark: both legs of a 101-strike NIFTY
+straddle chain over a day of minute timestamps, solved in one vectorized
+pass vs one strike-timestamp point at a time in plain Python (Newton on
+math.erf, the way a client loop would do it).
+
+Run with: python -m benchmarks.greeks
+"""
+
+import math
+import time
+
+import numpy as np
+
+from app.services.greeks import bsPrice, straddleGreeks
+
+SPOT = 25000.0
+STEP = 50
+STRIKES = 101
+TIMESTAMPS = 375  # one session of minutes
+RATE = 0.065
+SCALAR_POINTS = 2000
+RUNS = 5
+
+
+def scenario():
+    rng = np.random.default_rng(0)
+    # A random-walk spot and a volatility smile, a week or so from expiry
+    spot = (SPOT + np.cumsum(rng.normal(0, 5, TIMESTAMPS)))[:, None]
+    years = np.linspace(7, 6.75, TIMESTAMPS)[:, None] / 365
+    strike = SPOT + STEP * (np.arange(STRIKES) - STRIKES // 2)[None, :]
+    vol = 0.12 + 0.5 * np.square(np.log(strike / spot))
+    call = bsPrice(spot, strike, years, vol, RATE, True)
+    put = bsPrice(spot, strike, years, vol, RATE, False)
+    return spot, strike, years, vol, call, put
+
+
+def scalar_iv(price: float, spot: float, strike: float, years: float, is_call: bool) -> float:
+    def cdf(x):
+        return 0.5 * math.erfc(-x / math.sqrt(2))
+
+    sigma = 0.2
+    for _ in range(100):
+        root = sigma * math.sqrt(years)
+        d1 = (math.log(spot / strike) + (RATE + sigma * sigma / 2) * years) / root
+        discounted = strike * math.exp(-RATE * years)
+        call = spot * cdf(d1) - discounted * cdf(d1 - root)
+        diff = (call if is_call else call - spot + discounted) - price
+        if abs(diff) < 1e-6:
+            break
+        vega = spot * math.exp(-d1 * d1 / 2) / math.sqrt(2 * math.pi) * math.sqrt(years)
+        sigma = min(max(sigma - diff / vega, 1e-4), 5.0)
+    return sigma
+
+
+def main():
+    spot, strike, years, vol, call, put = scenario()
+    points = STRIKES * TIMESTAMPS
+    print(f"{STRIKES} strikes x {TIMESTAMPS} timestamps = {points} straddle points (2 legs each)")
+
+    greeks = straddleGreeks(spot, strike, years, call, put, RATE)
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        greeks = straddleGreeks(spot, strike, years, call, put, RATE)
+    elapsed = (time.perf_counter() - start) / RUNS * 1000
+    solved = np.isfinite(greeks["call_iv"]) & np.isfinite(greeks["put_iv"])
+    error = np.nanmax(np.abs(np.stack([greeks["call_iv"], greeks["put_iv"]]) - vol))
+    print(f"{'vectorized':>10}: {elapsed:8.1f} ms  {points / elapsed:8.0f} points/ms  solved {solved.mean():.2%}  max IV error {error:.1e}")
+
+    rng = np.random.default_rng(1)
+    sample = [(rng.integers(TIMESTAMPS), rng.integers(STRIKES)) for _ in range(SCALAR_POINTS)]
+    start = time.perf_counter()
+    for t, k in sample:
+        scalar_iv(call[t, k], spot[t, 0], strike[0, k], years[t, 0], True)
+        scalar_iv(put[t, k], spot[t, 0], strike[0, k], years[t, 0], False)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{'scalar':>10}: {elapsed / SCALAR_POINTS * points:8.1f} ms  {SCALAR_POINTS / elapsed:8.0f} points/ms  (IV only, {SCALAR_POINTS} sampled points)")
+
+
+if __name__ == "__main__":
+    main()
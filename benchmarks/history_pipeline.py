@@ -0,0 +1,53 @@
+"""
+History processing benchmark: per-record parsing vs the NumPy pipeline,
+for a two-leg straddle over 60 days of minute candles (no network time).
+
+Run with: python -m benchmarks.history_pipeline
+"""
+
+import time
+
+from benchmarks.candles import synthetic_candles
+from benchmarks.straddle_history import legacy_parse_history_record
+
+from app.services.candles import combineLegs  # noqa: E402
+from app.services.ticker_service import TickerService  # noqa: E402
+
+RUNS = 5
+
+
+def legacy(call_history, put_history):
+    call_map = {record["date"]: record for record in call_history}
+    put_map = {record["date"]: record for record in put_history}
+    common = set(call_map).intersection(put_map)
+    parsed = [legacy_parse_history_record([call_map[ts], put_map[ts]]) for ts in common]
+    return sorted(parsed, key=lambda x: x["timestamp"])
+
+
+def main():
+    legs = [synthetic_candles(seed=1), synthetic_candles(seed=2, drop_every=97)]
+    service = TickerService("bench")
+
+    expected = legacy(*legs)
+    rows = service._historyResponse(legs, columnar=False)
+    assert rows == expected
+    columns = service._historyResponse(legs, columnar=True)
+    assert columns["timestamp"] == [r["timestamp"] for r in expected]
+    assert columns["close"] == [r["close"] for r in expected]
+    print(f"{len(legs[0])} + {len(legs[1])} candles -> {len(rows)} rows")
+
+    cases = (
+        ("per-record (before)", lambda: legacy(*legs)),
+        ("numpy -> rows", lambda: service._historyResponse(legs, columnar=False)),
+        ("numpy -> columns", lambda: service._historyResponse(legs, columnar=True)),
+        ("  of which combineLegs", lambda: combineLegs(legs)),
+    )
+    for label, fn in cases:
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            fn()
+        print(f"{label:<24} {(time.perf_counter() - start) / RUNS * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Streaming history benchmark: straddle history for 120 sessions of minute
+candles per leg, encoded as one JSON document the way the route's
+response is vs streamed as NDJSON, measuring time to the first byte, total
+time and peak Python memory. Kite is stubbed with a fixed latency per call.
+
+Run with: python -m benchmarks.history_stream
+"""
+
+import asyncio
+import bisect
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.candles import synthetic_candles
+from benchmarks.chain import use_synthetic_instruments
+
+use_synthetic_instruments()
+
+from app.brokers.zerodha import indiaTime  # noqa: E402
+from app.services.ticker_service import AsyncTickerService, TickerService  # noqa: E402
+
+DAYS = 120  # trading sessions per leg
+LATENCY = 0.2  # simulated Kite round trip per call, seconds
+
+
+def stub_history(service: AsyncTickerService, legs: dict[int, list]) -> None:
+    dates = {token: [record["date"] for record in records] for token, records in legs.items()}
+
+    async def history(instrument_token, from_date, to_date, interval):
+        await asyncio.sleep(LATENCY)
+        records, index = legs[instrument_token], dates[instrument_token]
+        from_date, to_date = indiaTime(from_date), indiaTime(to_date)
+        return records[bisect.bisect_left(index, from_date):bisect.bisect_right(index, to_date)]
+
+    service.broker.history = history  # type: ignore[method-assign]
+
+
+async def as_json(service: AsyncTickerService, straddle_id: str, params: dict[str, str | None]):
+    # What FastAPI does with the route's return value before sending anything
+    yield JSONResponse(jsonable_encoder(await service.straddleHistory(straddle_id, **params))).body
+
+
+async def as_ndjson(service: AsyncTickerService, straddle_id: str, params: dict[str, str | None]):
+    async for chunk in await service.straddleHistoryLines(straddle_id, **params):
+        yield chunk
+
+
+async def measure(lines) -> tuple[float, float, int]:
+    start = time.perf_counter()
+    first = None
+    size = 0
+    async for chunk in lines:
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return first or 0.0, time.perf_counter() - start, size
+
+
+async def main():
+    straddle_id = TickerService("bench").straddles("NIFTY")[100]["id"]
+    call_token, put_token = TickerService("bench").straddleLegs(straddle_id)
+    legs = {call_token: synthetic_candles(DAYS, seed=1), put_token: synthetic_candles(DAYS, seed=2)}
+    service = AsyncTickerService("bench")
+    stub_history(service, legs)
+    dates = {
+        "from_str": legs[call_token][0]["date"].replace(hour=0, minute=0, tzinfo=None).isoformat(),
+        "to_str": legs[call_token][-1]["date"].replace(hour=23, minute=59, tzinfo=None).isoformat(),
+    }
+    print(f"{DAYS} sessions of minute candles per leg, Kite latency {LATENCY * 1000:.0f} ms per call")
+    for interval in (None, "15minute"):
+        params = {**dates, "interval_str": interval}
+        for name, lines in (
+            ("JSON", lambda: as_json(service, straddle_id, params)),
+            ("NDJSON", lambda: as_ndjson(service, straddle_id, params)),
+        ):
+            ttfb, total, size = await measure(lines())
+            tracemalloc.start()
+            await measure(lines())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            label = f"{interval or 'minute'} {name}"
+            print(f"{label:>17}: first byte {ttfb * 1000:7.1f} ms  total {total * 1000:7.1f} ms  {size / 2**20:5.1f} MiB sent  peak {peak / 2**20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
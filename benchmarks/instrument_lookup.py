@@ -0,0 +1,75 @@
+"""
+Option lookup benchmark: linear scans vs the InstrumentStore indexes.
+
+Run with: python -m benchmarks.instrument_lookup
+"""
+
+import datetime
+import random
+import time
+
+from benchmarks.chain import use_synthetic_instruments
+
+use_synthetic_instruments()
+
+from app.brokers.instruments import INSTRUMENT_STORE  # noqa: E402
+from app.brokers.zerodha import Broker  # noqa: E402
+from app.models.ticker import OptionType, Underlying  # noqa: E402
+
+LOOKUPS = 20_000
+
+
+def linear_find_option(expiry, strike, option_type, underlying):
+    instruments = INSTRUMENT_STORE.instruments()
+    instrumentsList = instruments.get(underlying, {}).get(option_type, {}).get(str(expiry), [])
+    opts = [ins for ins in instrumentsList if int(round(ins.strike)) == int(round(strike))]
+    return opts[0] if opts else None
+
+
+def linear_earliest_expiry(underlying):
+    instruments = INSTRUMENT_STORE.instruments()
+    now = str(datetime.datetime.now())
+    expiries = set()
+    for option_type in instruments.get(underlying, {}):
+        for expiry_str in instruments[underlying][option_type]:
+            if expiry_str >= now:
+                expiries.add(expiry_str)
+    return min(expiries) if expiries else None
+
+
+def bench(label, fn, calls):
+    start = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1e6 / len(calls):8.2f} us/call")
+    return elapsed
+
+
+def main():
+    broker = Broker()
+    rng = random.Random(0)
+    calls = []
+    for _ in range(LOOKUPS):
+        u = rng.choice(list(Underlying))
+        expiry = rng.choice(INSTRUMENT_STORE.expiries(u))
+        strikes = [ins.strike for ins in broker.findOptions(expiry, OptionType.CALL, u)]
+        calls.append((expiry, rng.choice(strikes), rng.choice(list(OptionType)), u))
+
+    for args in calls[:500]:
+        assert broker.findOption(*args) is linear_find_option(*args)
+    for u in Underlying:
+        assert broker.findEarliestExpiry(u) == linear_earliest_expiry(u)
+
+    before = bench("findOption (linear)", linear_find_option, calls)
+    after = bench("findOption (index)", broker.findOption, calls)
+    print(f"{'speedup':<28} {before / after:8.1f}x")
+
+    expiry_calls = [(u,) for u in Underlying] * 1000
+    before = bench("findEarliestExpiry (scan)", linear_earliest_expiry, expiry_calls)
+    after = bench("findEarliestExpiry (bisect)", broker.findEarliestExpiry, expiry_calls)
+    print(f"{'speedup':<28} {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Instrument cache memory benchmark: kiteconnect dicts vs Instrument records.
+
+Each layout is built in a fresh interpreter with the same indexes the store
+keeps (nested map, option index, sorted expiries, stocks), both from a
+download (CSV parsed, then filtered) and from a same-day pickle snapshot.
+Two figures per layout and source, each from its own run:
+
+- retained: heap still traced by tracemalloc once the parse buffers are gone
+- rss: RSS growth with tracemalloc off, after the download text and parsed
+  rows are dropped and glibc has handed freed arenas back (malloc_trim)
+
+Run with: python -m benchmarks.instrument_memory
+"""
+
+import ctypes
+import gc
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def release() -> None:
+    gc.collect()
+    try:
+        # Freed parse buffers otherwise stay in the heap and count as RSS
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def dictsLayout(rows):
+    """The previous layout: raw kiteconnect rows, indexed like InstrumentStore."""
+    from app.brokers.instruments import TRADING_SYMBOL
+    from app.models.ticker import OptionType, Underlying
+
+    names, types = {u.value for u in Underlying}, {o.value for o in OptionType}
+    instruments, options, expiries, stocks = {}, {}, {}, {}
+    for ins in rows:
+        if ins["name"] in names and ins["instrument_type"] in types:
+            underlying, option_type, expiry = Underlying(ins["name"]), OptionType(ins["instrument_type"]), str(ins["expiry"])
+            instruments.setdefault(underlying, {}).setdefault(option_type, {}).setdefault(expiry, []).append(ins)
+            options.setdefault((underlying, option_type, expiry, int(round(ins["strike"]))), ins)
+            expiries.setdefault(underlying, set()).add(expiry)
+        elif ins["tradingsymbol"] in TRADING_SYMBOL:
+            stocks[TRADING_SYMBOL[ins["tradingsymbol"]]] = ins
+    return instruments, stocks, options, {u: sorted(e) for u, e in expiries.items()}
+
+
+def download(layout: str):
+    from benchmarks.chain import synthetic_csv
+    from kiteconnect import KiteConnect
+
+    from app.brokers.instruments import InstrumentStore
+
+    csv_text = synthetic_csv(filler_rows=0)
+    rows = KiteConnect._parse_instruments(None, csv_text)  # type: ignore[arg-type]
+    if layout == "dicts":
+        return dictsLayout(rows)
+    return InstrumentStore()._preprocessInstruments(rows)
+
+
+def build(layout: str, measure: str, snapshot: str | None = None):
+    # Imported up front so module objects don't count towards either layout
+    import app.brokers.instruments  # noqa: F401
+    import benchmarks.chain  # noqa: F401
+    import kiteconnect  # noqa: F401
+
+    release()
+    rss_before = rss_bytes()
+    if measure == "retained":
+        tracemalloc.start()
+
+    if snapshot:
+        with open(snapshot, "rb") as f:
+            cache = pickle.load(f)
+    else:
+        cache = download(layout)
+    release()
+
+    if measure == "retained":
+        print(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+    else:
+        print(rss_bytes() - rss_before)
+    return cache
+
+
+def measure(layout: str, what: str, snapshot: str | None = None) -> int:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.instrument_memory", layout, what, *([snapshot] if snapshot else [])],
+        capture_output=True, text=True, check=True,
+    )
+    return int(out.stdout.split()[-1])
+
+
+def main():
+    if len(sys.argv) > 2:
+        build(*sys.argv[1:4])
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        for source in ("download", "snapshot"):
+            results = {}
+            for layout in ("dicts", "records"):
+                snapshot = None
+                if source == "snapshot":
+                    snapshot = os.path.join(directory, f"{layout}.pickle")
+                    with open(snapshot, "wb") as f:
+                        pickle.dump(download(layout), f, protocol=pickle.HIGHEST_PROTOCOL)
+                results[layout] = retained, rss = measure(layout, "retained", snapshot), measure(layout, "rss", snapshot)
+                print(f"{source:<8} {layout:<8} retained {retained / 2**20:7.2f} MiB   rss +{rss / 2**20:7.2f} MiB")
+            (dicts_retained, dicts_rss), (records_retained, records_rss) = results["dicts"], results["records"]
+            print(f"{source:<8} {'ratio':<8} retained {dicts_retained / records_retained:5.2f}x smaller   rss {dicts_rss / records_rss:5.2f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
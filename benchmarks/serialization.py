@@ -0,0 +1,86 @@
+"""
+Response serialization benchmark: bytes and CPU per response for straddle
+history (60 sessions of minute candles per leg, and 15-minute bars),
+quotes for a 41-straddle chain and the straddle list, encoded
+
+- the old way, jsonable_encoder then json.dumps (FastAPI's default for a
+  route without a response model),
+- through the pydantic response models (validate, then dump_json),
+- with FastJSONResponse (orjson), with and without the raw records/quotes.
+
+Run with: python -m benchmarks.serialization
+"""
+
+import datetime
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from benchmarks.candles import synthetic_candles
+from benchmarks.chain import use_synthetic_instruments
+
+use_synthetic_instruments()
+
+from app.models.ticker import CombinedQuote, HistoryRow, Straddle  # noqa: E402
+from app.services.ticker_service import TickerService  # noqa: E402
+from app.utils import FastJSONResponse  # noqa: E402
+
+RUNS = 5
+
+
+def legacy(content) -> bytes:
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def cpu_ms(encode) -> tuple[float, int]:
+    body = encode()
+    start = time.process_time()
+    for _ in range(RUNS):
+        encode()
+    return (time.process_time() - start) / RUNS * 1000, len(body)
+
+
+def fake_quotes(keys) -> dict:
+    now = datetime.datetime.now().replace(microsecond=0)
+    return {
+        key: {
+            "instrument_token": i, "timestamp": now, "last_trade_time": now, "last_price": 100.0 + i,
+            "last_quantity": 75, "buy_quantity": 1000, "sell_quantity": 900, "volume": 123456,
+            "average_price": 99.5, "oi": 5000, "oi_day_high": 6000, "oi_day_low": 4000,
+            "net_change": 0, "lower_circuit_limit": 0.05, "upper_circuit_limit": 500.0,
+            "ohlc": {"open": 98.0, "high": 105.0, "low": 95.0, "close": 99.0},
+            "depth": {side: [{"price": 100.0, "quantity": 75, "orders": 1}] * 5 for side in ("buy", "sell")},
+        }
+        for i, key in enumerate(keys)
+    }
+
+
+def main():
+    service = TickerService("bench")
+    legs = [synthetic_candles(seed=1), synthetic_candles(seed=2)]
+    straddles = service.straddles("NIFTY")
+    keys = service._straddleKeys([s["id"] for s in straddles[100:141]])
+    quotes = fake_quotes(keys)
+    payloads = {
+        "straddle history, minute": (TypeAdapter(dict[str, list[HistoryRow]]), lambda raw: {"id": service._historyResponse(legs, False, None, raw)}),
+        "straddle history, 15minute": (TypeAdapter(dict[str, list[HistoryRow]]), lambda raw: {"id": service._historyResponse(legs, False, 15, raw)}),
+        "straddle quotes, 41 ids": (TypeAdapter(dict[str, CombinedQuote]), lambda raw: service._straddleQuotes(keys, quotes, raw)),
+        "straddles": (TypeAdapter(list[Straddle]), lambda raw: straddles),
+    }
+    for name, (adapter, build) in payloads.items():
+        content, lean = build(True), build(False)
+        print(name)
+        for label, encode in (
+            ("jsonable_encoder + json", lambda: legacy(content)),
+            ("pydantic models", lambda: adapter.dump_json(adapter.validate_python(content))),
+            ("orjson", lambda: FastJSONResponse(content).body),
+            ("orjson, raw=false", lambda: FastJSONResponse(lean).body),
+        ):
+            ms, size = cpu_ms(encode)
+            print(f"  {label:>24}: {size / 1024:9.1f} KiB  {ms:8.2f} ms CPU")
+
+
+if __name__ == "__main__":
+    main()
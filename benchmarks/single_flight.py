@@ -0,0 +1,82 @@
+"""
+Single-flight benchmark: many users opening the same chart at once, i.e.
+identical concurrent `Broker.history` calls for today's candles, with and
+without coalescing, against a stubbed Kite with a fixed latency.
+
+Run with: python -m benchmarks.single_flight
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import threading
+import time
+
+from app.brokers.scheduler import KITE_SCHEDULER, Endpoint
+from app.brokers.zerodha import AsyncBroker, Broker, Interval
+from app.constants import TZONE_INDIA
+
+LATENCY = 0.3  # simulated Kite round trip, seconds
+CALLERS = 50
+
+
+class CountingKite:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def historical_data(self, instrument_token, from_date, to_date, interval):
+        with self._lock:
+            self.calls += 1
+        time.sleep(LATENCY)
+        return [{"date": from_date, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 0}]
+
+    async def historical_data_async(self, instrument_token, from_date, to_date, interval):
+        with self._lock:
+            self.calls += 1
+        await asyncio.sleep(LATENCY)
+        return [{"date": from_date, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 0}]
+
+
+def today_range() -> tuple[datetime.datetime, datetime.datetime]:
+    start = datetime.datetime.now(TZONE_INDIA).replace(hour=9, minute=15, second=0, microsecond=0)
+    return start, start + datetime.timedelta(hours=6)
+
+
+def run_sync(coalesce: bool) -> tuple[int, float]:
+    broker, kite = Broker(access_token="bench"), CountingKite()
+    broker.kite.historical_data = kite.historical_data  # type: ignore[method-assign]
+    from_date, to_date = today_range()
+    call = broker.history if coalesce else broker._history
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CALLERS) as pool:
+        list(pool.map(lambda _: call(1, from_date, to_date, Interval.MINUTE), range(CALLERS)))
+    return kite.calls, time.perf_counter() - start
+
+
+async def run_async(coalesce: bool) -> tuple[int, float]:
+    broker, kite = AsyncBroker(access_token="bench"), CountingKite()
+    broker.akite.historical_data = kite.historical_data_async  # type: ignore[method-assign]
+    from_date, to_date = today_range()
+    call = broker.history if coalesce else broker._history
+    start = time.perf_counter()
+    await asyncio.gather(*(call(1, from_date, to_date, Interval.MINUTE) for _ in range(CALLERS)))
+    await broker.aclose()
+    return kite.calls, time.perf_counter() - start
+
+
+def main():
+    # Without coalescing 50 calls would queue for Kite's 3/s; lift the limit so
+    # both runs show only what coalescing saves
+    KITE_SCHEDULER.rates = dict.fromkeys(Endpoint, 1e9)
+    print(f"{CALLERS} identical history calls, Kite latency {LATENCY * 1000:.0f} ms")
+    for name, coalesce in (("separate", False), ("coalesced", True)):
+        calls, elapsed = run_sync(coalesce)
+        print(f"sync  {name:>9}: {calls:3d} upstream calls  {elapsed * 1000:7.1f} ms")
+    for name, coalesce in (("separate", False), ("coalesced", True)):
+        calls, elapsed = asyncio.run(run_async(coalesce))
+        print(f"async {name:>9}: {calls:3d} upstream calls  {elapsed * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
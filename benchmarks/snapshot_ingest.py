@@ -0,0 +1,137 @@
+"""
+Snapshot ingestion benchmark: rows per second through the one-row
+POST /ticker/snapshots endpoint vs POST /ticker/snapshots/bulk (JSON array
+and NDJSON, one large upload and many small concurrent ones), and the
+repository's COPY vs executemany paths underneath.
+
+Needs a Postgres it may write to; price_snapshots is emptied between runs:
+POSTGRES_CONNECTION=postgresql://... python -m benchmarks.snapshot_ingest
+"""
+
+import asyncio
+import datetime
+import json
+import time
+
+import httpx
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.api.auth import authenticate_request
+from app.db import Base, engine
+from app.db.models import PriceSnapshot
+from app.db.snapshot_writer import SNAPSHOT_WRITER
+from app.main import app
+from app.repository.price_snapshot_repository import PriceSnapshotRepository
+
+SINGLE_ROWS = 1_000
+BULK_ROWS = 50_000
+SMALL_BATCHES = 500  # concurrent uploads of SMALL_ROWS each, like many recorders
+SMALL_ROWS = 100
+CONCURRENCY = 16
+
+
+def snapshots(n: int) -> list[dict]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        {"symbol": f"NIFTY{24000 + 50 * (i % 40)}CE", "price": 100 + i % 97, "created_at": (now + datetime.timedelta(milliseconds=i)).isoformat()}
+        for i in range(n)
+    ]
+
+
+def reset() -> None:
+    with engine.begin() as connection:
+        connection.execute(text("TRUNCATE price_snapshots"))
+
+
+def count() -> int:
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT count(*) FROM price_snapshots")).scalar_one()
+
+
+def report(name: str, rows: int, elapsed: float) -> None:
+    stored = count()
+    assert stored == rows, f"{name}: expected {rows} rows, found {stored}"
+    print(f"{name:>28}: {rows:7d} rows  {elapsed * 1000:8.1f} ms  {rows / elapsed:10.0f} rows/s")
+
+
+async def gather_limited(calls, concurrency: int = CONCURRENCY) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(call):
+        async with semaphore:
+            r = await call()
+            assert r.status_code < 300, r.text
+
+    await asyncio.gather(*(one(call) for call in calls))
+
+
+async def endpoints(client: httpx.AsyncClient) -> None:
+    reset()
+    rows = snapshots(SINGLE_ROWS)
+    start = time.perf_counter()
+    # One at a time: get_db's thread-scoped session can't be shared by concurrent requests
+    await gather_limited(
+        (lambda row=row: client.post("/ticker/snapshots", params={"symbol": row["symbol"], "price": row["price"]})
+        for row in rows),
+        concurrency=1,
+    )
+    report("POST /snapshots (per row)", SINGLE_ROWS, time.perf_counter() - start)
+
+    reset()
+    body = json.dumps(snapshots(BULK_ROWS))
+    start = time.perf_counter()
+    r = await client.post("/ticker/snapshots/bulk", params={"wait": "true"}, content=body, headers={"content-type": "application/json"})
+    assert r.status_code == 201, r.text
+    report("bulk, one JSON array", BULK_ROWS, time.perf_counter() - start)
+
+    reset()
+    body = "\n".join(json.dumps(row) for row in snapshots(BULK_ROWS))
+    start = time.perf_counter()
+    r = await client.post("/ticker/snapshots/bulk", params={"wait": "true"}, content=body, headers={"content-type": "application/x-ndjson"})
+    assert r.status_code == 201, r.text
+    report("bulk, one NDJSON body", BULK_ROWS, time.perf_counter() - start)
+
+    reset()
+    bodies = [json.dumps(snapshots(SMALL_ROWS)) for _ in range(SMALL_BATCHES)]
+    start = time.perf_counter()
+    await gather_limited(
+        lambda body=body: client.post("/ticker/snapshots/bulk", params={"wait": "true"}, content=body, headers={"content-type": "application/json"})
+        for body in bodies
+    )
+    report(f"bulk, {SMALL_BATCHES} x {SMALL_ROWS} concurrent", SMALL_BATCHES * SMALL_ROWS, time.perf_counter() - start)
+
+
+def repository() -> None:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows = [(f"NIFTY{24000 + 50 * (i % 40)}CE", 100.0 + i % 97, now) for i in range(BULK_ROWS)]
+
+    reset()
+    start = time.perf_counter()
+    with Session(engine) as session:
+        session.execute(insert(PriceSnapshot), [{"symbol": s, "price": p, "created_at": c} for s, p, c in rows])
+        session.commit()
+    report("repository executemany", BULK_ROWS, time.perf_counter() - start)
+
+    reset()
+    start = time.perf_counter()
+    with Session(engine) as session:
+        PriceSnapshotRepository(session).add_rows(rows)
+        session.commit()
+    report("repository COPY", BULK_ROWS, time.perf_counter() - start)
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[authenticate_request] = lambda: None
+    SNAPSHOT_WRITER.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://ticker", timeout=120) as client:
+        await endpoints(client)
+    SNAPSHOT_WRITER.stop()
+    repository()
+    reset()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
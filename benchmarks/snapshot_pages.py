@@ -0,0 +1,130 @@
+"""
+Snapshot query benchmark on a seeded price_snapshots table:
+
+- a deep page of one symbol's history, OFFSET vs keyset cursor, first with
+  the old single-column indexes on symbol and created_at, then with the
+  composite (symbol, created_at, id) index;
+- exporting one symbol, as ORM instances in a list vs tuples streamed
+  from a server-side cursor (time and peak Python memory).
+
+Needs a Postgres it may write to; price_snapshots is replaced:
+POSTGRES_CONNECTION=postgresql://... python -m benchmarks.snapshot_pages
+"""
+
+import datetime
+import statistics
+import time
+import tracemalloc
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.db import Base, engine
+from app.db.models import PriceSnapshot
+from app.repository.price_snapshot_repository import PriceSnapshotRepository
+
+ROWS = 1_000_000
+SYMBOLS = 20
+PAGE = 50
+DEPTH = 20_000  # rows skipped before the measured page
+RUNS = 20
+COMPOSITE = "ix_price_snapshots_symbol_created_at_id"
+
+
+def seed() -> None:
+    Base.metadata.drop_all(engine, tables=[PriceSnapshot.__table__])  # type: ignore[list-item]
+    Base.metadata.create_all(engine, tables=[PriceSnapshot.__table__])  # type: ignore[list-item]
+    start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    rows = ((f"SYM{i % SYMBOLS}", float(i % 1000), start + datetime.timedelta(seconds=i)) for i in range(ROWS))
+    with Session(engine) as session:
+        PriceSnapshotRepository(session).add_rows(rows)
+        session.commit()
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE price_snapshots"))
+
+
+def use_old_indexes() -> None:
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP INDEX IF EXISTS {COMPOSITE}"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_price_snapshots_symbol ON price_snapshots (symbol)"))
+        connection.execute(text("ANALYZE price_snapshots"))
+
+
+def use_composite_index() -> None:
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX IF EXISTS ix_price_snapshots_symbol"))
+    for index in PriceSnapshot.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE price_snapshots"))
+
+
+def timed(call) -> float:
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def pages(label: str) -> None:
+    symbol = "SYM7"
+    with Session(engine) as session:
+        repo = PriceSnapshotRepository(session)
+        # The cursor a client would hold after paging down to DEPTH
+        boundary = session.execute(
+            select(PriceSnapshot.created_at, PriceSnapshot.id)
+            .where(PriceSnapshot.symbol == symbol)
+            .order_by(PriceSnapshot.created_at.desc(), PriceSnapshot.id.desc())
+            .offset(DEPTH - 1).limit(1)
+        ).one()
+
+        def offset_page():
+            stmt = (
+                select(PriceSnapshot).where(PriceSnapshot.symbol == symbol)
+                .order_by(PriceSnapshot.created_at.desc()).offset(DEPTH).limit(PAGE)
+            )
+            return session.execute(stmt).scalars().all()
+
+        def keyset_page():
+            return repo.page(symbol, after=(boundary.created_at, boundary.id), limit=PAGE)
+
+        assert [s.id for s in offset_page()] == [r.id for r in keyset_page()]
+        print(f"{label:>18}: OFFSET {DEPTH} page {timed(offset_page):7.2f} ms   keyset page {timed(keyset_page):6.2f} ms")
+
+
+def exports() -> None:
+    symbol = "SYM3"
+
+    def orm_list():
+        with Session(engine) as session:
+            snapshots = session.execute(select(PriceSnapshot).where(PriceSnapshot.symbol == symbol).order_by(PriceSnapshot.created_at)).scalars().all()
+            return sum(1 for s in snapshots if s.price >= 0)
+
+    def streamed():
+        with Session(engine) as session:
+            return sum(1 for row in PriceSnapshotRepository(session).stream(symbol) if row.price >= 0)
+
+    for name, export in (("ORM list", orm_list), ("streamed tuples", streamed)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        count = export()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{'export ' + name:>24}: {count} rows  {elapsed * 1000:7.1f} ms  {count / elapsed:9.0f} rows/s  peak {peak / 2**20:6.1f} MiB")
+
+
+def main():
+    print(f"seeding {ROWS} snapshots over {SYMBOLS} symbols")
+    seed()
+    use_old_indexes()
+    pages("old indexes")
+    use_composite_index()
+    pages("composite index")
+    exports()
+
+
+if __name__ == "__main__":
+    main()
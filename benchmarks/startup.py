@@ -0,0 +1,54 @@
+"""
+Startup benchmark: wall time of `import app.main` in a fresh interpreter,
+and the instrument load that now happens after the server is up, both from
+Kite (cold) and from the same-day local snapshot (warm).
+
+Run with: python -m benchmarks.startup
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = 5
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def import_time() -> float:
+    # Inherits the placeholder settings from the benchmarks package
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    samples = [import_time() for _ in range(RUNS)]
+    print(f"import app.main       median {statistics.median(samples) * 1000:8.1f} ms over {RUNS} runs")
+
+    snapshot_dir = tempfile.mkdtemp()
+    os.environ["INSTRUMENTS_SNAPSHOT_PATH"] = os.path.join(snapshot_dir, "instruments.pickle")
+
+    from benchmarks.chain import use_synthetic_instruments
+
+    use_synthetic_instruments()
+    from app.brokers.instruments import InstrumentStore
+
+    start = time.perf_counter()
+    InstrumentStore().ensure_loaded()
+    print(f"instrument load cold  {(time.perf_counter() - start) * 1000:8.1f} ms (background, synthetic dump)")
+
+    start = time.perf_counter()
+    InstrumentStore().ensure_loaded()
+    print(f"instrument load warm  {(time.perf_counter() - start) * 1000:8.1f} ms (local snapshot)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Straddle chain benchmark: one dashboard refresh of the ATM +-10 NIFTY
+straddles, done the old way (GET /quote for spot, GET /straddles, then
+GET /straddleQuotes for the window's ids) vs one GET /straddleChain.
+Kite quotes are stubbed with a fixed latency per call.
+
+Run with: python -m benchmarks.straddle_chain
+"""
+
+import asyncio
+import datetime
+import statistics
+import time
+
+import httpx
+
+from benchmarks.chain import use_synthetic_instruments
+
+use_synthetic_instruments()
+
+from app.api.auth import authenticate_request  # noqa: E402
+from app.api.ticker import get_async_service, get_service  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.ticker_service import AsyncTickerService, TickerService  # noqa: E402
+
+LATENCY = 0.05  # simulated Kite quote round trip, seconds
+WIDTH = 10
+RUNS = 20
+
+
+class StubQuotes:
+    def __init__(self):
+        self.calls = 0
+
+    async def quote(self, *keys):
+        self.calls += 1
+        await asyncio.sleep(LATENCY)
+        now = datetime.datetime.now().replace(microsecond=0)
+        return {key: {"timestamp": now, "last_price": 25012.0 if key.startswith("NSE:") else 100.0} for key in keys}
+
+
+async def old_refresh(client: httpx.AsyncClient) -> int:
+    spot = await client.get("/ticker/quote", params={"underlying": "NIFTY"})
+    straddles = await client.get("/ticker/straddles", params={"underlying": "NIFTY"})
+    price, rows = spot.json()["NIFTY"]["price"], straddles.json()
+    atm = min(range(len(rows)), key=lambda i: abs(rows[i]["strike"] - price))
+    ids = ",".join(row["id"] for row in rows[max(0, atm - WIDTH):atm + WIDTH + 1])
+    quotes = await client.get("/ticker/straddleQuotes", params={"ids": ids})
+    return sum(len(r.content) for r in (spot, straddles, quotes))
+
+
+async def chain_refresh(client: httpx.AsyncClient) -> int:
+    r = await client.get("/ticker/straddleChain", params={"underlying": "NIFTY", "width": WIDTH})
+    assert len(r.json()["straddles"]) == 2 * WIDTH + 1
+    return len(r.content)
+
+
+async def main():
+    stub = StubQuotes()
+
+    def service():
+        s = AsyncTickerService("bench")
+        s.broker.quote = stub.quote  # type: ignore[method-assign]
+        return s
+
+    app.dependency_overrides[authenticate_request] = lambda: None
+    app.dependency_overrides[get_async_service] = service
+    app.dependency_overrides[get_service] = lambda: TickerService("bench")
+    print(f"NIFTY ATM +-{WIDTH}, Kite quote latency {LATENCY * 1000:.0f} ms")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://ticker") as client:
+        for name, refresh in (("quote + straddles + straddleQuotes", old_refresh), ("straddleChain", chain_refresh)):
+            await refresh(client)  # warm up; the chain learns spot here
+            stub.calls = 0
+            samples = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                size = await refresh(client)
+                samples.append((time.perf_counter() - start) * 1000)
+            print(f"{name:>34}: {statistics.median(samples):7.1f} ms  {stub.calls / RUNS:.0f} Kite calls  {size / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
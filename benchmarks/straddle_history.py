@@ -0,0 +1,95 @@
+"""
+Straddle history benchmark: sequential fetch + hash join + sort vs
+concurrent leg fetch + linear merge, on 60 days of minute candles per leg.
+
+Run with: python -m benchmarks.straddle_history
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks.candles import synthetic_candles
+from benchmarks.chain import use_synthetic_instruments
+
+use_synthetic_instruments()
+
+from app.brokers.zerodha import instrumentToken  # noqa: E402
+from app.services.ticker_service import AsyncTickerService  # noqa: E402
+
+LATENCY = 0.25  # simulated Kite round trip per leg, seconds
+RUNS = 5
+
+
+def legacy_parse_history_record(records):
+    tzone_aware_time = records[0]["date"]
+    return {
+        "tstring": tzone_aware_time.isoformat(),
+        "timestamp": int(tzone_aware_time.timestamp()*1000),
+        "price": sum(float(record["close"]) for record in records),
+        "open": sum(float(record["open"]) for record in records),
+        "high": sum(float(record["high"]) for record in records),
+        "low": sum(float(record["low"]) for record in records),
+        "close": sum(float(record["close"]) for record in records),
+        "volume": sum(float(record["volume"]) for record in records),
+        "records": records,
+    }
+
+
+def legacy_straddle_history(service, straddle_id, from_str, to_str):
+    from datetime import datetime
+
+    call_opt, put_opt = service._straddleInsts(straddle_id)
+    from_date, to_date = datetime.fromisoformat(from_str), datetime.fromisoformat(to_str)
+    call_history = asyncio.run(service.broker.history(instrumentToken(call_opt), from_date, to_date))
+    put_history = asyncio.run(service.broker.history(instrumentToken(put_opt), from_date, to_date))
+    call_map = {record["date"]: record for record in call_history}
+    put_map = {record["date"]: record for record in put_history}
+    common_timestamps = set(call_map.keys()).intersection(set(put_map.keys()))
+    combined_history = {ts: [call_map[ts], put_map[ts]] for ts in common_timestamps}
+    parsed_records = [legacy_parse_history_record(records) for records in combined_history.values()]
+    return {straddle_id: sorted(parsed_records, key=lambda x: x["timestamp"])}
+
+
+def main():
+    service = AsyncTickerService("bench")
+    straddle = service.straddles("NIFTY")[100]
+    call_opt, _ = service._straddleInsts(straddle["id"])
+    legs = {
+        True: synthetic_candles(seed=1),
+        False: synthetic_candles(seed=2, drop_every=97),
+    }
+    latency = {"value": LATENCY}
+
+    async def fake_history(instrument_token, from_date, to_date, interval=None):
+        await asyncio.sleep(latency["value"])
+        return legs[instrument_token == instrumentToken(call_opt)]
+
+    service.broker.history = fake_history  # type: ignore[method-assign]
+    args = (service, straddle["id"], "2020-01-01T09:15:00", "2030-01-01T15:30:00")
+
+    def concurrent():
+        return asyncio.run(service.straddleHistory(*args[1:]))
+
+    before = legacy_straddle_history(*args)[straddle["id"]]
+    after = concurrent()[straddle["id"]]
+    assert [r["timestamp"] for r in before] == [r["timestamp"] for r in after]
+    print(f"{len(legs[True])} call candles, {len(legs[False])} put candles, {len(after)} joined")
+
+    for label, fn in (("sequential + hash join", lambda: legacy_straddle_history(*args)),
+                      ("concurrent + merge", concurrent)):
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            fn()
+        wall = (time.perf_counter() - start) / RUNS
+        latency["value"] = 0
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        latency["value"] = LATENCY
+        print(f"{label:<24} wall {wall * 1000:8.1f} ms   peak alloc {peak / 2**20:7.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
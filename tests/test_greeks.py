@@ -0,0 +1,61 @@
+import math
+
+import numpy as np
+
+from app.services.greeks import bsGreeks, bsPrice, impliedVol, normCdf, straddleGreeks
+
+RATE = 0.065
+
+
+def test_norm_cdf_matches_erfc():
+    x = np.linspace(-12, 12, 2401)
+    expected = np.array([0.5 * math.erfc(-v / math.sqrt(2)) for v in x])
+    assert np.allclose(normCdf(x), expected, rtol=1e-8, atol=1e-15)
+
+
+def test_scalar_inputs():
+    # Scalars go through the far-tail branch as well as 0-d arrays do
+    assert math.isclose(normCdf(8.0), 1.0)
+    assert normCdf(-8.0) < 1e-15
+    assert np.shape(normCdf(np.float64(0.3))) == ()
+    assert math.isclose(float(bsPrice(24000, 30000, 1 / 365, 0.1, RATE)), 0.0, abs_tol=1e-12)
+    price = float(bsPrice(25000, 25100, 7 / 365, 0.2, RATE, False))
+    assert math.isclose(float(impliedVol(price, 25000, 25100, 7 / 365, RATE, False)), 0.2, rel_tol=1e-9)
+    assert all(np.shape(v) == () for v in bsGreeks(25000, 25100, 7 / 365, 0.2, RATE).values())
+
+
+def test_implied_vol_round_trip():
+    spot = np.array([[24900.0], [25000.0], [25100.0]])
+    strike = 25000 + 100 * np.arange(-10, 11)[None, :]
+    years = np.array([[1 / 365], [7 / 365], [30 / 365]])
+    vol = 0.12 + 0.5 * np.square(np.log(strike / spot))
+    for is_call in (True, False):
+        price = bsPrice(spot, strike, years, vol, RATE, is_call)
+        iv = impliedVol(price, spot, strike, years, RATE, is_call)
+        vega = bsGreeks(spot, strike, years, vol, RATE, is_call)["vega"]
+        # Where a price barely moves with volatility it pins volatility down only loosely
+        sensitive = vega > 0.01
+        assert sensitive.mean() > 0.5
+        assert np.allclose(iv[sensitive], vol[sensitive], rtol=0, atol=1e-8)
+        assert np.allclose(bsPrice(spot, strike, years, iv, RATE, is_call), price, rtol=0, atol=1e-6)
+
+
+def test_put_call_parity():
+    call = bsPrice(25000, 25200, 7 / 365, 0.15, RATE, True)
+    put = bsPrice(25000, 25200, 7 / 365, 0.15, RATE, False)
+    assert math.isclose(float(call - put), 25000 - 25200 * math.exp(-RATE * 7 / 365), rel_tol=1e-12)
+
+
+def test_unsolvable_prices_are_nan():
+    iv = impliedVol([-1.0, 30000.0, 100.0], 25000, 25000, [7 / 365, 7 / 365, 0.0], RATE, True)
+    assert np.isnan(iv).all()
+
+
+def test_straddle_greeks_sum_legs():
+    call = bsPrice(25000, 25000, 7 / 365, 0.15, RATE, True)
+    put = bsPrice(25000, 25000, 7 / 365, 0.15, RATE, False)
+    greeks = straddleGreeks(25000, 25000, 7 / 365, call, put, RATE)
+    assert math.isclose(float(greeks["call_iv"]), 0.15, rel_tol=1e-9)
+    assert math.isclose(float(greeks["put_iv"]), 0.15, rel_tol=1e-9)
+    for name in ("delta", "gamma", "vega", "theta"):
+        assert math.isclose(float(greeks[name]), float(greeks[f"call_{name}"] + greeks[f"put_{name}"]))
@@ -0,0 +1,84 @@
+import asyncio
+
+from app.services.live_feed import SUBSCRIBER_QUEUE_SIZE, FakeTickSource, LiveFeedHub, Subscriber
+
+LEGS = (101, 102)
+
+
+class RecordingTickSource(FakeTickSource):
+    def __init__(self):
+        super().__init__(interval=0.01, seed=1)
+        self.unsubscribed: list[int] = []
+        self.stopped = False
+
+    def unsubscribe(self, tokens: list[int]) -> None:
+        self.unsubscribed.extend(tokens)
+        super().unsubscribe(tokens)
+
+    def stop(self) -> None:
+        self.stopped = True
+        super().stop()
+
+
+def hub() -> tuple[LiveFeedHub, list[RecordingTickSource]]:
+    sources: list[RecordingTickSource] = []
+
+    def factory(access_token: str) -> RecordingTickSource:
+        sources.append(RecordingTickSource())
+        return sources[-1]
+
+    return LiveFeedHub(factory), sources
+
+
+def test_ticks_fan_out_to_every_subscriber():
+    async def run():
+        feeds, sources = hub()
+        loop = asyncio.get_running_loop()
+        first, second = Subscriber(loop), Subscriber(loop)
+        feed = feeds.acquire("token")
+        assert feeds.acquire("token") is feed
+        feed.subscribe(first, "NIFTY:2025-06-05:25000", LEGS)
+        feed.subscribe(second, "NIFTY:2025-06-05:25000", LEGS)
+        for subscriber in (first, second):
+            update = await asyncio.wait_for(subscriber.queue.get(), 1)
+            assert update["id"] == "NIFTY:2025-06-05:25000"
+            assert update["price"] == update["call"] + update["put"]
+        assert len(sources) == 1
+        feeds.release("token")
+        feeds.release("token")
+
+    asyncio.run(run())
+
+
+def test_legs_unsubscribed_after_last_subscriber_leaves():
+    async def run():
+        feeds, sources = hub()
+        loop = asyncio.get_running_loop()
+        first, second = Subscriber(loop), Subscriber(loop)
+        feed = feeds.acquire("token")
+        feeds.acquire("token")
+        feed.subscribe(first, "NIFTY:2025-06-05:25000", LEGS)
+        feed.subscribe(second, "NIFTY:2025-06-05:25000", LEGS)
+        feed.unsubscribeAll(first)
+        assert sources[0].unsubscribed == []
+        feed.unsubscribeAll(second)
+        assert sorted(sources[0].unsubscribed) == sorted(LEGS)
+        feeds.release("token")
+        assert not sources[0].stopped
+        feeds.release("token")
+        assert sources[0].stopped
+
+    asyncio.run(run())
+
+
+def test_full_subscriber_queue_drops_updates():
+    async def run():
+        subscriber = Subscriber(asyncio.get_running_loop())
+        for i in range(SUBSCRIBER_QUEUE_SIZE + 10):
+            subscriber.push({"id": "x", "price": float(i)})
+        await asyncio.sleep(0)
+        assert subscriber.queue.qsize() == SUBSCRIBER_QUEUE_SIZE
+        # The oldest updates are kept; the overflow was dropped without blocking
+        assert subscriber.queue.get_nowait()["price"] == 0.0
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import app.brokers.quotes
+from app.brokers.quotes import QuoteAggregator
+from app.brokers.scheduler import Endpoint, KiteScheduler
+
+
+class FakeKite:
+    def __init__(self, delay: float = 0.0):
+        self.sync = SimpleNamespace(access_token="token")
+        self.delay = delay
+        self.calls = 0
+
+    async def quote(self, *keys):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {key: {"last_price": 100.0} for key in keys}
+
+
+@pytest.fixture(autouse=True)
+def unthrottled(monkeypatch):
+    # Kite's real quote limit would queue the later calls for a second
+    monkeypatch.setattr(app.brokers.quotes, "KITE_SCHEDULER", KiteScheduler({endpoint: 1000.0 for endpoint in Endpoint}))
+
+
+def test_cancelled_leader_during_window_does_not_strand_followers():
+    async def run():
+        aggregator = QuoteAggregator(ttl_ms=0, window_ms=50)
+        kite = FakeKite()
+        leader = asyncio.create_task(aggregator.quoteAsync(kite, ["NSE:A"]))
+        follower = asyncio.create_task(aggregator.quoteAsync(kite, ["NSE:A"]))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert (await asyncio.wait_for(follower, 1))["NSE:A"]["last_price"] == 100.0
+        # Later callers open a fresh batch instead of joining the abandoned one
+        assert "NSE:A" in await asyncio.wait_for(aggregator.quoteAsync(kite, ["NSE:A"]), 1)
+
+    asyncio.run(run())
+
+
+def test_cancelled_leader_during_fetch_does_not_strand_followers():
+    async def run():
+        aggregator = QuoteAggregator(ttl_ms=0, window_ms=0)
+        kite = FakeKite(delay=0.05)
+        leader = asyncio.create_task(aggregator.quoteAsync(kite, ["NSE:A"]))
+        await asyncio.sleep(0.01)
+        # Joins the leader's in-flight fetch
+        follower = asyncio.create_task(aggregator.quoteAsync(kite, ["NSE:A"]))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert (await asyncio.wait_for(follower, 1))["NSE:A"]["last_price"] == 100.0
+        assert "NSE:A" in await asyncio.wait_for(aggregator.quoteAsync(kite, ["NSE:A"]), 1)
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.brokers.scheduler import Endpoint, KiteScheduler, Priority, RateLimitExceeded
+
+RATE = 10.0
+
+
+async def ok():
+    return "ok"
+
+
+def exhausted() -> KiteScheduler:
+    scheduler = KiteScheduler({endpoint: RATE for endpoint in Endpoint}, deadline=0.5)
+    for _ in range(int(RATE)):
+        scheduler.call("token", Endpoint.QUOTE, Priority.LIVE, lambda: None)
+    return scheduler
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        scheduler = exhausted()
+        queued = asyncio.create_task(scheduler.callAsync("token", Endpoint.QUOTE, Priority.LIVE, ok))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert scheduler.metrics()["quote"]["queued"] == 0
+        # Served once the bucket refills, instead of waiting behind the cancelled caller
+        assert await scheduler.callAsync("token", Endpoint.QUOTE, Priority.LIVE, ok) == "ok"
+
+    asyncio.run(run())
+
+
+def test_timed_out_waiter_leaves_the_queue():
+    async def run():
+        scheduler = exhausted()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.callAsync("token", Endpoint.QUOTE, Priority.LIVE, ok), 0.01)
+        assert await scheduler.callAsync("token", Endpoint.QUOTE, Priority.LIVE, ok) == "ok"
+
+    asyncio.run(run())
+
+
+def test_rejects_past_the_deadline():
+    scheduler = exhausted()
+    with pytest.raises(RateLimitExceeded):
+        scheduler.call("token", Endpoint.QUOTE, Priority.LIVE, lambda: None, deadline=0.01)
@@ -0,0 +1,74 @@
+from concurrent.futures import Future
+import datetime
+import math
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import app.db.snapshot_writer
+from app.db.snapshot_writer import SnapshotWriter
+
+NOW = datetime.datetime(2025, 6, 2, 4, 0, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def commits(monkeypatch):
+    """Row groups the writer commits; a NaN price fails the commit like a bad value would."""
+    committed: list[list[str]] = []
+
+    class Repository:
+        def __init__(self, session):
+            pass
+
+        def add_rows(self, rows):
+            rows = list(rows)
+            if any(math.isnan(price) for _, price, _ in rows):
+                raise ValueError("bad price")
+            committed.append([symbol for symbol, _, _ in rows])
+
+    monkeypatch.setattr(app.db.snapshot_writer, "PriceSnapshotRepository", Repository)
+    return committed
+
+
+def submitGrouped(writer: SnapshotWriter, batches: list[list[tuple]]):
+    # Queued before the thread starts, so they land in one group
+    futures = []
+    for rows in batches:
+        future: Future = Future()
+        writer._queue.put_nowait((rows, future, False))
+        futures.append(future)
+    writer.start()
+    writer.stop()
+    return futures
+
+
+def test_bad_row_fails_only_its_own_submission(commits):
+    good, bad, other = submitGrouped(SnapshotWriter(flush_ms=50), [
+        [("NIFTY", 1.0, NOW)],
+        [("SENSEX", math.nan, NOW)],
+        [("BANKNIFTY", 2.0, NOW)],
+    ])
+    assert good.result(1) == 1
+    assert other.result(1) == 1
+    with pytest.raises(ValueError):
+        bad.result(1)
+    assert commits == [["NIFTY"], ["BANKNIFTY"]]
+
+
+def test_unreachable_database_fails_the_group_once(monkeypatch):
+    attempts = []
+
+    class Repository:
+        def __init__(self, session):
+            pass
+
+        def add_rows(self, rows):
+            attempts.append(list(rows))
+            raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(app.db.snapshot_writer, "PriceSnapshotRepository", Repository)
+    futures = submitGrouped(SnapshotWriter(flush_ms=50), [[("NIFTY", 1.0, NOW)], [("SENSEX", 2.0, NOW)]])
+    for future in futures:
+        with pytest.raises(OperationalError):
+            future.result(1)
+    assert len(attempts) == 1